@@ -35,6 +35,11 @@ def main():
         script/program. The corresponding modes are:
         - sim: The normal simulation process started by a BlueSky server
         - sim-detached: An isolated simulation node, without networking
+        - sim-zygote: Preloads the simulation once, and forks simulation
+          nodes from it on request of the server (see prefork_nodes setting)
+        A recording of simulation streams can be replayed by a replay node,
+        which is normally started by the server:
+        - replay: Replay the recording passed with --replay <filename>
     """
     # When importerror gives different name than (pip) install needs,
     # also advise latest version
@@ -48,8 +53,12 @@ def main():
     # server-headless: start server only
     # detached: start only one simulation node, without networking
     #   ==> useful for calling bluesky from within another python script/program
-    if '--detached' in sys.argv:
+    if '--replay' in sys.argv:
+        mode = 'replay'
+    elif '--detached' in sys.argv:
         mode = 'sim-detached'
+    elif '--zygote' in sys.argv:
+        mode = 'sim-zygote'
     elif '--sim' in sys.argv:
         mode = 'sim'
     elif '--client' in sys.argv:
@@ -64,21 +73,31 @@ def main():
     # Check if alternate config file is passed or a default scenfile
     cfgfile = ''
     scnfile = ''
+    replayfile = ''
     for i in range(len(sys.argv)):
         if len(sys.argv) > i + 1:
             if sys.argv[i] == '--config-file':
                 cfgfile = sys.argv[i + 1]
             elif sys.argv[i] == '--scenfile':
                 scnfile = sys.argv[i + 1]
+            elif sys.argv[i] == '--replay':
+                replayfile = sys.argv[i + 1]
 
     # Catch import errors
     try:
         # Initialize bluesky modules
         bs.init(mode, discovery=discovery, cfgfile=cfgfile, scnfile=scnfile)
 
+        # A zygote forks simulation nodes on request of the server
+        if mode == 'sim-zygote':
+            from bluesky.network import zygote
+            zygote.run(scnfile)
         # Only start a simulation node if called with --sim or --detached
-        if mode[:3] == 'sim':
+        elif mode[:3] == 'sim':
             bs.sim.start()
+        elif mode == 'replay':
+            from bluesky.network.replay import Replay
+            Replay(replayfile).start()
         else:
             # Only print start message in the non-sim cases to avoid printing
             # this for every started node
@@ -28,14 +28,18 @@ def init(mode='sim', pygame=False, discovery=False, cfgfile='', scnfile=''):
     """ Initialize bluesky modules.
 
         Arguments:
-        - mode: can be 'sim', 'sim-detached', 'server-gui', 'server-headless',
-          or 'client'
+        - mode: can be 'sim', 'sim-detached', 'sim-zygote', 'server-gui',
+          'server-headless', 'client', or 'replay'
         - pygame: indicate if BlueSky is started with BlueSky_pygame.py
         - discovery: Enable network discovery
     """
     # Initialize global settings first, possibly loading a custom config file
     settings.init(cfgfile)
 
+    # A replay node only needs the settings
+    if mode == 'replay':
+        return
+
     # Is this a server running headless?
     headless = (mode[-8:] == 'headless')
 
@@ -58,27 +62,37 @@ def init(mode='sim', pygame=False, discovery=False, cfgfile='', scnfile=''):
         server = Server(headless)
 
     # The remaining objects are only instantiated in the sim nodes
-    if mode[:3] == 'sim':
-        # Check whether simulation node should run detached
-        detached = (mode[-8:] == 'detached')
-        from bluesky.traffic import Traffic
-
-        if pygame:
-            from bluesky.ui.pygame import Screen
-            from bluesky.simulation.pygame import Simulation
-        else:
-            from bluesky.simulation.qtgl import Simulation, ScreenIO as Screen
-
-        from bluesky import stack
-        from bluesky.tools import plugin, plotter
-
-        # Initialize singletons
-        global traf, sim, scr
-        traf = Traffic()
-        sim = Simulation(detached)
-        scr = Screen()
-
-        # Initialize remaining modules
-        plugin.init(mode)
-        plotter.init()
-        stack.init(scnfile)
+    if mode == 'sim-zygote':
+        # A zygote only preloads the simulation modules and data. The
+        # simulation objects are created in the nodes it forks.
+        from bluesky.network import zygote
+        zygote.preload()
+    elif mode[:3] == 'sim':
+        init_sim(mode, pygame, scnfile)
+
+
+def init_sim(mode='sim', pygame=False, scnfile=''):
+    """ Initialize the simulation objects of a simulation node. """
+    # Check whether simulation node should run detached
+    detached = (mode[-8:] == 'detached')
+    from bluesky.traffic import Traffic
+
+    if pygame:
+        from bluesky.ui.pygame import Screen
+        from bluesky.simulation.pygame import Simulation
+    else:
+        from bluesky.simulation.qtgl import Simulation, ScreenIO as Screen
+
+    from bluesky import stack
+    from bluesky.tools import plugin, plotter
+
+    # Initialize singletons
+    global traf, sim, scr
+    traf = Traffic()
+    sim = Simulation(detached)
+    scr = Screen()
+
+    # Initialize remaining modules
+    plugin.init(mode)
+    plotter.init()
+    stack.init(scnfile)
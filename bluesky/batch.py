@@ -0,0 +1,230 @@
+''' Run batches of scenarios in parallel detached simulations.
+
+    This runs each scenario in a pool of detached simulation processes,
+    without the networking server, stepping each simulation as fast as
+    possible. The requested data loggers write their files to a results
+    directory, with a subdirectory per scenario, together with a summary
+    of all scenarios.
+
+    Usage:
+        python -m bluesky.batch [options] scenario1.scn [scenario2.scn ...]
+
+    Scenario files that contain multiple scenarios, each starting with a
+    SCEN command (as used by the BATCH command), are split into their
+    individual scenarios. Sweep files (.ini) are expanded into their
+    scenario variants, see bluesky.sweep.
+'''
+import argparse
+import multiprocessing
+import os
+import random
+import time
+import traceback
+from datetime import datetime
+
+import numpy as np
+
+import bluesky as bs
+from bluesky import settings
+
+# Simulated time [s] after which a scenario without HOLD, QUIT or RESET
+# command is stopped, when no maximum time is given
+DEFAULT_MAXTIME = 24 * 3600.0
+
+
+def parse_time(tstamp):
+    ''' Convert a scenario file timestamp (hh:mm:ss.ss) to seconds. '''
+    hours, minutes, seconds = tstamp.strip().split(':')
+    return int(hours) * 3600.0 + int(minutes) * 60.0 + float(seconds)
+
+
+def load_scenarios(fname):
+    ''' Load the scenario(s) in file fname. Returns a list of scenario dicts
+        with name, scentime, and scencmd. '''
+    if not os.path.exists(fname):
+        fname = os.path.join(settings.scenario_path, fname)
+    name = os.path.splitext(os.path.basename(fname))[0]
+    scenarios = []
+    lines = []
+    with open(fname, 'r') as fscen:
+        for line in fscen:
+            line = line.strip()
+            # Skip empty lines and comments
+            if not line or line[0] == '#' or '>' not in line:
+                continue
+            tstamp, cmd = line.split('>', 1)
+            try:
+                t = parse_time(tstamp)
+            except ValueError:
+                print('Skipping invalid line in {}: {}'.format(fname, line))
+                continue
+            # Each SCEN command starts a new scenario, keeping file order
+            if cmd[:4].upper() == 'SCEN':
+                lines = []
+                scenarios.append(dict(name=cmd[4:].strip() or name, lines=lines))
+            elif not scenarios:
+                scenarios.append(dict(name=name, lines=lines))
+            lines.append((t, cmd))
+
+    for scen in scenarios:
+        # Commands within a scenario are ordered by time
+        scen['lines'].sort(key=lambda line: line[0])
+        scen['scentime'] = [t for t, _ in scen['lines']]
+        scen['scencmd'] = [cmd for _, cmd in scen.pop('lines')]
+    return scenarios
+
+
+def terminates(scen):
+    ''' Returns True if scenario dict scen has a command that halts, stops
+        or resets the simulation. '''
+    from bluesky.stack.stack import cmdsynon
+    for cmd in scen['scencmd']:
+        words = cmd.replace(',', ' ').split()
+        if words and cmdsynon.get(words[0].upper(), words[0].upper()) in ('HOLD', 'QUIT', 'RESET'):
+            return True
+    return False
+
+
+def init_worker(cfgfile=''):
+    ''' Initialize a batch worker process. '''
+    # Forked workers inherit the simulation of the parent process
+    if bs.sim is None:
+        bs.init('sim-detached', cfgfile=cfgfile)
+    # Make sure that workers don't share their random state
+    random.seed()
+    np.random.seed()
+
+
+def run_scenario(scen, outdir, loggers=(), maxtime=0.0):
+    ''' Run a single scenario in this process, as fast as possible. Returns
+        a dict with the results of this scenario. '''
+    from bluesky import stack
+    from bluesky.tools import datalog
+
+    result = dict(name=scen['name'], status='done', simt=0.0, walltime=0.0,
+                  nsteps=0, nconf=0, nlos=0, params=scen.get('params', {}))
+    if not maxtime and not terminates(scen):
+        # Without traffic and commands left the scenario ends by itself,
+        # but a scenario can also keep its traffic forever
+        print('Scenario {} has no HOLD, QUIT or RESET command: it is stopped '
+              'after {:.0f} s of simulated time'.format(scen['name'], DEFAULT_MAXTIME))
+        maxtime = DEFAULT_MAXTIME
+    tstart = time.time()
+    try:
+        bs.sim.reset()
+        # Log files of this scenario go to its own directory
+        settings.log_path = os.path.join(outdir, scen['name'])
+        os.makedirs(settings.log_path, exist_ok=True)
+        stack.scenarioinit(scen['name'])
+        stack.set_scendata(list(scen['scentime']), list(scen['scencmd']))
+        for logger in loggers:
+            stack.stack(logger + ' ON')
+        bs.sim.op()
+        # A scenario ends when the simulation is halted or stopped, or when
+        # all its commands are processed and there is no traffic left
+        result['nsteps'] = bs.sim.run_fast(
+            tend=maxtime or None,
+            until=lambda: not stack.get_scendata()[1] and bs.traf.ntraf == 0)
+        if maxtime and bs.sim.state == bs.OP and \
+                bs.sim.simt >= maxtime - 1e-6 * bs.sim.simdt and \
+                (stack.get_scendata()[1] or bs.traf.ntraf):
+            result['status'] = 'maxtime'
+        result['nconf'] = len(bs.traf.asas.confpairs_all)
+        result['nlos'] = len(bs.traf.asas.lospairs_all)
+    except Exception as e:
+        traceback.print_exc()
+        result['status'] = 'error: {}'.format(e).replace(',', ';')
+    finally:
+        datalog.reset()
+    result['simt'] = bs.sim.simt
+    result['walltime'] = time.time() - tstart
+    return result
+
+
+def _run_job(args):
+    return run_scenario(*args)
+
+
+def write_summary(fname, results, walltime):
+    ''' Write the results of all scenarios to a csv file. Parameters of
+        sweep variants are added as extra columns. '''
+    paramnames = []
+    for res in results:
+        paramnames.extend(name for name in res['params'] if name not in paramnames)
+    with open(fname, 'w') as f:
+        f.write('# Batch summary: {} scenarios, total wall time {:.2f} s\n'.format(
+            len(results), walltime))
+        f.write('# scenario, status, simulated time [s], wall time [s], '
+                'steps, conflicts, losses of separation' +
+                ''.join(', ' + name for name in paramnames) + '\n')
+        for res in results:
+            f.write('{name}, {status}, {simt:.2f}, {walltime:.2f}, {nsteps}, '
+                    '{nconf}, {nlos}'.format(**res) +
+                    ''.join(', ' + res['params'].get(name, '') for name in paramnames) + '\n')
+
+
+def run(scenarios, outdir='', nprocs=0, loggers=(), maxtime=0.0, cfgfile=''):
+    ''' Run a list of scenarios in a pool of nprocs (default: all cores)
+        detached simulations. Returns the list of results, in the order of
+        the scenarios. '''
+    from bluesky.network.jobs import estimate_cost
+    if not outdir:
+        timestamp = datetime.now().strftime('%Y%m%d_%H-%M-%S')
+        outdir = os.path.join(settings.log_path, 'batch_' + timestamp)
+    os.makedirs(outdir, exist_ok=True)
+
+    # Start the most expensive scenarios first
+    order = sorted(range(len(scenarios)), reverse=True,
+                   key=lambda i: estimate_cost(scenarios[i]['scentime'], scenarios[i]['scencmd']))
+    jobs = [(scenarios[i], outdir, tuple(loggers), maxtime) for i in order]
+
+    tstart = time.time()
+    results = [None] * len(scenarios)
+    pool = multiprocessing.Pool(nprocs or None, init_worker, (cfgfile,))
+    try:
+        for i, res in zip(order, pool.imap(_run_job, jobs)):
+            print('Scenario {name} {status} in {walltime:.2f} s'.format(**res))
+            results[i] = res
+    finally:
+        pool.close()
+        pool.join()
+
+    write_summary(os.path.join(outdir, 'summary.csv'), results, time.time() - tstart)
+    return results
+
+
+def main(argv=None):
+    ''' Command-line entry point of the batch runner. '''
+    parser = argparse.ArgumentParser(description='Run BlueSky scenarios in parallel, without networking.')
+    parser.add_argument('scenfiles', nargs='+', help='scenario, batch, or sweep (.ini) files')
+    parser.add_argument('-j', '--jobs', type=int, default=0,
+                        help='number of parallel simulations (default: number of cores)')
+    parser.add_argument('-o', '--outdir', default='',
+                        help='results directory (default: a new directory in the log path)')
+    parser.add_argument('-l', '--log', action='append', default=[], metavar='LOGGER',
+                        help='data logger to switch on in each scenario, e.g. SNAPLOG')
+    parser.add_argument('--maxtime', type=float, default=0.0,
+                        help='maximum simulated time [s] per scenario')
+    parser.add_argument('--config-file', default='', help='alternative config file')
+    args = parser.parse_args(argv)
+
+    # On systems that fork, the workers inherit this detached simulation
+    bs.init('sim-detached', cfgfile=args.config_file)
+    scenarios = []
+    for fname in args.scenfiles:
+        if fname.lower().endswith('.ini'):
+            from bluesky.sweep import load_sweep
+            scenarios.extend(load_sweep(fname))
+        else:
+            scenarios.extend(load_scenarios(fname))
+    if not scenarios:
+        print('No scenarios found')
+        return []
+
+    print('Running {} scenarios'.format(len(scenarios)))
+    return run(scenarios, args.outdir, args.jobs, [l.upper() for l in args.log],
+               args.maxtime, args.config_file)
+
+
+if __name__ == '__main__':
+    main()
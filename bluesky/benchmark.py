@@ -0,0 +1,193 @@
+''' Headless scaling benchmark suite of the BlueSky simulation.
+
+    Runs detached simulations of uniform random traffic for each
+    combination of traffic count, conflict detection and resolution method,
+    wind, and performance model. Each case runs in a fresh process, and
+    reports its start-up time, simulation steps per second, the mean
+    duration of each step phase (see bluesky.tools.profiler), and the peak
+    resident memory. Results are written as JSON or CSV, and can be
+    compared against a baseline from an earlier run.
+
+    Usage:
+        python -m bluesky.benchmark [options]
+
+    Example:
+        python -m bluesky.benchmark --ntraf 100,1000 --asas OFF,STATEBASED:MVP \\
+            -o new.json --baseline old.json
+'''
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    # Peak memory is only measured on systems with the resource module
+    resource = None
+
+# Relative decrease in steps per second that is reported as a regression
+TOLERANCE = 0.1
+
+
+def case_id(case):
+    ''' Unique text identifier of a benchmark case. '''
+    return 'ntraf={ntraf} asas={asas} wind={wind} perf={perf}'.format(**case)
+
+
+def peak_rss():
+    ''' Peak resident memory of this process [MB]. '''
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, and in kilobytes elsewhere
+    return rss / (1 << 20) if sys.platform == 'darwin' else rss / (1 << 10)
+
+
+def make_config(cfgfile, case):
+    ''' Create a temporary config file for case, based on cfgfile. '''
+    if not cfgfile:
+        cfgfile = 'settings.cfg' if os.path.isfile('settings.cfg') else 'data/default.cfg'
+    with open(cfgfile, 'r') as fin:
+        cfg = fin.read()
+    fd, fname = tempfile.mkstemp(suffix='.cfg', text=True)
+    with os.fdopen(fd, 'w') as fout:
+        fout.write(cfg)
+        fout.write("\n# Benchmark case\nperformance_model = '{}'\n".format(case['perf']))
+    return fname
+
+
+def run_case(case, cfgfile='', nsteps=500, warmup=20):
+    ''' Run a single benchmark case in this process. '''
+    tstart = time.perf_counter()
+    cfgcase = make_config(cfgfile, case)
+    try:
+        import bluesky as bs
+        bs.init('sim-detached', cfgfile=cfgcase)
+    finally:
+        os.remove(cfgcase)
+    from bluesky import stack
+    from bluesky.tools import profiler
+    startup = time.perf_counter() - tstart
+
+    stack.stack('SEED 1')
+    stack.stack('MCRE {}'.format(case['ntraf']))
+    if case['asas'].upper() == 'OFF':
+        stack.stack('ASAS OFF')
+    else:
+        cdmethod, _, crmethod = case['asas'].upper().partition(':')
+        stack.stack('ASAS ON')
+        stack.stack('CDMETHOD ' + cdmethod)
+        stack.stack('RESO ' + (crmethod or 'OFF'))
+    if case['wind'].upper() == 'ON':
+        stack.stack('WIND 52 4 * 270 30')
+    bs.sim.op()
+    for _ in range(warmup):
+        bs.sim.step()
+
+    profiler.profile('ON')
+    profiler.reset()
+    tstart = time.perf_counter()
+    for _ in range(nsteps):
+        bs.sim.step()
+    elapsed = time.perf_counter() - tstart
+    phases = {name: values[0] for name, values in profiler.stats().items()}
+    profiler.profile('OFF')
+
+    return dict(case, id=case_id(case), startup=startup, nsteps=nsteps,
+                steps_per_sec=nsteps / elapsed, peak_rss=peak_rss(), phases=phases)
+
+
+def run(cases, cfgfile='', nsteps=500, warmup=20):
+    ''' Run each case in a fresh process, and return the list of results. '''
+    # Use fresh processes, so that start-up time, memory use, and the
+    # performance model are measured and selected per case
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for case in cases:
+        with ctx.Pool(1) as pool:
+            result = pool.apply(run_case, (case, cfgfile, nsteps, warmup))
+        print('{id}: {steps_per_sec:.1f} steps/s, start-up {startup:.2f} s'.format(**result))
+        results.append(result)
+    return results
+
+
+def write_results(fname, results):
+    ''' Write results to fname, as CSV or JSON depending on its extension. '''
+    if fname.lower().endswith('.csv'):
+        phasenames = []
+        for res in results:
+            phasenames.extend(name for name in res['phases'] if name not in phasenames)
+        fields = ['id', 'ntraf', 'asas', 'wind', 'perf', 'startup', 'nsteps',
+                  'steps_per_sec', 'peak_rss']
+        with open(fname, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(fields + ['phase_{}_ms'.format(name) for name in phasenames])
+            for res in results:
+                writer.writerow([res[field] for field in fields] +
+                                [res['phases'].get(name, '') for name in phasenames])
+    else:
+        with open(fname, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    ''' Compare results with the results of a baseline run. Returns the list
+        of ids of cases that became slower than tolerance allows. '''
+    base = {res['id']: res for res in baseline}
+    regressions = []
+    for res in results:
+        ref = base.get(res['id'])
+        if ref is None:
+            continue
+        ratio = res['steps_per_sec'] / ref['steps_per_sec']
+        print('{}: {:.2f}x baseline'.format(res['id'], ratio))
+        if ratio < 1.0 - tolerance:
+            regressions.append(res['id'])
+    return regressions
+
+
+def main(argv=None):
+    ''' Command-line entry point of the benchmark suite. '''
+    parser = argparse.ArgumentParser(description='Run the BlueSky scaling benchmarks.')
+    parser.add_argument('--ntraf', default='100,1000,5000,20000',
+                        help='comma-separated numbers of aircraft')
+    parser.add_argument('--asas', default='OFF,STATEBASED:OFF,STATEBASED:MVP',
+                        help='comma-separated OFF or CDMETHOD:RESO combinations')
+    parser.add_argument('--wind', default='OFF,ON', help='comma-separated OFF/ON')
+    parser.add_argument('--perf', default='openap',
+                        help='comma-separated performance models (openap, legacy, bada)')
+    parser.add_argument('--nsteps', type=int, default=500, help='number of measured steps per case')
+    parser.add_argument('--warmup', type=int, default=20, help='number of steps before measuring')
+    parser.add_argument('-o', '--output', default='benchmark.json',
+                        help='results file (.json or .csv)')
+    parser.add_argument('--baseline', default='', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='relative slowdown reported as regression')
+    parser.add_argument('--config-file', default='', help='alternative config file')
+    args = parser.parse_args(argv)
+
+    cases = [dict(ntraf=int(ntraf), asas=asas, wind=wind, perf=perf)
+             for ntraf, asas, wind, perf in itertools.product(
+                 args.ntraf.split(','), args.asas.split(','),
+                 args.wind.split(','), args.perf.split(','))]
+    results = run(cases, args.config_file, args.nsteps, args.warmup)
+    write_results(args.output, results)
+    print('Results written to', args.output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print('Slower than baseline:\n  ' + '\n  '.join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+''' Import-time report of BlueSky start-up.
+
+    Starts BlueSky in a fresh interpreter with python's -X importtime
+    option, and lists the modules that take the longest to import, with
+    their own import time and their cumulative import time (including the
+    modules they import). Heavy optional dependencies (matplotlib, pandas,
+    scipy, pyclipper) should only be imported when they are first used;
+    the report lists those that were imported during start-up.
+
+    Usage:
+        python -m bluesky.importtime [options]
+
+    Example:
+        python -m bluesky.importtime --mode sim-detached -n 30
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Modules that are not needed to start a simulation
+HEAVY_MODULES = ('matplotlib', 'pandas', 'scipy', 'pyclipper', 'PyQt5', 'OpenGL', 'pygame')
+
+# Start-up script that is run in the child interpreter
+STARTUP = '''
+import json, sys, time
+tstart = time.perf_counter()
+import bluesky as bs
+bs.init({mode!r}, cfgfile={cfgfile!r})
+print(json.dumps(dict(elapsed=time.perf_counter() - tstart, modules=sorted(sys.modules))))
+'''
+
+
+def parse_importtime(text):
+    ''' Parse the output of -X importtime into a list of
+        (module, self time [s], cumulative time [s]). '''
+    modules = []
+    for line in text.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        tself, tcumulative, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(tself) / 1e6, int(tcumulative) / 1e6))
+    return modules
+
+
+def measure(mode='sim-detached', cfgfile=''):
+    ''' Start BlueSky in mode in a new interpreter. Returns the start-up
+        time [s], the imported modules, and the import times per module
+        (see parse_importtime). '''
+    if not cfgfile:
+        cfgfile = 'settings.cfg' if os.path.isfile('settings.cfg') else 'data/default.cfg'
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                           STARTUP.format(mode=mode, cfgfile=cfgfile)],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+    result = json.loads(proc.stdout.splitlines()[-1])
+    return result['elapsed'], result['modules'], parse_importtime(proc.stderr)
+
+
+def heavy_imports(modules):
+    ''' The heavy optional dependencies among the imported modules. '''
+    return sorted({name.split('.')[0] for name in modules} & set(HEAVY_MODULES))
+
+
+def report(elapsed, modules, importtimes, n=20):
+    ''' Text report of the n modules with the longest cumulative import time. '''
+    lines = ['Start-up time: {:.3f} s'.format(elapsed),
+             '{:>10s}{:>12s}  {}'.format('self [s]', 'total [s]', 'module')]
+    for name, tself, tcumulative in sorted(importtimes, key=lambda m: -m[2])[:n]:
+        lines.append('{:10.3f}{:12.3f}  {}'.format(tself, tcumulative, name))
+    heavy = heavy_imports(modules)
+    if heavy:
+        lines.append('Heavy modules imported at start-up: ' + ', '.join(heavy))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    ''' Command-line interface of the import-time report. '''
+    parser = argparse.ArgumentParser(description='Report the import time of BlueSky start-up.')
+    parser.add_argument('--mode', default='sim-detached', help='BlueSky start-up mode')
+    parser.add_argument('-n', type=int, default=20, help='number of modules to list')
+    parser.add_argument('--config-file', default='', help='alternative config file')
+    args = parser.parse_args(argv)
+    print(report(*measure(args.mode, args.config_file), n=args.n))
+
+
+if __name__ == '__main__':
+    main()
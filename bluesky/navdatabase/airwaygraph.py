@@ -0,0 +1,114 @@
+''' Adjacency structure of the airway network. '''
+import numpy as np
+from bluesky.tools import geo
+
+
+class AirwayGraph:
+    ''' Airway network in compressed sparse row (CSR) form.
+
+        The nodes are the airway waypoints, identified by name and position
+        (waypoint names are not unique). The connections of node i are
+        conn[start[i]:start[i+1]], with for each connection the source node
+        in connsrc, the airway (an index in awids) in connaw, and the leg
+        distance [nm] in conndist. The connections are also sorted per
+        airway: those of airway j are awconn[awstart[j]:awstart[j+1]]. '''
+    # The data of the graph, which is stored in the navdata cache
+    COLUMNS = ('nodeid', 'nodelat', 'nodelon', 'awids', 'start', 'conn',
+               'connsrc', 'connaw', 'conndist', 'awconn', 'awstart')
+
+    def __init__(self, columns):
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+        self.awnr      = {awid: i for i, awid in enumerate(self.awids)}
+        self.nodeindex = dict()
+        for i, wpid in enumerate(self.nodeid):
+            self.nodeindex.setdefault(wpid, []).append(i)
+
+    @classmethod
+    def build(cls, awydata):
+        ''' Build the airway graph from the airway legs in awydata. '''
+        # Number the waypoints and airways of all legs
+        nodenr = dict()
+        nodeid = []
+        awnr   = dict()
+        legs   = set()
+        lat, lon = [], []
+        for i, awid in enumerate(awydata['awid']):
+            ends = []
+            for wpid, wplat, wplon in ((awydata['awfromwpid'][i], awydata['awfromlat'][i],
+                                        awydata['awfromlon'][i]),
+                                       (awydata['awtowpid'][i], awydata['awtolat'][i],
+                                        awydata['awtolon'][i])):
+                key = (wpid, round(wplat, 4), round(wplon, 4))
+                if key not in nodenr:
+                    nodenr[key] = len(nodeid)
+                    nodeid.append(wpid)
+                    lat.append(wplat)
+                    lon.append(wplon)
+                ends.append(nodenr[key])
+            iaw = awnr.setdefault(awid, len(awnr))
+            # Connections in both directions, without duplicate legs
+            if ends[0] != ends[1]:
+                legs.add((ends[0], ends[1], iaw))
+                legs.add((ends[1], ends[0], iaw))
+
+        columns = dict(nodeid=nodeid, nodelat=np.array(lat, dtype=float),
+                       nodelon=np.array(lon, dtype=float), awids=list(awnr))
+        legs = np.array(sorted(legs), dtype=int).reshape(-1, 3)
+        src, conn, connaw = legs[:, 0], legs[:, 1], legs[:, 2]
+        columns['start']    = np.searchsorted(src, np.arange(len(nodeid) + 1))
+        columns['conn']     = conn
+        columns['connsrc']  = src
+        columns['connaw']   = connaw
+        columns['conndist'] = geo.kwikdist(columns['nodelat'][src], columns['nodelon'][src],
+                                           columns['nodelat'][conn], columns['nodelon'][conn])
+        columns['awconn']   = np.argsort(connaw, kind='stable')
+        columns['awstart']  = np.searchsorted(connaw[columns['awconn']],
+                                              np.arange(len(awnr) + 1))
+        return cls(columns)
+
+    def columns(self):
+        ''' The data of this graph, to store in a cache. '''
+        return {name: getattr(self, name) for name in self.COLUMNS}
+
+    def segments(self, awid):
+        ''' Return the segments of airway awid, each as an array of nodes
+            in order along the airway. '''
+        iaw = self.awnr.get(awid)
+        if iaw is None:
+            return []
+        edges = self.awconn[self.awstart[iaw]:self.awstart[iaw + 1]]
+        # Neighbours of each node of this airway
+        nbrs = dict()
+        for a, b in zip(self.connsrc[edges], self.conn[edges]):
+            nbrs.setdefault(a, []).append(b)
+
+        # Walk from the end nodes first, then the remaining closed loops
+        ends = [node for node, nb in nbrs.items() if len(nb) == 1]
+        used = set()
+        segments = []
+        for first in ends + list(nbrs):
+            if all((first, nb) in used for nb in nbrs[first]):
+                continue
+            segment = [first]
+            node = first
+            while True:
+                nxt = next((nb for nb in nbrs[node] if (node, nb) not in used), None)
+                if nxt is None:
+                    break
+                used.update(((node, nxt), (nxt, node)))
+                segment.append(nxt)
+                node = nxt
+            segments.append(np.array(segment))
+        return segments
+
+    def connections(self, wpid, wplat, wplon, maxdist=10.0):
+        ''' Return the connections of the airway waypoint(s) named wpid within
+            maxdist [nm] of wplat, wplon, as an array of connection indices. '''
+        nodes = self.nodeindex.get(wpid, [])
+        if not nodes:
+            return np.array([], dtype=int)
+        dist = geo.kwikdist(self.nodelat[nodes], self.nodelon[nodes], wplat, wplon)
+        return np.concatenate([np.arange(self.start[i], self.start[i + 1])
+                               for i, d in zip(nodes, dist) if d < maxdist] or
+                              [np.array([], dtype=int)])
@@ -1,5 +1,7 @@
 ''' Load navigation data from text files.'''
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from bluesky import settings
 from bluesky.tools.aero import ft
@@ -7,8 +9,39 @@ from bluesky.tools.aero import ft
 ## Default settings
 settings.set_variable_defaults(navdata_path='data/navdata')
 
+
 def load_navdata_txt():
-    #----------  Read  nav.dat file (nav aids) ----------
+    ''' Read the navigation data source files. The files are independent,
+        and are parsed concurrently in a process pool. '''
+    parsers = (load_nav_txt, load_fix_txt, load_awy_txt, load_apt_txt,
+               load_fir_txt, load_co_txt)
+    navdata, fixdata, awydata, aptdata, firdata, codata = \
+        run_parallel(parsers, settings.navdata_path)
+
+    # Waypoints: nav aids followed by fixes
+    wptdata = {key: np.concatenate((navdata[key], fixdata[key]))
+               if key in ('wplat', 'wplon') else navdata[key] + fixdata[key]
+               for key in navdata}
+
+    return wptdata, aptdata, awydata, firdata, codata
+
+
+def run_parallel(funs, *args):
+    ''' Call each function in funs with args, in a process pool, and return
+        the results. Daemon processes (such as batch workers) cannot start
+        a process pool, these call the functions one by one. '''
+    if not multiprocessing.current_process().daemon:
+        try:
+            with ProcessPoolExecutor(min(len(funs), os.cpu_count() or 1)) as pool:
+                futures = [pool.submit(fun, *args) for fun in funs]
+                return [future.result() for future in futures]
+        except (OSError, RuntimeError) as e:
+            print('Parallel parsing not available ({}), continuing sequentially'.format(e))
+    return [fun(*args) for fun in funs]
+
+
+def load_nav_txt(navdata_path):
+    ''' Read nav.dat file (nav aids). '''
     wptdata         = dict()
     wptdata['wpid']    = []              # identifier (string)
     wptdata['wplat']   = []              # latitude [deg]
@@ -21,7 +54,7 @@ def load_navdata_txt():
     wptdata['wpdesc']  = []              # description
 
 
-    with open(os.path.join(settings.navdata_path, 'nav.dat'), 'rb') as f:
+    with open(os.path.join(navdata_path, 'nav.dat'), 'rb') as f:
         print("Reading nav.dat")
 
         for line in f:
@@ -98,44 +131,44 @@ def load_navdata_txt():
             except:
                 wptdata['wpdesc'].append("   ")  # Description
 
-    #----------  Read  fix.dat file ----------
-    with open(os.path.join(settings.navdata_path, 'fix.dat'), 'rb') as f:
-        print("Reading fix.dat")
-        for line in f:
-            line = line.decode(encoding="ascii", errors="ignore").strip()
-
-            # Skip empty lines or comments
-            if len(line) < 3 or line[0] == "#":
-                continue
+    # Convert lists for lat,lon to numpy-array for vectorised clipping
+    wptdata['wplat']   = np.array(wptdata['wplat'])
+    wptdata['wplon']   = np.array(wptdata['wplon'])
 
-            # Start with valid 2 digit latitude -45. or 52.
-            if not ((line[0]=="-" and line[3]==".") or line[2]==".")  :
-                continue
+    return wptdata
 
 
-            # Data line => Process fields of this record, separated by a comma
-            # Example line:
-            #  30.580372 -094.384169 FAREL
-            fields = line.split()
+def load_fix_txt(navdata_path):
+    ''' Read fix.dat file. The lat/lon columns are converted in bulk. '''
+    with open(os.path.join(navdata_path, 'fix.dat'), 'rb') as f:
+        print("Reading fix.dat")
+        lines = f.read().decode(encoding="ascii", errors="ignore").splitlines()
 
-            wptdata["wptype"].append("FIX")
+    # Data lines start with valid 2 digit latitude -45. or 52.
+    # Example line:
+    #  30.580372 -094.384169 FAREL
+    lines = [line.strip() for line in lines]
+    fields = [line.split() for line in lines if len(line) >= 3 and line[0] != "#" and
+              ((line[0] == "-" and line[3] == ".") or line[2] == ".")]
+    nfix = len(fields)
 
+    wptdata = dict()
+    wptdata['wpid']   = [fld[2] for fld in fields]     # Id
+    wptdata['wplat']  = np.array([fld[0] for fld in fields], dtype=float)  # latitude [deg]
+    wptdata['wplon']  = np.array([fld[1] for fld in fields], dtype=float)  # longitude [deg]
+    wptdata['wptype'] = nfix * ["FIX"]
 
-            wptdata['wplat'].append(float(fields[0]))      # latitude [deg]
-            wptdata['wplon'].append(float(fields[1]))      # longitude [deg]
-            wptdata['wpid'].append(fields[2]) # Id
+    # Not given for fixes but fill out tables for equal length
+    wptdata['wpelev'] = nfix * [0.0]  # elevation [ft]
+    wptdata['wpvar']  = nfix * [0.0]  # Magnetic variation not given
+    wptdata['wpfreq'] = nfix * [0.0]  # Fix is no navaid, so no freq
+    wptdata['wpdesc'] = nfix * [""]   # Description
 
-            # Not given for fixes but fill out tables for equal length
-            wptdata['wpelev'].append(0.0)  # elevation [ft]
-            wptdata['wpfreq'].append(0.0)  # Fix is no navaid, so no freq
-            wptdata['wpvar'].append(0.0)   # Magnetic variation not given
-            wptdata['wpdesc'].append("")  # Description
+    return wptdata
 
-    # Convert lists for lat,lon to numpy-array for vectorised clipping
-    wptdata['wplat']   = np.array(wptdata['wplat'])
-    wptdata['wplon']   = np.array(wptdata['wplon'])
 
-    #----------  Read  awy.dat file (airway legs) ----------
+def load_awy_txt(navdata_path):
+    ''' Read awy.dat file (airway legs). '''
     awydata   = dict()
 
     awydata['awid']        = []              # airway identifier (string)
@@ -150,7 +183,7 @@ def load_navdata_txt():
     awydata['awupfl']      = []              # highest flight level (int)
 
 
-    with open(os.path.join(settings.navdata_path, 'awy.dat'), 'rb') as f:
+    with open(os.path.join(navdata_path, 'awy.dat'), 'rb') as f:
         print("Reading awy.dat")
 
         for line in f:
@@ -208,7 +241,11 @@ def load_navdata_txt():
         awydata['awtolat']   = np.array(awydata['awtolat'])
         awydata['awtolon']   = np.array(awydata['awtolon'])
 
-    #----------  Read airports.dat file ----------
+    return awydata
+
+
+def load_apt_txt(navdata_path):
+    ''' Read airports.dat file. '''
     aptdata           = dict()
     aptdata['apid']      = []              # 4 char identifier (string)
     aptdata['apname']    = []              # full name
@@ -218,7 +255,7 @@ def load_navdata_txt():
     aptdata['aptype']    = []              # type (int, 1=large, 2=medium, 3=small)
     aptdata['apco']      = []              # two char country code (string)
     aptdata['apelev']    = []              # field elevation ft-> m
-    with open(os.path.join(settings.navdata_path, 'airports.dat'), 'rb') as f:
+    with open(os.path.join(navdata_path, 'airports.dat'), 'rb') as f:
         types = {'L': 1, 'M': 2, 'S': 3}
         for line in f:
             line = line.decode(encoding="ascii", errors="ignore").strip()
@@ -266,7 +303,12 @@ def load_navdata_txt():
     aptdata['aptype']   = np.array(aptdata['aptype'])
     aptdata['apelev']   = np.array(aptdata['apelev'])
 
-    #----------  Read FIR files ----------
+    return aptdata
+
+
+def load_fir_txt(navdata_path):
+    ''' Read FIR files. These have fixed-width columns, which are converted
+        in bulk per file. '''
     firdata         = dict()
     firdata['fir']     = []
     firdata['firlat0'] = []
@@ -274,57 +316,55 @@ def load_navdata_txt():
     firdata['firlat1'] = []
     firdata['firlon1'] = []
 
-    files = os.listdir(os.path.join(settings.navdata_path, 'fir'))
+    files = os.listdir(os.path.join(navdata_path, 'fir'))
 
     # Get fir names
     for filname in files:
         if ".txt" in filname:
             firname = filname[:filname.index(".txt")]
-            firdata['fir'].append([firname, [], []])
-
-            with open(os.path.join(settings.navdata_path, 'fir/' + filname), 'rb') as f:
-                for line in f:
-                    rec = line.decode(encoding="ascii", errors="ignore").upper().strip()
-
-                    if len(rec) == 0:
-                        continue
-
-                    latsign = 2 * int(line[0] == "N") - 1
-                    latdeg  = float(line[1:4])
-                    latmin  = float(line[5:7])
-                    latsec  = float(line[8:14])
-                    lat     = latsign*latdeg+latmin/60.+latsec/3600.
-
-                    lonsign = 2 * int(line[15] == "E") - 1
-                    londeg  = float(line[16:19])
-                    lonmin  = float(line[20:22])
-                    lonsec  = float(line[23:29])
-                    lon     = lonsign*londeg+lonmin/60.+lonsec/3600.
-
-                    # For drawing create a line from last lat,lon to current lat,lon
-                    if len(firdata['fir'][-1][1]) > 0:  # skip first lat,lon
-                        firdata['firlat0'].append(firdata['fir'][-1][1][-1])
-                        firdata['firlon0'].append(firdata['fir'][-1][2][-1])
-                        firdata['firlat1'].append(lat)
-                        firdata['firlon1'].append(lon)
-
-                    # Add to FIR record
-                    firdata['fir'][-1][1].append(lat)
-                    firdata['fir'][-1][2].append(lon)
+
+            with open(os.path.join(navdata_path, 'fir', filname), 'rb') as f:
+                # Example line:
+                # N050.46.00.000 E006.05.00.000
+                lines = [line for line in f.read().decode(encoding="ascii", errors="ignore").splitlines()
+                         if line.strip()]
+
+            latsign = np.array([2 * int(line[0] == "N") - 1 for line in lines])
+            latdeg  = np.array([line[1:4] for line in lines], dtype=float)
+            latmin  = np.array([line[5:7] for line in lines], dtype=float)
+            latsec  = np.array([line[8:14] for line in lines], dtype=float)
+            lat     = latsign*(latdeg+latmin/60.+latsec/3600.)
+
+            lonsign = np.array([2 * int(line[15] == "E") - 1 for line in lines])
+            londeg  = np.array([line[16:19] for line in lines], dtype=float)
+            lonmin  = np.array([line[20:22] for line in lines], dtype=float)
+            lonsec  = np.array([line[23:29] for line in lines], dtype=float)
+            lon     = lonsign*(londeg+lonmin/60.+lonsec/3600.)
+
+            # For drawing create lines from last lat,lon to current lat,lon
+            firdata['firlat0'].append(lat[:-1])
+            firdata['firlon0'].append(lon[:-1])
+            firdata['firlat1'].append(lat[1:])
+            firdata['firlon1'].append(lon[1:])
+
+            # Add FIR record
+            firdata['fir'].append([firname, lat.tolist(), lon.tolist()])
 
     # Convert lat/lon lines to numpy arrays
-    firdata['firlat0'] = np.array(firdata['firlat0'])
-    firdata['firlat1'] = np.array(firdata['firlat1'])
-    firdata['firlon0'] = np.array(firdata['firlon0'])
-    firdata['firlon1'] = np.array(firdata['firlon1'])
+    for key in ('firlat0', 'firlat1', 'firlon0', 'firlon1'):
+        firdata[key] = np.concatenate(firdata[key]) if firdata[key] else np.array([])
 
-    #----------  Read ICAO country codes file icao-countries.dat ----------
+    return firdata
+
+
+def load_co_txt(navdata_path):
+    ''' Read ICAO country codes file icao-countries.dat. '''
     codata           = dict()
     codata['coname']   = []              # Country name
     codata['cocode2']  = []              # 2 char code
     codata['cocode3']  = []              # 3 char code
     codata['conr']     = []              # country nr
-    with open(os.path.join(settings.navdata_path, 'icao-countries.dat'), 'rb') as f:
+    with open(os.path.join(navdata_path, 'icao-countries.dat'), 'rb') as f:
         for line in f:
             line = line.decode(encoding="ascii", errors="ignore").strip()
             # Skip empty lines or comments
@@ -349,5 +389,4 @@ def load_navdata_txt():
             except:
                 codata['conr'].append(-1)
 
-
-    return wptdata, aptdata, awydata, firdata, codata
+    return codata
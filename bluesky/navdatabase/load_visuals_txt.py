@@ -15,29 +15,33 @@ REARTH_INV = 1.56961231e-7
 def load_coastline_txt():
     # -------------------------COASTLINE DATA----------------------------------
     # Init geo (coastline)  data and convert pen up/pen down format of
-    # coastlines to numpy arrays with lat/lon
-    coast = []
-    clat = clon = 0.0
+    # coastlines to numpy arrays with lat/lon. The file is parsed in bulk:
+    # each record is a pen code (D: pen down, M: move) followed by lat, lon.
     with open(os.path.join(settings.navdata_path, 'coastlines.dat'), 'r') as f:
         print("Reading coastlines.dat")
-        for line in f:
-            line = line.strip()
-            if not (line == "" or line[0] == '#'):
-                arg = line.split()
-                if len(arg) == 3:
-                    lat, lon = float(arg[1]), float(arg[2])
-                    if arg[0] == 'D':
-                        coast.append([clat, clon, lat, lon])
-                    clat, clon = lat, lon
+        text = f.read()
+    if '#' in text:
+        text = '\n'.join(line for line in text.splitlines() if not line.lstrip().startswith('#'))
+    tokens = np.array(text.split() + ['M', 'M'])
+    ispen  = (tokens == 'D') | (tokens == 'M')
+    ipen   = np.flatnonzero(ispen[:-2])
+    ipen   = ipen[~(ispen[ipen + 1] | ispen[ipen + 2])]
+    pen = tokens[ipen] == 'D'
+    lat = tokens[ipen + 1].astype(float)
+    lon = tokens[ipen + 2].astype(float)
+
+    # Pen down: line segment from the previous point to this point
+    clat = np.append(0.0, lat[:-1])
+    clon = np.append(0.0, lon[:-1])
+    coast = np.stack((clat, clon, lat, lon), axis=1)[pen]
+
     # Sort the line segments by longitude of the first vertex
-    coastvertices = np.array(
-        sorted(coast, key=lambda a_entry: a_entry[1]), dtype=np.float32)
+    coastvertices = coast[np.argsort(coast[:, 1], kind='stable')].astype(np.float32)
     coastindices = np.zeros(361)
     coastlon = coastvertices[:, 1]
     for i in range(0, 360):
         coastindices[i] = np.searchsorted(coastlon, i - 180) * 2
     coastvertices.resize((int(coastvertices.size / 2), 2))
-    del coast
     return coastvertices, coastindices
 
 
@@ -1,95 +1,152 @@
 ''' Loader functions for navigation data. '''
 from os import path
-try:
-    import cPickle as pickle
-except ImportError:
-    import pickle
-
+import numpy as np
 import bluesky as bs
 from bluesky import settings
 from bluesky.tools import cachefile
 from .load_navdata_txt import load_navdata_txt
 from .load_visuals_txt import load_coastline_txt, navdata_load_rwythresholds
+from .spatialindex import PointIndex
+from .airwaygraph import AirwayGraph
 
 # Only try this if BlueSky is started in qtgl gui mode
 if bs.gui_type == 'qtgl':
     from .load_visuals_txt import load_aptsurface_txt
 
 
-# Cache versions: increment these to the current date if the source data is updated
-# or other reasons why the cache needs to be updated
-coast_version = 'v20170101'
-navdb_version = 'v20170101'
-aptsurf_version = 'v20171116'
+# Cache versions: increment these to the current date if the way the cache is
+# built changes. Changes in the source files are detected by the cache itself.
+coast_version = 'v20261019'
+navdb_version = 'v20261019.5'
+rwy_version = 'v20261019'
+aptsurf_version = 'v20261019'
 
 ## Default settings
 settings.set_variable_defaults(navdata_path='data/navdata')
 
 sourcedir = settings.navdata_path
 
+
+def sources(*fnames):
+    ''' Paths of the navdata source files of a cache. '''
+    return [path.join(settings.navdata_path, fname) for fname in fnames]
+
 def load_coastlines():
     ''' Load coastline data for gui. '''
-    with cachefile.openfile('coastlines.p', coast_version) as cache:
+    with cachefile.opendir('coastlines', coast_version,
+                           sources('coastlines.dat')) as cache:
         try:
-            coastvertices = cache.load()
-            coastindices = cache.load()
-        except (pickle.PickleError, cachefile.CacheError) as e:
+            coastdata = cache.load('coast')
+            coastvertices = coastdata['vertices']
+            coastindices = coastdata['indices']
+        except cachefile.CacheError as e:
             print(e.args[0])
             coastvertices, coastindices = load_coastline_txt()
-            cache.dump(coastvertices)
-            cache.dump(coastindices)
+            cache.dump('coast', dict(vertices=coastvertices, indices=coastindices))
 
     return coastvertices, coastindices
 
 
 def load_aptsurface():
     ''' Load airport surface polygons for gui. '''
-    with cachefile.openfile('aptsurface.p', aptsurf_version) as cache:
+    names = ('vbuf_asphalt', 'vbuf_concrete', 'vbuf_runways', 'vbuf_rwythr',
+             'apt_ctr_lat', 'apt_ctr_lon', 'apt_indices')
+    with cachefile.opendir('aptsurface', aptsurf_version, sources('apt.zip')) as cache:
         try:
-            vbuf_asphalt  = cache.load()
-            vbuf_concrete = cache.load()
-            vbuf_runways  = cache.load()
-            vbuf_rwythr   = cache.load()
-            apt_ctr_lat   = cache.load()
-            apt_ctr_lon   = cache.load()
-            apt_indices   = cache.load()
-        except (pickle.PickleError, cachefile.CacheError) as e:
+            surfdata = cache.load('surface')
+        except cachefile.CacheError as e:
             print(e.args[0])
-            vbuf_asphalt, vbuf_concrete, vbuf_runways, vbuf_rwythr, apt_ctr_lat, \
-            apt_ctr_lon, apt_indices = load_aptsurface_txt()
-            cache.dump(vbuf_asphalt)
-            cache.dump(vbuf_concrete)
-            cache.dump(vbuf_runways)
-            cache.dump(vbuf_rwythr)
-            cache.dump(apt_ctr_lat)
-            cache.dump(apt_ctr_lon)
-            cache.dump(apt_indices)
-
-    return vbuf_asphalt, vbuf_concrete, vbuf_runways, vbuf_rwythr, \
-        apt_ctr_lat, apt_ctr_lon, apt_indices
-
-
-def load_navdata():
-    ''' Load navigation database. '''
-    with cachefile.openfile('navdata.p', navdb_version) as cache:
+            surfdata = dict(zip(names, load_aptsurface_txt()))
+            cache.dump('surface', surfdata)
+
+    return tuple(surfdata[name] for name in names)
+
+
+def pack_fir(firdata):
+    ''' Store the FIR polygons as flat arrays with the start of each FIR. '''
+    packed = {key: value for key, value in firdata.items() if key != 'fir'}
+    npoints = [len(fir[1]) for fir in firdata['fir']]
+    packed['firname']  = [fir[0] for fir in firdata['fir']]
+    packed['firstart'] = np.cumsum([0] + npoints)
+    packed['firptlat'] = np.array([lat for fir in firdata['fir'] for lat in fir[1]], dtype=float)
+    packed['firptlon'] = np.array([lon for fir in firdata['fir'] for lon in fir[2]], dtype=float)
+    return packed
+
+
+def unpack_fir(packed):
+    ''' Inverse of pack_fir. '''
+    firdata = {key: value for key, value in packed.items()
+               if key not in ('firname', 'firstart', 'firptlat', 'firptlon')}
+    start = packed['firstart']
+    lat, lon = packed['firptlat'].tolist(), packed['firptlon'].tolist()
+    firdata['fir'] = [[name, lat[i0:i1], lon[i0:i1]] for name, i0, i1 in
+                      zip(packed['firname'], start[:-1], start[1:])]
+    return firdata
+
+
+def pack_rwythresholds(rwythresholds):
+    ''' Store the runway thresholds per airport as flat arrays, with the
+        start of the runways of each airport. '''
+    rwys = [(rwy, thr) for apt in rwythresholds.values() for rwy, thr in apt.items()]
+    return dict(apt=list(rwythresholds),
+                start=np.cumsum([0] + [len(apt) for apt in rwythresholds.values()]),
+                rwy=[rwy for rwy, _ in rwys],
+                thr=np.array([thr for _, thr in rwys], dtype=float).reshape(-1, 3))
+
+
+def unpack_rwythresholds(packed):
+    ''' Inverse of pack_rwythresholds. '''
+    start, rwy, thr = packed['start'], packed['rwy'], packed['thr'].tolist()
+    return {apt: {rwy[i]: tuple(thr[i]) for i in range(i0, i1)}
+            for apt, i0, i1 in zip(packed['apt'], start[:-1], start[1:])}
+
+
+def load_rwythresholds():
+    ''' Load runway threshold data. '''
+    with cachefile.opendir('rwythresholds', rwy_version, sources('apt.zip')) as cache:
         try:
-            wptdata       = cache.load()
-            awydata       = cache.load()
-            aptdata       = cache.load()
-            firdata       = cache.load()
-            codata        = cache.load()
-            rwythresholds = cache.load()
-        except (pickle.PickleError, cachefile.CacheError) as e:
+            rwythresholds = unpack_rwythresholds(cache.load('rwy'))
+        except cachefile.CacheError as e:
             print(e.args[0])
-
-            wptdata, aptdata, awydata, firdata, codata = load_navdata_txt()
             rwythresholds = navdata_load_rwythresholds()
+            cache.dump('rwy', pack_rwythresholds(rwythresholds))
 
-            cache.dump(wptdata)
-            cache.dump(awydata)
-            cache.dump(aptdata)
-            cache.dump(firdata)
-            cache.dump(codata)
-            cache.dump(rwythresholds)
+    return rwythresholds
 
-    return wptdata, aptdata, awydata, firdata, codata, rwythresholds
+
+def load_navdata(component):
+    ''' Load a component of the navigation database: waypoints ('wpt') or
+        airports ('apt') with their spatial index, airways ('awy') with the
+        airway graph, FIRs ('fir'), or countries ('co'). '''
+    with cachefile.opendir('navdata', navdb_version,
+                           sources('nav.dat', 'fix.dat', 'awy.dat', 'airports.dat',
+                                   'fir', 'icao-countries.dat')) as cache:
+        try:
+            if component == 'wpt':
+                return cache.load('wpt'), PointIndex(**cache.load('wptindex'))
+            if component == 'apt':
+                return cache.load('apt'), PointIndex(**cache.load('aptindex'))
+            if component == 'awy':
+                return cache.load('awy'), AirwayGraph(cache.load('awygraph'))
+            if component == 'fir':
+                return unpack_fir(cache.load('fir'))
+            return cache.load(component)
+        except cachefile.CacheError as e:
+            print(e.args[0])
+
+            wptdata, aptdata, awydata, firdata, codata = load_navdata_txt()
+            wptindex = PointIndex.build(wptdata['wplat'], wptdata['wplon'])
+            aptindex = PointIndex.build(aptdata['aplat'], aptdata['aplon'])
+            awygraph = AirwayGraph.build(awydata)
+
+            cache.dump('wpt', wptdata)
+            cache.dump('awy', awydata)
+            cache.dump('apt', aptdata)
+            cache.dump('fir', pack_fir(firdata))
+            cache.dump('co', codata)
+            cache.dump('wptindex', wptindex.columns())
+            cache.dump('aptindex', aptindex.columns())
+            cache.dump('awygraph', awygraph.columns())
+
+    return dict(wpt=(wptdata, wptindex), apt=(aptdata, aptindex), awy=(awydata, awygraph),
+                fir=firdata, co=codata)[component]
@@ -1,12 +1,22 @@
 from math import *
 import numpy as np
 
-from .loadnavdata import load_navdata
+from .loadnavdata import load_navdata, load_rwythresholds
 from bluesky.tools import geo
+from bluesky.tools.polygonindex import PolygonIndex
 from bluesky.tools.aero import nm
-from bluesky.tools.misc import findall
 import bluesky as bs
 
+
+def indexdict(ids):
+    ''' Return a dict that maps each identifier in ids to the list of
+        its indices in ids. '''
+    index = dict()
+    for i, name in enumerate(ids):
+        index.setdefault(name, []).append(i)
+    return index
+
+
 class Navdatabase:
     """
     Navdatabase class definition : command stack & processing class
@@ -38,15 +48,58 @@ class Navdatabase:
     Created by  : Jacco M. Hoekstra (TU Delft)
     """
 
+    # The components of the database, and their members. Each component is
+    # loaded on first access of one of its members, see __getattr__
+    components = {
+        'wpt': ('wpid', 'wplat', 'wplon', 'wptype', 'wpelev', 'wpvar', 'wpfreq',
+                'wpdesc', 'wpindex', 'wpspatial'),
+        'awy': ('awfromwpid', 'awfromlat', 'awfromlon', 'awtowpid', 'awtolat',
+                'awtolon', 'awid', 'awndir', 'awlowfl', 'awupfl', 'awindex', 'awgraph'),
+        'apt': ('aptid', 'aptname', 'aptlat', 'aptlon', 'aptmaxrwy', 'aptype',
+                'aptco', 'aptelev', 'aptindex', 'aptspatial'),
+        'fir': ('fir', 'firlat0', 'firlon0', 'firlat1', 'firlon1', 'firindex'),
+        'co':  ('coname', 'cocode2', 'cocode3', 'conr'),
+        'rwy': ('rwythresholds',)
+    }
+
+    # Component of each member
+    members = {member: component for component, members in components.items()
+               for member in members}
+
     def __init__(self):
         """The navigation database: Contains waypoint, airport, airway, and sector data, but also
            geographical graphics data."""
-        # Variables are initialized in reset()
-        self.reset()
+        # Components are loaded on first access, see __getattr__
+
+    def __getattr__(self, name):
+        # Only called when name is not (yet) an attribute: load its component
+        component = Navdatabase.members.get(name)
+        if component is None:
+            raise AttributeError("'Navdatabase' object has no attribute '{}'".format(name))
+        getattr(self, 'load_' + component)()
+        return self.__dict__[name]
 
     def reset(self):
-        print("Loading global navigation database...")
-        wptdata, aptdata, awydata, firdata, codata, rwythresholds = load_navdata()
+        """Remove the waypoints that were added with DEFWPT. The loaded
+           components are kept."""
+        if 'wpid' not in self.__dict__:
+            return
+        # Number of waypoints in the database itself
+        n = self.wpspatial.n
+        for name in set(self.wpid[n:]):
+            idx = [i for i in self.wpindex[name] if i < n]
+            if idx:
+                self.wpindex[name] = idx
+            else:
+                del self.wpindex[name]
+        for member in (self.wpid, self.wptype, self.wpelev, self.wpvar,
+                       self.wpfreq, self.wpdesc):
+            del member[n:]
+        self.wplat = self.wplat[:n]
+        self.wplon = self.wplon[:n]
+
+    def load_wpt(self):
+        wptdata, self.wpspatial = load_navdata('wpt')
 
         # Get waypoint data
         self.wpid     = wptdata['wpid']       # identifier (string)
@@ -58,6 +111,12 @@ class Navdatabase:
         self.wpfreq   = wptdata['wpfreq']       # frequency [kHz/MHz]
         self.wpdesc   = wptdata['wpdesc']     # description
 
+        # Name index: identifier -> list of indices in the data lists
+        self.wpindex  = indexdict(self.wpid)
+
+    def load_awy(self):
+        awydata, self.awgraph = load_navdata('awy')
+
         # Get airway legs data
         self.awfromwpid = awydata['awfromwpid']  # identifier (string)
         self.awfromlat  = awydata['awfromlat']   # latitude [deg]
@@ -70,6 +129,11 @@ class Navdatabase:
         self.awlowfl    = awydata['awlowfl']     # lower flight level (int)
         self.awupfl     = awydata['awupfl']      # upper flight level (int)
 
+        self.awindex    = indexdict(self.awid)
+
+    def load_apt(self):
+        aptdata, self.aptspatial = load_navdata('apt')
+
         # Get airpoint data
         self.aptid     = aptdata['apid']      # 4 char identifier (string)
         self.aptname   = aptdata['apname']    # full name
@@ -80,12 +144,21 @@ class Navdatabase:
         self.aptco     = aptdata['apco']      # two char country code (string)
         self.aptelev   = aptdata['apelev']    # field elevation in meters [m] above mean sea level
 
+        self.aptindex  = indexdict(self.aptid)
+
+    def load_fir(self):
+        firdata = load_navdata('fir')
+
         # Get FIR data
         self.fir      = firdata['fir']        # fir name
         self.firlat0  = firdata['firlat0']    # start lat of a line of border
         self.firlon0  = firdata['firlon0']    # start lon of a line of border
         self.firlat1  = firdata['firlat1']    # end lat of a line of border
         self.firlon1  = firdata['firlon1']    # end lon of a line of border
+        self.firindex = PolygonIndex([(lat, lon) for _, lat, lon in self.fir])
+
+    def load_co(self):
+        codata = load_navdata('co')
 
         # Get country code data
         self.coname   = codata['coname']      # country full name
@@ -93,7 +166,8 @@ class Navdatabase:
         self.cocode3  = codata['cocode3']     # country code A3 (asscii2) 3 chars
         self.conr     = codata['conr']        # country icao number
 
-        self.rwythresholds = rwythresholds
+    def load_rwy(self):
+        self.rwythresholds = load_rwythresholds()
 
     def defwpt(self,name=None,lat=None,lon=None,wptype=None):
 
@@ -106,7 +180,7 @@ class Navdatabase:
         # No data: give info on waypoint
         elif lat==None or lon==None:
             reflat, reflon = bs.scr.getviewctr()
-            if self.wpid.count(name.upper()) > 0:
+            if name.upper() in self.wpindex:
                 i = self.getwpidx(name.upper(),reflat,reflon)
                 txt = self.wpid[i]+" : "+str(self.wplat[i])+","+str(self.wplon[i])
                 if len(self.wptype[i]+self.wpco[i])>0:
@@ -118,6 +192,7 @@ class Navdatabase:
                 return True,"Waypoint "+name.upper()+" does not yet exist."
 
         # Still here? So there is data, then we add this waypoint
+        self.wpindex.setdefault(name.upper(), []).append(len(self.wpid))
         self.wpid.append(name.upper())
         self.wplat = np.append(self.wplat,lat)
         self.wplon = np.append(self.wplon,lon)
@@ -139,82 +214,41 @@ class Navdatabase:
 
     def getwpidx(self, txt, reflat=999999., reflon=999999):
         """Get waypoint index to access data"""
-        name = txt.upper()
-        try:
-            i = self.wpid.index(name)
-        except:
+        idx = self.wpindex.get(txt.upper())
+        if idx is None:
             return -1
 
-        # if no pos is specified, get first occurence
-        if not reflat < 99999.:
-            return i
+        # if no pos is specified, or there is only one, get first occurence
+        if not reflat < 99999. or len(idx) == 1:
+            return idx[0]
 
-        # If pos is specified check for more and return closest
-        else:
-            idx = []
-            idx.append(i)
-            found = True
-            while i < len(self.wpid) - 1 and found:
-                try:
-                    i = self.wpid.index(name, i + 1)
-                    idx.append(i)
-                except:
-                    found = False
-            if len(idx) == 1:
-                return idx[0]
-            else:
-                imin = idx[0]
-                dmin = geo.kwikdist(reflat, reflon, self.wplat[imin], self.wplon[imin])
-                for i in idx[1:]:
-                    d = geo.kwikdist(reflat, reflon, self.wplat[i], self.wplon[i])
-                    if d < dmin:
-                        imin = i
-                        dmin = d
-                return imin
+        # If pos is specified return the closest
+        dist = geo.kwikdist(reflat, reflon, self.wplat[idx], self.wplon[idx])
+        return idx[np.argmin(dist)]
 
     def getwpindices(self, txt, reflat=999999., reflon=999999,crit=1852.0):
         """Get waypoint index to access data"""
-        name = txt.upper()
-        try:
-            i = self.wpid.index(name)
-        except:
+        idx = self.wpindex.get(txt.upper())
+        if idx is None:
             return [-1]
 
-        # if no pos is specified, get first occurence
-        if not reflat < 99999.:
-            return [i]
+        # if no pos is specified, or there is only one, get first occurence
+        if not reflat < 99999. or len(idx) == 1:
+            return [idx[0]]
 
-        # If pos is specified check for more and return closest
-        else:
-            idx = findall(self.wpid,name) # find indices of al occurences
+        # If pos is specified find the closest
+        dist = geo.kwikdist(reflat, reflon, self.wplat[idx], self.wplon[idx])
+        imin = idx[np.argmin(dist)]
 
-            if len(idx) == 1:
-                return [idx[0]]
-            else:
-                imin = idx[0]
-                dmin = geo.kwikdist(reflat, reflon, self.wplat[imin], self.wplon[imin])
-                for i in idx[1:]:
-                    d = geo.kwikdist(reflat, reflon, self.wplat[i], self.wplon[i])
-                    if d < dmin:
-                        imin = i
-                        dmin = d
-                # Find co-located
-                indices = [imin]
-                for i in idx:
-                    if i!=imin:
-                        dist = nm*geo.kwikdist(self.wplat[i], self.wplon[i], \
-                                            self.wplat[imin], self.wplon[imin])
-                        if dist<=crit:
-                            indices.append(i)
-
-                return indices
+        # Find co-located
+        dist = nm * geo.kwikdist(self.wplat[imin], self.wplon[imin],
+                                 self.wplat[idx], self.wplon[idx])
+        return [imin] + [i for i, d in zip(idx, dist) if i != imin and d <= crit]
 
     def getaptidx(self, txt):
         """Get waypoint index to access data"""
-        try:
-            return self.aptid.index(txt.upper())
-        except:
-            return -1
+        idx = self.aptindex.get(txt.upper())
+        return -1 if idx is None else idx[0]
 
     def getinear(self, wlat, wlon, lat, lon):  # lat,lon in degrees
         # t0 = time.clock()
@@ -228,12 +262,12 @@ class Navdatabase:
         return idx
 
     def getwpinear(self, lat, lon):  # lat,lon in degrees
-        """Get closest waypoint index"""
-        return self.getinear(self.wplat, self.wplon, lat, lon)
+        """Get closest waypoint index (array of indices for arrays of lat,lon)"""
+        return self.wpspatial.nearest(self.wplat, self.wplon, lat, lon)
 
     def getapinear(self, lat, lon):  # lat,lon in degrees
-        """Get closest airport index"""
-        return self.getinear(self.aptlat, self.aptlon, lat, lon)
+        """Get closest airport index (array of indices for arrays of lat,lon)"""
+        return self.aptspatial.nearest(self.aptlat, self.aptlon, lat, lon)
 
     def getinside(self, wlat, wlon, lat0, lat1, lon0, lon1):
         """Get indices inside given box"""
@@ -249,128 +283,40 @@ class Navdatabase:
 
     def getwpinside(self, lat0, lat1, lon0, lon1):
         """Get waypoint indices inside box"""
-        return self.getinside(self.wplat, self.wplon, lat0, lat1, lon0, lon1)
+        return self.wpspatial.inside(self.wplat, self.wplon, lat0, lat1, lon0, lon1)
 
     def getapinside(self, lat0, lat1, lon0, lon1):
         """Get airport indicex inside box"""
-        return self.getinside(self.aptlat, self.aptlon, lat0, lat1, lon0, lon1)
-
-    # returns all runways of given airport
-    def listairway(self, airwayid):
-        awkey = airwayid.upper()
-
-        airway = []     # identifier of waypoint   0 .. N-1
+        return self.aptspatial.inside(self.aptlat, self.aptlon, lat0, lat1, lon0, lon1)
 
-        # Does this airway exist?
-        if self.awid.count(awkey)>0:
-            # Collect leg indices
-            i = 0
-            found = True
-            legs  = []  # Alle leg incl. duplicate legs
-            left  = []  # wps in left column in file
-            right = []  # wps in right coumn in file
+    def getfiridx(self, lat, lon):
+        """Get index of the FIR that contains lat,lon (-1 if none; array of
+           indices for arrays of lat,lon)"""
+        return self.firindex.query(lat, lon)
 
-            idx = findall(self.awid,awkey)
-            for i in idx:
-                newleg = self.awfromwpid[i]+"-"+self.awtowpid[i]
-                if newleg not in legs:
-                    legs.append(newleg)
-                    left.append(self.awfromwpid[i])
-                    right.append(self.awtowpid[i])
-
-            # Not found: return
-            if len(legs)==0:
-                return []
-
-            # Count wps to see when we have all segments
-            unused =  len(left)+len(right)
-
-            while unused>0 and not left==len(left)*[""]:
-
-                # Find start of a segment
-                wps  = left+right
-                iwps = 0
-                while iwps<len(wps) and wps.count(wps[iwps])>1:
-                    iwps = iwps + 1
-
-                i = iwps%len(left)
-                j = int(iwps/len(left))
-
-                # Catch single lost wps
-                if j>1 or iwps>len(wps):
-                    break
-
-                # Sort
-                wps = [left,right]
-                segment = []
-
-                segready = False
-                while not segready:
-
-                    # Get leg
-                    curwp  = wps[j][i]
-                    nextwp = wps[1-j][i]
-
-                    # Update admin of to do wplist
-                    unused      = unused - 2
-                    wps[j][i]   = ""
-                    wps[1-j][i] = ""
-
-                    # Add first wp to segment
-                    segment.append(curwp)
-
-                    # Find next lef with nextwp
-                    if wps[0].count(nextwp)>0:
-                        j  = 0
-                        i  = wps[0].index(nextwp)
-                        found = True
-
-                    elif wps[1].count(nextwp)>0:
-                        i  = wps[1].index(nextwp)
-                        j  = 1
-                        found = True
-                    else:
-                        found = False
-
-                    # This segemnt done?
-                    segready = (not found) or curwp=="" or nextwp==""
-
-                # Also add final nextwp of this segment
-                segment.append(nextwp)
-
-                # Airway cab have multiple separate segments
-                airway.append(segment)
-
-                # Ready for next segment
-                left  = wps[0]
-                right = wps[1]
-
-
-        return airway #,connect
+    def listairway(self, airwayid):
+        """Return the segments of an airway, as lists of waypoint identifiers"""
+        return [[self.awgraph.nodeid[i] for i in segment]
+                for segment in self.awgraph.segments(airwayid.upper())]
+
+    def expandairway(self, airwayid, fromwpid, towpid):
+        """Return the waypoint identifiers along an airway from waypoint fromwpid
+           to towpid (both included), or an empty list if the airway does not
+           connect them"""
+        for segment in self.listairway(airwayid):
+            if fromwpid.upper() in segment and towpid.upper() in segment:
+                i = segment.index(fromwpid.upper())
+                j = segment.index(towpid.upper())
+                return segment[i:j + 1] if i <= j else segment[j:i + 1][::-1]
+        return []
 
     def listconnections(self, wpid,wplat,wplon):
-
-        # Return list of connecting airway legs
+        """Return the airway legs from a waypoint, as a list of [awid, wpid]"""
+        graph = self.awgraph
         connect = []
-
-        # Check from-list first
-        if wpid in self.awfromwpid:
-            idx = findall(self.awfromwpid,wpid)
-            for i in idx:
-                newitem = [self.awid[i],self.awtowpid[i]]
-                if (newitem not in connect) and \
-                         geo.kwikdist(self.awfromlat[i],self.awfromlon[i],
-                                  wplat,wplon) < 10.:
-                    connect.append(newitem)
-
-        # Check to-list nextt
-        if wpid in self.awtowpid:
-            idx = findall(self.awtowpid,wpid)
-            for i in idx:
-                newitem = [self.awid[i],self.awfromwpid[i]]
-                if (newitem not in connect) and \
-                         geo.kwikdist(self.awtolat[i],self.awtolon[i],
-                                  wplat,wplon) < 10.:
-                    connect.append(newitem)
+        for i in graph.connections(wpid, wplat, wplon):
+            newitem = [graph.awids[graph.connaw[i]], graph.nodeid[graph.conn[i]]]
+            if newitem not in connect:
+                connect.append(newitem)
 
         return connect # return list of [awid,wpid]
@@ -0,0 +1,93 @@
+''' Static spatial index of navigation database points. '''
+import numpy as np
+
+# Number of rows and columns of the one-degree bucket grid
+NROWS = 180
+NCOLS = 360
+
+
+def sphere_xyz(lat, lon):
+    ''' Return the coordinates of lat/lon [deg] on the unit sphere. '''
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    coslat = np.cos(lat)
+    return np.stack((coslat * np.cos(lon), coslat * np.sin(lon), np.sin(lat)), axis=-1)
+
+
+def cellrow(lat):
+    ''' Row of latitude lat [deg] in the bucket grid. '''
+    return np.clip(np.floor(lat).astype(int) + 90, 0, NROWS - 1)
+
+
+def cellcol(lon):
+    ''' Column of longitude lon [deg] in the bucket grid. '''
+    return np.floor((np.asarray(lon) + 180.0) % 360.0).astype(int) % NCOLS
+
+
+class PointIndex:
+    ''' Spatial index of a static set of lat/lon points, for nearest-point
+        and box queries.
+
+        Box queries use a one-degree lat/lon bucket grid: the point indices
+        sorted by grid cell (order), and the start of each cell in this
+        list (cellstart). Nearest-point queries use a KD-tree on the
+        unit-sphere coordinates of the points, so that the closest point by
+        great-circle distance is found. The KD-tree is built on the first
+        nearest-point query. Points that are added after the index is built
+        (such as DEFWPT waypoints) are checked separately. '''
+    def __init__(self, order, cellstart):
+        self.n         = len(order)
+        self.order     = order
+        self.cellstart = cellstart
+        self.tree      = None
+
+    @classmethod
+    def build(cls, lat, lon):
+        ''' Build the spatial index of points lat, lon. '''
+        cell = cellrow(lat) * NCOLS + cellcol(lon)
+        order = np.argsort(cell, kind='stable')
+        return cls(order, np.searchsorted(cell[order], np.arange(NROWS * NCOLS + 1)))
+
+    def columns(self):
+        ''' The arrays of this index, to store in a cache. '''
+        return dict(order=self.order, cellstart=self.cellstart)
+
+    def nearest(self, wlat, wlon, lat, lon):
+        ''' Return the index of the point in wlat, wlon closest to lat, lon.
+            When lat and lon are arrays, an array of indices is returned. '''
+        if self.tree is None:
+            from scipy.spatial import cKDTree
+            self.tree = cKDTree(sphere_xyz(wlat[:self.n], wlon[:self.n]))
+        xyz = sphere_xyz(lat, lon)
+        dist, idx = self.tree.query(xyz)
+        # Check the points added after building the index
+        if len(wlat) > self.n:
+            dnew = np.linalg.norm(sphere_xyz(wlat[self.n:], wlon[self.n:]) -
+                                  xyz[..., np.newaxis, :], axis=-1)
+            inew = np.argmin(dnew, axis=-1)
+            closer = np.take_along_axis(dnew, inew[..., np.newaxis], -1)[..., 0] < dist
+            idx = np.where(closer, inew + self.n, idx)
+        return idx if np.ndim(idx) else int(idx)
+
+    def inside(self, wlat, wlon, lat0, lat1, lon0, lon1):
+        ''' Return the indices of the points in wlat, wlon inside the box
+            with latitudes between lat0 and lat1, and longitudes from lon0
+            eastwards to lon1. '''
+        latmin, latmax = min(lat0, lat1), max(lat0, lat1)
+        c0, c1 = cellcol(lon0), cellcol(lon1)
+        colranges = [(c0, c1)] if c0 <= c1 else [(c0, NCOLS - 1), (0, c1)]
+        candidates = [self.order[self.cellstart[row * NCOLS + cfirst]:
+                                 self.cellstart[row * NCOLS + clast + 1]]
+                      for row in range(cellrow(latmin), cellrow(latmax) + 1)
+                      for cfirst, clast in colranges]
+        candidates.append(np.arange(self.n, len(wlat)))
+        idx = np.sort(np.concatenate(candidates))
+
+        # Exact check of the candidates
+        lat, lon = wlat[idx], wlon[idx]
+        inlat = (lat > latmin) & (lat < latmax)
+        if lon0 <= lon1:
+            inlon = (lon > lon0) & (lon < lon1)
+        else:
+            inlon = (lon > lon0) | (lon < lon1)
+        return list(idx[inlat & inlon])
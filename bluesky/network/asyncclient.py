@@ -0,0 +1,103 @@
+''' BlueSky client with an asyncio request/response interface. '''
+import asyncio
+from itertools import count
+
+import zmq
+
+from bluesky.network.client import Client
+
+
+class AsyncClient(Client):
+    ''' Client that tags its requests with a request id, which the simulation
+        node copies into its reply. This allows many requests to be in
+        flight at the same time, each of which can be awaited individually.
+
+        Example:
+            client = AsyncClient()
+            client.connect(event_port=9000, stream_port=9001)
+            replies = await asyncio.gather(*(client.stack(cmd) for cmd in cmds))
+    '''
+    def __init__(self, actnode_topics=b''):
+        super(AsyncClient, self).__init__(actnode_topics)
+        self.reqids = count(1)
+        self.pending = dict()
+        self.loop = None
+        self.actnode_known = None
+
+    def attach(self, loop=None):
+        ''' Let the event loop process incoming data of this client. This is
+            done automatically for the running loop at the first request. '''
+        self.loop = loop or asyncio.get_event_loop()
+        self.actnode_known = asyncio.Event()
+        if self.act:
+            self.actnode_known.set()
+        for sock in (self.event_io, self.stream_in):
+            self.loop.add_reader(sock.getsockopt(zmq.FD), self.drain)
+        # Data may have arrived before attaching
+        self.loop.call_soon(self.drain)
+
+    def detach(self):
+        ''' Stop processing incoming data in the event loop, and cancel
+            all pending requests. '''
+        for sock in (self.event_io, self.stream_in):
+            self.loop.remove_reader(sock.getsockopt(zmq.FD))
+        for fut in self.pending.values():
+            fut.cancel()
+        self.pending.clear()
+        self.loop = None
+
+    def drain(self):
+        ''' Receive all available data. The zmq file descriptors only signal
+            a change in state, so keep receiving until nothing is left. '''
+        while self.event_io.getsockopt(zmq.EVENTS) & zmq.POLLIN or \
+                self.stream_in.getsockopt(zmq.EVENTS) & zmq.POLLIN:
+            self.receive(0)
+
+    def event(self, name, data, sender_id):
+        ''' Pass replies to their pending requests, and all other events
+            to the default event handler. '''
+        fut = self.pending.pop(data.get('reqid'), None) if isinstance(data, dict) else None
+        if fut is None:
+            super(AsyncClient, self).event(name, data, sender_id)
+        elif not fut.done():
+            fut.set_result(data)
+
+    def actnode_changed(self, newact):
+        if self.actnode_known is not None:
+            self.actnode_known.set()
+
+    async def request(self, name, data=None, target=None, timeout=None):
+        ''' Send event name with dict data to target (the active node if not
+            given), and wait for its reply. Raises asyncio.TimeoutError if
+            no reply is received within timeout seconds. '''
+        if self.loop is None:
+            self.attach()
+        if not target:
+            # Wait until the server has told us which nodes there are
+            await asyncio.wait_for(self.actnode_known.wait(), timeout)
+        reqid = next(self.reqids)
+        fut = self.loop.create_future()
+        self.pending[reqid] = fut
+        self.send_event(name, dict(data or {}, reqid=reqid), target)
+        # Outgoing messages can change the state of the zmq sockets
+        self.loop.call_soon(self.drain)
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            self.pending.pop(reqid, None)
+
+    async def stack(self, cmdline, target=None, timeout=None):
+        ''' Execute a stack command, and return its reply:
+            dict(text=..., flags=...). '''
+        return await self.request(b'STACKCMD', dict(cmd=cmdline), target, timeout)
+
+    async def getstate(self, varnames, acids=None, area=None, target=None, timeout=None):
+        ''' Get traffic variables varnames, for all aircraft, or only for
+            those in acids and/or inside area. When area does not exist,
+            the reply has no variables, and an error field. '''
+        data = dict(vars=varnames)
+        if acids is not None:
+            data['acids'] = acids
+        if area:
+            data['area'] = area
+        return await self.request(b'GETSTATE', data, target, timeout)
@@ -7,6 +7,7 @@ import time
 import zmq
 
 import bluesky
+from bluesky.network import sharedstream
 from bluesky.network.common import get_hexid
 from bluesky.network.discovery import Discovery
 from bluesky.network.npcodec import encode_ndarray, decode_ndarray
@@ -27,6 +28,10 @@ class Client(object):
         self.actroute = []
         self.acttopics = actnode_topics
         self.discovery = None
+        # Readers of shared-memory streams of nodes on this host
+        self.shm_readers = dict()
+        # Shared-memory segments that can't be read by this client
+        self.shm_failed = set()
 
         # Signals
         self.nodes_changed = Signal()
@@ -135,8 +140,12 @@ class Client(object):
 
                 strmname = msg[0][:-5]
                 sender_id = msg[0][-5:]
-                pydata = msgpack.unpackb(msg[1], object_hook=decode_ndarray, encoding='utf-8')
-                self.stream(strmname, pydata, sender_id)
+                # Stream data can also be passed through shared memory
+                data = self.read_shm(strmname, sender_id, *msgpack.unpackb(msg[1], encoding='utf-8')) \
+                    if msg[2:] == [b'SHM'] else msg[1]
+                if data is not None:
+                    pydata = msgpack.unpackb(data, object_hook=decode_ndarray, encoding='utf-8')
+                    self.stream(strmname, pydata, sender_id)
 
             # If we are in discovery mode, parse this message
             if self.discovery and socks.get(self.discovery.handle.fileno()):
@@ -146,6 +155,29 @@ class Client(object):
         except zmq.ZMQError:
             return False
 
+    def read_shm(self, strmname, sender_id, name, seq):
+        ''' Read stream data with sequence number seq from shared-memory
+            segment name. Returns None if the data is not available. When
+            the segment can't be opened, e.g., because the sending node runs
+            on another host, the node is asked to send this stream over
+            the network instead. '''
+        reader = self.shm_readers.get(name)
+        if reader is None:
+            try:
+                if not sharedstream.available():
+                    raise ValueError('shared memory is not supported')
+                reader = sharedstream.SharedStreamReader(name)
+            except (FileNotFoundError, ValueError) as e:
+                if name not in self.shm_failed:
+                    self.shm_failed.add(name)
+                    print('Cannot read shared-memory stream {} ({}), requesting it '
+                          'over the network'.format(strmname.decode(), e))
+                    target = sender_id if self._getroute(sender_id) is not None else b'*'
+                    self.send_event(b'SHMFALLBACK', strmname.decode(), target)
+                return None
+            self.shm_readers[name] = reader
+        return reader.read(seq)
+
     def _getroute(self, target):
         for srv in self.servers.values():
             if target in srv['nodes']:
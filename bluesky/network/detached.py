@@ -1,5 +1,6 @@
 """ Node encapsulates the sim process, and manages process I/O. """
 import os
+import time
 import bluesky
 from bluesky.tools import Timer
 
@@ -20,6 +21,11 @@ class Node(object):
         ''' Perform one iteration step. Reimplemented in Simulation. '''
         pass
 
+    def step_remainder(self):
+        ''' Time [s] until the next iteration step is due. Reimplemented
+            in Simulation. '''
+        return 0.0
+
     def start(self):
         ''' Starting of main loop. '''
         print('Node started, id={}'.format(self.node_id))
@@ -34,12 +40,22 @@ class Node(object):
     def run(self):
         ''' Start the main loop of this node. '''
         while self.running:
+            # Without incoming events there is nothing to wait for
+            # other than the next step
+            remainder = self.step_remainder()
+            if remainder > 0.0:
+                time.sleep(remainder)
+
             # Perform a simulation step
             self.step()
 
             # Process timers
             Timer.update_timers()
 
+    def receive(self):
+        ''' A detached node has no incoming events. '''
+        pass
+
     def addnodes(self, count=1):
         pass
 
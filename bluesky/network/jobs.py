@@ -0,0 +1,135 @@
+''' Batch job management of the BlueSky simulation server.
+
+    The scenarios of a batch are scheduled as jobs over the available
+    simulation nodes. Jobs are started longest-first, using a cost estimate
+    of each scenario, to avoid expensive scenarios delaying the end of the
+    batch. Jobs of nodes that die are retried on another node, and when all
+    jobs are finished a summary of the batch is written to the log path.
+'''
+import os
+import time
+from datetime import datetime
+
+from bluesky import settings
+
+# Register settings defaults
+settings.set_variable_defaults(log_path='output', batch_maxretries=1)
+
+# Job states
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+def estimate_cost(scentime, scencmd):
+    ''' Estimate the computational cost of a scenario: the number of
+        aircraft it creates, times its duration in simulated seconds. '''
+    nac = 0
+    for cmd in scencmd:
+        words = cmd.replace(',', ' ').split()
+        if not words:
+            continue
+        name = words[0].upper()
+        if name == 'CRE':
+            nac += 1
+        elif name == 'MCRE':
+            try:
+                nac += int(words[1])
+            except (IndexError, ValueError):
+                nac += 1
+    duration = scentime[-1] if scentime else 0.0
+    return max(1, nac) * max(1.0, duration)
+
+
+class Job(object):
+    ''' A single scenario of a batch. '''
+    def __init__(self, scen):
+        self.scen = scen
+        self.name = scen['name']
+        self.cost = estimate_cost(scen['scentime'], scen['scencmd'])
+        self.status = QUEUED
+        self.worker_id = None
+        self.attempts = 0
+        self.tstart = 0.0
+        self.tend = 0.0
+        self.simt = 0.0
+
+    @property
+    def walltime(self):
+        ''' Wall-clock duration [s] of the (last) run of this job. '''
+        if self.status == RUNNING:
+            return time.time() - self.tstart
+        return self.tend - self.tstart
+
+
+class JobManager(object):
+    ''' Keeps track of the jobs of a batch. '''
+    def __init__(self):
+        self.jobs = []
+        self.running = dict()
+        self.tstart = 0.0
+
+    def add(self, scenarios):
+        ''' Add the scenarios of a batch as new jobs. '''
+        if not self.jobs or self.finished():
+            # A new batch: start with a clean administration
+            self.jobs = []
+            self.tstart = time.time()
+        self.jobs.extend(Job(scen) for scen in scenarios)
+        # Schedule the most expensive scenarios first
+        self.jobs.sort(key=lambda job: job.cost, reverse=True)
+
+    def nqueued(self):
+        ''' Number of jobs waiting for a node. '''
+        return sum(1 for job in self.jobs if job.status == QUEUED)
+
+    def finished(self):
+        ''' Returns True when all jobs are either done or failed. '''
+        return all(job.status in (DONE, FAILED) for job in self.jobs)
+
+    def start(self, worker_id):
+        ''' Start the most expensive queued job on worker_id. Returns the
+            scenario of this job, or None if no job is waiting. '''
+        for job in self.jobs:
+            if job.status == QUEUED:
+                job.status = RUNNING
+                job.worker_id = worker_id
+                job.attempts += 1
+                job.tstart = time.time()
+                self.running[worker_id] = job
+                return job.scen
+        return None
+
+    def stop(self, worker_id, simt=0.0):
+        ''' The job on worker_id has finished. Returns the finished job, or
+            None if worker_id wasn't running a job. '''
+        job = self.running.pop(worker_id, None)
+        if job:
+            job.status = DONE
+            job.tend = time.time()
+            job.simt = simt
+        return job
+
+    def worker_died(self, worker_id):
+        ''' Requeue the job of a node that died, or mark it as failed if it
+            has used up its retries. Returns the job, or None if worker_id
+            wasn't running a job. '''
+        job = self.running.pop(worker_id, None)
+        if job:
+            job.tend = time.time()
+            job.status = QUEUED if job.attempts <= settings.batch_maxretries else FAILED
+        return job
+
+    def summary(self, fname=''):
+        ''' Write a summary of all jobs to a csv file. Returns the filename. '''
+        if not fname:
+            timestamp = datetime.now().strftime('%Y%m%d_%H-%M-%S')
+            fname = os.path.join(settings.log_path, 'BATCH_{}.csv'.format(timestamp))
+        if os.path.dirname(fname):
+            os.makedirs(os.path.dirname(fname), exist_ok=True)
+        with open(fname, 'w') as f:
+            f.write('# Batch summary: {} jobs, total wall time {:.2f} s\n'.format(
+                len(self.jobs), time.time() - self.tstart))
+            f.write('# scenario, status, attempts, cost estimate, wall time [s], simulated time [s]\n')
+            for job in self.jobs:
+                f.write('{}, {}, {}, {:.0f}, {:.2f}, {:.2f}\n'.format(
+                    job.name, job.status, job.attempts, job.cost, job.walltime, job.simt))
+        return fname
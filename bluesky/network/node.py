@@ -5,10 +5,11 @@ import msgpack
 import zmq
 
 import bluesky
-from bluesky import stack
+from bluesky import stack, settings
+from bluesky.network import sharedstream
 from bluesky.network.common import get_hexid
 from bluesky.network.npcodec import encode_ndarray, decode_ndarray
-from bluesky.tools import Timer
+from bluesky.tools import Timer, tracer
 
 
 class Node(object):
@@ -19,8 +20,14 @@ class Node(object):
         ctx = zmq.Context.instance()
         self.event_io = ctx.socket(zmq.DEALER)
         self.stream_out = ctx.socket(zmq.PUB)
+        self.poller = zmq.Poller()
         self.event_port = event_port
         self.stream_port = stream_port
+        # Shared-memory ring buffers for streams to same-host clients
+        self.shm_writers = dict()
+        # Streams that are sent over the network, because a client
+        # couldn't read them from shared memory
+        self.shm_disabled = set()
         # Tell bluesky that this client will manage the network I/O
         bluesky.net = self
 
@@ -32,6 +39,11 @@ class Node(object):
         ''' Perform one iteration step. Reimplemented in Simulation. '''
         pass
 
+    def step_remainder(self):
+        ''' Time [s] until the next iteration step is due. Reimplemented
+            in Simulation. '''
+        return 0.0
+
     def start(self):
         ''' Starting of main loop. '''
         # Final Initialization
@@ -39,15 +51,21 @@ class Node(object):
         self.event_io.setsockopt(zmq.IDENTITY, self.node_id)
         self.event_io.connect('tcp://localhost:{}'.format(self.event_port))
         self.stream_out.connect('tcp://localhost:{}'.format(self.stream_port))
+        self.poller.register(self.event_io, zmq.POLLIN)
 
         # Start communication, and receive this node's ID
-        self.send_event(b'REGISTER')
+        # The server uses the process id to check if this node is still alive
+        self.send_event(b'REGISTER', os.getpid())
         self.host_id = self.event_io.recv_multipart()[0]
         print('Node started, id={}'.format(get_hexid(self.node_id)))
 
         # run() implements the main loop
         self.run()
 
+        # Remove the shared-memory stream buffers of this node
+        for writer in self.shm_writers.values():
+            writer.close()
+
     def quit(self):
         ''' Quit the simulation process. '''
         self.running = False
@@ -56,33 +74,84 @@ class Node(object):
     def run(self):
         ''' Start the main loop of this node. '''
         while self.running:
-            # Get new events from the I/O thread
-            # while self.event_io.poll(0):
-            if self.event_io.getsockopt(zmq.EVENTS) & zmq.POLLIN:
-                msg = self.event_io.recv_multipart()
-                route, eventname, data = msg[:-2], msg[-2], msg[-1]
-                # route back to sender is acquired by reversing the incoming route
-                route.reverse()
-                if eventname == b'QUIT':
-                    self.quit()
-                else:
-                    pydata = msgpack.unpackb(data, object_hook=decode_ndarray, encoding='utf-8')
-                    self.event(eventname, pydata, route)
-            # Perform a simulation step
-            self.step()
+            # Block on incoming events until either the next step
+            # or the next timer is due
+            timeout = max(0.0, min(self.step_remainder(), Timer.remainder()))
+            try:
+                socks = dict(self.poller.poll(
+                    None if timeout == float('inf') else 1e3 * timeout))
+            except zmq.ZMQError:
+                break  # interrupted
+
+            if socks.get(self.event_io) == zmq.POLLIN:
+                self.receive()
+
+            # Perform a simulation step when it is due
+            if self.running and self.step_remainder() <= 0.0:
+                self.step()
 
             # Process timers
             Timer.update_timers()
 
+    def receive(self):
+        ''' Receive and process all pending events. '''
+        while self.running and self.event_io.getsockopt(zmq.EVENTS) & zmq.POLLIN:
+            msg = self.event_io.recv_multipart()
+            route, eventname, data = msg[:-2], msg[-2], msg[-1]
+            # route back to sender is acquired by reversing the incoming route
+            route.reverse()
+            if eventname == b'QUIT':
+                self.quit()
+            elif eventname == b'SHMFALLBACK':
+                # A client can't read this stream from shared memory
+                self.shm_fallback(msgpack.unpackb(data, encoding='utf-8').encode())
+            else:
+                tstart = tracer.begin()
+                pydata = msgpack.unpackb(data, object_hook=decode_ndarray, encoding='utf-8')
+                self.event(eventname, pydata, route)
+                tracer.end(eventname, 'receive', tstart)
+
     def addnodes(self, count=1):
         self.send_event(b'ADDNODES', count)
 
     def send_event(self, eventname, data=None, target=None):
         # On the sim side, target is obtained from the currently-parsed stack command
+        tstart = tracer.begin()
         target = target or stack.routetosender() or [b'*']
         pydata = msgpack.packb(data, default=encode_ndarray, use_bin_type=True)
         self.event_io.send_multipart(target + [eventname, pydata])
+        tracer.end(eventname, 'send', tstart)
 
     def send_stream(self, name, data):
-        self.stream_out.send_multipart(
-            [name + self.node_id, msgpack.packb(data, default=encode_ndarray, use_bin_type=True)])
+        tstart = tracer.begin()
+        pydata = msgpack.packb(data, default=encode_ndarray, use_bin_type=True)
+        writer = self.get_shm_writer(name)
+        seq = writer.write(pydata) if writer else None
+        if seq is not None:
+            # The data is in shared memory: only send a notification
+            self.stream_out.send_multipart(
+                [name + self.node_id, msgpack.packb((writer.name, seq), use_bin_type=True), b'SHM'])
+        else:
+            self.stream_out.send_multipart([name + self.node_id, pydata])
+        tracer.end(name, 'stream', tstart)
+
+    def get_shm_writer(self, name):
+        ''' Return the shared-memory writer for stream name, or None if this
+            stream is not sent through shared memory. '''
+        writer = self.shm_writers.get(name)
+        if writer is None and sharedstream.available() and \
+                name not in self.shm_disabled and \
+                name.decode() in settings.shm_streams:
+            writer = sharedstream.SharedStreamWriter(
+                sharedstream.segment_name(name, self.node_id),
+                settings.shm_nslots, settings.shm_slotsize)
+            self.shm_writers[name] = writer
+        return writer
+
+    def shm_fallback(self, name):
+        ''' Send stream name over the network from now on, for clients
+            that can't read it from shared memory. '''
+        self.shm_disabled.add(name)
+        writer = self.shm_writers.pop(name, None)
+        if writer:
+            writer.close()
@@ -0,0 +1,119 @@
+''' Recording of simulation streams.
+
+    A Recorder writes the raw multipart stream messages of a node, as they
+    are forwarded by the server, to an append-only file. Each record is
+    stored with its (wall-clock) timestamp, and its file offset is added to
+    an index file, which allows seeking by time in a recording. Recordings
+    are played back by a replay node, see bluesky.network.replay. Stream
+    data that a node passes through shared memory is read from the ring
+    buffer, and recorded as a normal stream message.
+
+    File layout:
+        data file:  per record: time (float64), nframes (uint32),
+                    and per frame: size (uint32), data
+        index file: per record: time (float64), offset (uint64)
+'''
+import struct
+import time
+
+import msgpack
+import numpy as np
+
+from bluesky.network import sharedstream
+
+RECHEADER = struct.Struct('<dI')
+FRAMEHEADER = struct.Struct('<I')
+INDEX = np.dtype([('t', '<f8'), ('offset', '<u8')])
+
+
+class Recorder(object):
+    ''' Writes stream messages to a recording file. '''
+    def __init__(self, fname):
+        self.fname = fname
+        self.datafile = open(fname, 'ab')
+        self.indexfile = open(fname + '.idx', 'ab')
+        # Readers of shared-memory streams, and segments that can't be read
+        self.shm_readers = dict()
+        self.shm_failed = set()
+
+    def write(self, msg):
+        ''' Append the multipart message msg to the recording. '''
+        if msg[2:] == [b'SHM']:
+            data = self.read_shm(*msgpack.unpackb(msg[1], encoding='utf-8'))
+            if data is None:
+                return
+            msg = [msg[0], data]
+        t = time.time()
+        offset = self.datafile.tell()
+        self.datafile.write(RECHEADER.pack(t, len(msg)))
+        for frame in msg:
+            self.datafile.write(FRAMEHEADER.pack(len(frame)))
+            self.datafile.write(frame)
+        # Only index a record once it is completely written
+        self.indexfile.write(np.array((t, offset), dtype=INDEX).tobytes())
+
+    def read_shm(self, name, seq):
+        ''' Read stream data with sequence number seq from shared-memory
+            segment name. Returns None if the data is not available. '''
+        reader = self.shm_readers.get(name)
+        if reader is None:
+            try:
+                if not sharedstream.available():
+                    raise ValueError('shared memory is not supported')
+                reader = sharedstream.SharedStreamReader(name)
+            except (FileNotFoundError, ValueError) as e:
+                if name not in self.shm_failed:
+                    self.shm_failed.add(name)
+                    print('Cannot record shared-memory stream {} ({})'.format(name, e))
+                return None
+            self.shm_readers[name] = reader
+        data = reader.read(seq)
+        if data is None:
+            print('Shared-memory stream data of {} was overwritten before it '
+                  'was recorded'.format(name))
+        return data
+
+    def close(self):
+        self.datafile.close()
+        self.indexfile.close()
+        for reader in self.shm_readers.values():
+            reader.close()
+
+
+class Recording(object):
+    ''' Read access to a recording file. '''
+    def __init__(self, fname):
+        self.index = np.fromfile(fname + '.idx', dtype=INDEX)
+        self.datafile = open(fname, 'rb')
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def times(self):
+        ''' Timestamps of all records. '''
+        return self.index['t']
+
+    @property
+    def duration(self):
+        return self.index['t'][-1] - self.index['t'][0] if len(self.index) else 0.0
+
+    def find(self, t):
+        ''' Return the index of the first record at or after time t,
+            relative to the start of the recording. '''
+        if not len(self.index):
+            return 0
+        return int(np.searchsorted(self.index['t'], self.index['t'][0] + t))
+
+    def read(self, irec):
+        ''' Read the multipart message of record irec. '''
+        self.datafile.seek(int(self.index['offset'][irec]))
+        _, nframes = RECHEADER.unpack(self.datafile.read(RECHEADER.size))
+        msg = []
+        for _ in range(nframes):
+            size, = FRAMEHEADER.unpack(self.datafile.read(FRAMEHEADER.size))
+            msg.append(self.datafile.read(size))
+        return msg
+
+    def close(self):
+        self.datafile.close()
@@ -0,0 +1,115 @@
+''' Replay node that republishes recorded simulation streams. '''
+import time
+
+from bluesky import settings
+from bluesky.network.node import Node
+from bluesky.network.recording import Recording
+
+
+class Replay(Node):
+    ''' A node that republishes a recording of simulation streams.
+        The replay is controlled with stack commands from the clients:
+        OP/HOLD, DTMULT speed, and SEEK time. '''
+    commands = {'OP': 'OP', 'HOLD': 'HOLD', 'DTMULT': 'DTMULT speed',
+                'SEEK': 'SEEK time', 'QUIT': 'QUIT'}
+
+    def __init__(self, fname, speed=1.0):
+        super(Replay, self).__init__(settings.simevent_port,
+                                     settings.simstream_port)
+        self.recording = Recording(fname)
+        self.speed = speed
+        self.paused = False
+        self.irec = 0
+        self.trec = 0.0
+        self.tsys = 0.0
+        self.seek(0.0)
+
+    def replay_time(self):
+        ''' The current time in the recording. '''
+        if self.paused:
+            return self.trec
+        return self.trec + (time.time() - self.tsys) * self.speed
+
+    def seek(self, t):
+        ''' Continue the replay at time t [s] relative to the start of the
+            recording. '''
+        self.irec = self.recording.find(t)
+        self.trec = (self.recording.times[0] if len(self.recording) else 0.0) + t
+        self.tsys = time.time()
+
+    def pause(self):
+        self.trec = self.replay_time()
+        self.paused = True
+
+    def op(self):
+        self.tsys = time.time()
+        self.paused = False
+
+    def setspeed(self, speed):
+        self.trec = self.replay_time()
+        self.tsys = time.time()
+        self.speed = speed
+
+    def step_remainder(self):
+        # Without records to publish there is only waiting for events
+        if self.paused or self.irec >= len(self.recording):
+            return float('inf')
+        return (self.recording.times[self.irec] - self.replay_time()) / self.speed
+
+    def step(self):
+        ''' Publish all records that are due. '''
+        trep = self.replay_time()
+        times = self.recording.times
+        while self.irec < len(times) and times[self.irec] <= trep:
+            msg = self.recording.read(self.irec)
+            # Publish the recorded stream as coming from this node
+            msg[0] = msg[0][:-len(self.node_id)] + self.node_id
+            self.stream_out.send_multipart(msg)
+            self.irec += 1
+
+    def stop(self):
+        self.recording.close()
+        self.quit()
+
+    def event(self, eventname, eventdata, sender_rte):
+        if eventname == b'STACKCMD':
+            # Stack commands can be tagged with a request id
+            if isinstance(eventdata, dict):
+                echo = dict(text=self.stackcmd(eventdata['cmd']), flags=0,
+                            reqid=eventdata.get('reqid'))
+            else:
+                echo = dict(text=self.stackcmd(eventdata), flags=0)
+            if self.running:
+                self.send_event(b'ECHO', echo, target=sender_rte)
+        elif eventname == b'GETSIMSTATE':
+            stackdict = {cmd: helptext[len(cmd) + 1:] for cmd, helptext in self.commands.items()}
+            simstate = dict(pan=(0.0, 0.0), zoom=1.0, stackcmds=stackdict, shapes=[])
+            self.send_event(b'SIMSTATE', simstate, target=sender_rte)
+
+    def stackcmd(self, cmdline):
+        ''' Process the replay control commands. Returns the reply text. '''
+        cmd, *args = cmdline.upper().replace(',', ' ').split() or ['']
+        try:
+            if cmd in ('OP', 'RUN', 'START', 'CONTINUE'):
+                self.op()
+            elif cmd in ('HOLD', 'PAUSE'):
+                self.pause()
+            elif cmd in ('DTMULT', 'RTF'):
+                self.setspeed(abs(float(args[0])))
+            elif cmd == 'SEEK':
+                ttxt = args[0].split(':')
+                self.seek(sum(float(v) * 60 ** i for i, v in enumerate(reversed(ttxt))))
+            elif cmd in ('QUIT', 'STOP', 'EXIT', 'END', 'CLOSE', 'Q'):
+                self.stop()
+                return ''
+            else:
+                return 'Replay: unknown command {}. Available commands: {}'.format(
+                    cmd, ', '.join(self.commands.values()))
+        except (IndexError, ValueError):
+            return 'Syntax error: ' + self.commands.get(cmd, cmd)
+
+        if not len(self.recording):
+            return 'Recording is empty'
+        return 'Replay at {:.1f} of {:.1f} seconds, {}x speed{}'.format(
+            min(self.replay_time(), self.recording.times[-1]) - self.recording.times[0],
+            self.recording.duration, self.speed, ' (hold)' if self.paused else '')
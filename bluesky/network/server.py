@@ -2,7 +2,7 @@
 import os
 import sys
 from multiprocessing import cpu_count
-from subprocess import Popen
+from subprocess import Popen, PIPE
 from threading import Thread
 
 import msgpack
@@ -12,12 +12,15 @@ import zmq
 import bluesky as bs
 from bluesky.network.common import get_hexid
 from .discovery import Discovery
+from .recording import Recorder
+from .jobs import JobManager
+from . import zygote
 
 # Register settings defaults
 bs.settings.set_variable_defaults(max_nnodes=cpu_count(),
                                   event_port=9000, stream_port=9001,
                                   simevent_port=10000, simstream_port=10001,
-                                  enable_discovery=False)
+                                  enable_discovery=False, prefork_nodes=False)
 
 
 def split_scenarios(scentime, scencmd):
@@ -36,14 +39,19 @@ class Server(Thread):
     def __init__(self, headless):
         super(Server, self).__init__()
         self.spawned_processes = list()
+        self.zygote = None
         self.running = True
         self.max_nnodes = min(cpu_count(), bs.settings.max_nnodes)
-        self.scenarios = []
+        self.jobs = JobManager()
         self.host_id = b'\x00' + os.urandom(4)
         self.clients = []
         self.workers = []
         self.servers = {self.host_id: dict(route=[], nodes=self.workers)}
         self.avail_workers = dict()
+        # Process ids of the local nodes
+        self.worker_pids = dict()
+        # Stream recorders per node
+        self.recorders = dict()
 
         if bs.settings.enable_discovery or headless:
             self.discovery = Discovery(self.host_id, is_client=False)
@@ -51,17 +59,96 @@ class Server(Thread):
             self.discovery = None
 
     def sendScenario(self, worker_id):
-        # Send a new scenario to the target sim process
-        scen = self.scenarios.pop(0)
+        # Send the next batch job to the target sim process
+        scen = self.jobs.start(worker_id)
         data = msgpack.packb(scen)
         self.be_event.send_multipart([worker_id, self.host_id, b'BATCH', data])
 
     def addnodes(self, count=1):
         ''' Add [count] nodes to this server. '''
+        if count > 0 and bs.settings.prefork_nodes and zygote.available():
+            # Fork the new nodes from a preloaded zygote process
+            if self.zygote is None or self.zygote.poll() is not None:
+                self.zygote = Popen([sys.executable, 'BlueSky.py', '--zygote'],
+                                    stdin=PIPE, universal_newlines=True)
+                self.spawned_processes.append(self.zygote)
+            self.zygote.stdin.write('{}\n'.format(count))
+            self.zygote.stdin.flush()
+            return
         for _ in range(count):
             p = Popen([sys.executable, 'BlueSky.py', '--sim'])
             self.spawned_processes.append(p)
 
+    def node_alive(self, node_id):
+        ''' Returns False if the local process of node_id has exited. '''
+        pid = self.worker_pids.get(node_id)
+        if pid is None:
+            return True
+        for p in self.spawned_processes:
+            if p.pid == pid:
+                return p.poll() is None
+        # Nodes forked by the zygote are no children of the server
+        if os.name == 'posix':
+            try:
+                os.kill(pid, 0)
+            except OSError:
+                return False
+        return True
+
+    def check_jobs(self):
+        ''' Retry the batch jobs of nodes that have died. '''
+        ndied = 0
+        for worker_id in list(self.jobs.running):
+            if self.node_alive(worker_id):
+                continue
+            ndied += 1
+            if worker_id in self.workers:
+                self.workers.remove(worker_id)
+            self.worker_pids.pop(worker_id, None)
+            self.avail_workers.pop(worker_id, None)
+            job = self.jobs.worker_died(worker_id)
+            print('Node {} died while running batch job {}: job is {}'.format(
+                get_hexid(worker_id), job.name, job.status))
+            self.job_stopped()
+        if ndied:
+            self.send_nodeschanged()
+            # Hand the requeued jobs to idle nodes, and replace the nodes that died
+            while self.avail_workers and self.jobs.nqueued():
+                worker_id, _ = self.avail_workers.popitem()
+                self.sendScenario(worker_id)
+            self.addnodes(min(ndied, self.jobs.nqueued()))
+
+    def send_nodeschanged(self):
+        ''' Notify the clients of a change in the nodes of this server. '''
+        data = msgpack.packb({self.host_id: self.servers[self.host_id]}, use_bin_type=True)
+        for client_id in self.clients:
+            self.fe_event.send_multipart([client_id, self.host_id, b'NODESCHANGED', data])
+
+    def job_stopped(self):
+        ''' Write the batch summary when the last job has stopped. '''
+        if self.jobs.finished():
+            fname = self.jobs.summary()
+            print('Batch finished, summary written to', fname)
+
+    def addreplay(self, fname):
+        ''' Start a node that replays the stream recording in fname. '''
+        p = Popen([sys.executable, 'BlueSky.py', '--replay', fname])
+        self.spawned_processes.append(p)
+
+    def record(self, node_id, fname):
+        ''' Start recording the streams of node_id to fname, or stop
+            recording when fname is empty. Returns an echo message. '''
+        recorder = self.recorders.pop(node_id, None)
+        if recorder:
+            recorder.close()
+        if not fname:
+            return 'Stopped recording' if recorder else 'Not recording'
+        try:
+            self.recorders[node_id] = Recorder(fname)
+        except OSError as e:
+            return 'Could not open recording file {}: {}'.format(fname, e.strerror)
+        return 'Recording streams of node {} to {}'.format(get_hexid(node_id), fname)
+
     def run(self):
         ''' The main loop of this server. '''
 
@@ -102,11 +189,15 @@ class Server(Thread):
 
         while self.running:
             try:
-                events = dict(poller.poll(None))
+                # While batch jobs are running, regularly check their nodes
+                events = dict(poller.poll(1000 if self.jobs.running else None))
             except zmq.ZMQError:
                 print('ERROR while polling')
                 break  # interrupted
 
+            if self.jobs.running:
+                self.check_jobs()
+
             # The socket with incoming data
             for sock, event in events.items():
                 if event != zmq.POLLIN:
@@ -130,6 +221,9 @@ class Server(Thread):
                 # Check if this is a stream message: these should be forwarded unprocessed.
                 if sock == self.be_stream:
                     self.fe_stream.send_multipart(msg)
+                    recorder = self.recorders.get(msg[0][-5:])
+                    if recorder:
+                        recorder.write(msg)
                 elif sock == self.fe_stream:
                     self.be_stream.send_multipart(msg)
                 else:
@@ -154,9 +248,8 @@ class Server(Thread):
                             src.send_multipart([sender_id, self.host_id, b'NODESCHANGED', data])
                         else:
                             self.workers.append(sender_id)
-                            data = msgpack.packb({self.host_id: self.servers[self.host_id]}, use_bin_type=True)
-                            for client_id in self.clients:
-                                dest.send_multipart([client_id, self.host_id, b'NODESCHANGED', data])
+                            self.worker_pids[sender_id] = msgpack.unpackb(data)
+                            self.send_nodeschanged()
                         continue  # No message needs to be forwarded
 
                     elif eventname == b'NODESCHANGED':
@@ -180,14 +273,41 @@ class Server(Thread):
                         self.addnodes(count)
                         continue  # No message needs to be forwarded
 
+                    elif eventname == b'RECORD':
+                        print("Server: RECORD")
+                        fname = msgpack.unpackb(data, encoding='utf-8')
+                        echomsg = self.record(sender_id, fname)
+                        # ECHO the result to the calling client
+                        eventname = b'ECHO'
+                        data = msgpack.packb(dict(text=echomsg, flags=0), use_bin_type=True)
+
+                    elif eventname == b'REPLAY':
+                        print("Server: REPLAY")
+                        fname = msgpack.unpackb(data, encoding='utf-8')
+                        if os.path.isfile(fname) and os.path.isfile(fname + '.idx'):
+                            self.addreplay(fname)
+                            echomsg = 'Starting replay node for ' + fname
+                        else:
+                            echomsg = 'Recording {} not found'.format(fname)
+                        eventname = b'ECHO'
+                        data = msgpack.packb(dict(text=echomsg, flags=0), use_bin_type=True)
+
                     elif eventname == b'STATECHANGE':
                         print("Server: STATECHANGE")
-                        state = msgpack.unpackb(data)
-                        if state < bs.OP:
+                        state = msgpack.unpackb(data, encoding='utf-8')
+                        if state['state'] < bs.OP:
+                            # A node that stops running has finished its
+                            # batch job, if it had one. A scenario that ends
+                            # with RESET ran until the time before the reset
+                            simt = state['prevsimt'] if state['state'] == bs.INIT else state['simt']
+                            job = self.jobs.stop(sender_id, simt)
+                            if job:
+                                print('Batch job {} finished in {:.2f} s'.format(job.name, job.walltime))
+                                self.job_stopped()
                             # If we have batch scenarios waiting, send
                             # the worker a new scenario, otherwise store it in
                             # the available worker list
-                            if self.scenarios:
+                            if self.jobs.nqueued():
                                 self.sendScenario(sender_id)
                             else:
                                 self.avail_workers[sender_id] = route
@@ -204,21 +324,22 @@ class Server(Thread):
                     elif eventname == b'BATCH':
                         print("Server: BATCH")
                         scentime, scencmd = msgpack.unpackb(data, encoding='utf-8')
-                        self.scenarios = [scen for scen in split_scenarios(scentime, scencmd)]
+                        scenarios = list(split_scenarios(scentime, scencmd))
                         # Check if the batch list contains scenarios
-                        if not self.scenarios:
+                        if not scenarios:
                             echomsg = 'No scenarios defined in batch file!'
                         else:
-                            echomsg = 'Found {} scenarios in batch'.format(len(self.scenarios))
+                            self.jobs.add(scenarios)
+                            echomsg = 'Found {} scenarios in batch'.format(len(scenarios))
                             # Send scenario to available nodes (nodes that are in init or hold mode):
-                            while self.avail_workers and self.scenarios:
+                            while self.avail_workers and self.jobs.nqueued():
                                 worker_id = next(iter(self.avail_workers))
                                 self.sendScenario(worker_id)
                                 self.avail_workers.pop(worker_id)
 
                             # If there are still scenarios left, determine and
                             # start the required number of local nodes
-                            reqd_nnodes = min(len(self.scenarios), max(0, self.max_nnodes - len(self.workers)))
+                            reqd_nnodes = min(self.jobs.nqueued(), max(0, self.max_nnodes - len(self.workers)))
                             self.addnodes(reqd_nnodes)
                         # ECHO the results to the calling client
                         eventname = b'ECHO'
@@ -246,6 +367,14 @@ class Server(Thread):
                     else:
                         dest.send_multipart(msg)
 
+        # Close any running recordings
+        for recorder in self.recorders.values():
+            recorder.close()
+
+        # Let the zygote quit: nodes forked from it quit by themselves
+        if self.zygote is not None:
+            self.zygote.stdin.close()
+
         # Wait for all nodes to finish
         for n in self.spawned_processes:
             n.wait()
@@ -0,0 +1,111 @@
+''' Shared-memory transport for streams between processes on the same host.
+
+    A node writes the (msgpack-encoded) stream data into a ring buffer in
+    POSIX shared memory, and only sends a small notification over ZMQ.
+    Clients on the same host map the ring buffer, and read the data directly
+    from shared memory. Each slot in the ring buffer is stamped with a
+    sequence number, so that readers can detect when a slot was overwritten
+    while it was being read.
+
+    Memory layout:
+        header: nslots (uint32), slotsize (uint32), last seq (uint64)
+        slots:  seq (uint64), size (uint64), data (slotsize bytes)
+'''
+import struct
+
+try:
+    from multiprocessing import shared_memory
+    from multiprocessing import resource_tracker
+except ImportError:
+    # Shared memory is only available in python >= 3.8
+    shared_memory = None
+
+from bluesky import settings
+from bluesky.network.common import get_hexid
+
+# Register settings defaults
+settings.set_variable_defaults(shm_streams=[], shm_nslots=4, shm_slotsize=8 << 20)
+
+HEADER = struct.Struct('<IIQ')
+SLOTHEADER = struct.Struct('<QQ')
+
+# Names of the segments created by this process
+owned_segments = set()
+
+
+def available():
+    ''' Returns True if shared memory is supported on this system. '''
+    return shared_memory is not None
+
+
+def segment_name(streamname, node_id):
+    ''' Name of the shared memory segment of stream streamname
+        of node node_id. '''
+    return 'bluesky_{}_{}'.format(get_hexid(node_id), streamname.decode().lower())
+
+
+class SharedStreamWriter(object):
+    ''' Writing end of a shared-memory stream ring buffer. '''
+    def __init__(self, name, nslots, slotsize):
+        self.nslots = nslots
+        self.slotsize = slotsize
+        self.seq = 0
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=True,
+            size=HEADER.size + nslots * (SLOTHEADER.size + slotsize))
+        HEADER.pack_into(self.shm.buf, 0, nslots, slotsize, 0)
+        owned_segments.add(self.shm.name)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, data):
+        ''' Write data to the next slot in the ring buffer. Returns the
+            sequence number of the written data, or None when the data
+            doesn't fit in a slot. '''
+        if len(data) > self.slotsize:
+            return None
+        self.seq += 1
+        offset = HEADER.size + (self.seq % self.nslots) * (SLOTHEADER.size + self.slotsize)
+        # Invalidate the slot while it is being written
+        SLOTHEADER.pack_into(self.shm.buf, offset, 0, len(data))
+        start = offset + SLOTHEADER.size
+        self.shm.buf[start:start + len(data)] = data
+        SLOTHEADER.pack_into(self.shm.buf, offset, self.seq, len(data))
+        HEADER.pack_into(self.shm.buf, 0, self.nslots, self.slotsize, self.seq)
+        return self.seq
+
+    def close(self):
+        ''' Close and remove the shared memory segment. '''
+        self.shm.close()
+        self.shm.unlink()
+        owned_segments.discard(self.shm.name)
+
+
+class SharedStreamReader(object):
+    ''' Reading end of a shared-memory stream ring buffer. '''
+    def __init__(self, name):
+        self.shm = shared_memory.SharedMemory(name=name)
+        # The segment is owned by the writing node: make sure that the
+        # resource tracker of this process doesn't remove it at exit
+        if self.shm.name not in owned_segments:
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        self.nslots, self.slotsize, _ = HEADER.unpack_from(self.shm.buf, 0)
+
+    def read(self, seq):
+        ''' Read the data with sequence number seq. Returns None when this
+            data has already been overwritten. '''
+        offset = HEADER.size + (seq % self.nslots) * (SLOTHEADER.size + self.slotsize)
+        slotseq, size = SLOTHEADER.unpack_from(self.shm.buf, offset)
+        if slotseq != seq:
+            return None
+        start = offset + SLOTHEADER.size
+        data = bytes(self.shm.buf[start:start + size])
+        # Check if the slot wasn't overwritten while copying
+        if SLOTHEADER.unpack_from(self.shm.buf, offset)[0] != seq:
+            return None
+        return data
+
+    def close(self):
+        self.shm.close()
@@ -0,0 +1,77 @@
+''' Pre-forking of simulation nodes.
+
+    Starting a simulation node as a new process means importing all
+    simulation modules and loading the navigation and performance databases,
+    which can take several seconds. A zygote process does this only once,
+    and then forks a new simulation node from its preloaded state each time
+    the server asks for one (by writing the number of nodes to the stdin of
+    the zygote). Only the simulation objects themselves, and the network
+    connection of each node, are created after forking.
+
+    Pre-forking is only available on systems that support os.fork().
+'''
+import os
+import random
+import signal
+import sys
+
+import numpy as np
+
+import bluesky as bs
+from bluesky import settings
+
+
+def available():
+    ''' Returns True if simulation nodes can be pre-forked on this system. '''
+    return hasattr(os, 'fork')
+
+
+def preload():
+    ''' Import the simulation modules, and load their read-only data. '''
+    # Importing traffic also loads the BADA and legacy performance coefficients
+    from bluesky.traffic import Traffic
+    from bluesky.simulation.qtgl import Simulation, ScreenIO
+    from bluesky import stack
+    from bluesky.tools import plugin, plotter
+    if settings.performance_model == 'openap':
+        from bluesky.traffic.performance.openap import coeff
+        coeff.get_coefficient()
+    # The navdb components are loaded on first access: load them before
+    # forking, so that all nodes share them
+    for member in ('wpid', 'aptid', 'awid', 'fir'):
+        getattr(bs.navdb, member)
+
+
+def run(scnfile=''):
+    ''' Fork a new simulation node for each request on stdin. The zygote
+        quits when its stdin is closed by the server. '''
+    # Let the OS clean up finished nodes
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    for line in sys.stdin:
+        try:
+            count = int(line)
+        except ValueError:
+            continue
+        for _ in range(count):
+            # Avoid duplicating buffered output in the child
+            sys.stdout.flush()
+            sys.stderr.flush()
+            if os.fork() == 0:
+                startnode(scnfile)
+
+
+def startnode(scnfile):
+    ''' Entry point of a forked simulation node. '''
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    sys.stdin.close()
+    # Forked nodes would otherwise all share the random state of the zygote
+    random.seed()
+    np.random.seed()
+    try:
+        bs.init_sim('sim', scnfile=scnfile)
+        bs.sim.start()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # Don't run the exit handlers inherited from the zygote
+        os._exit(0)
@@ -1,6 +1,6 @@
 import time, datetime
 import bluesky as bs
-from bluesky.tools import datalog, areafilter, plugin
+from bluesky.tools import datalog, areafilter, plugin, profiler, scheduler
 from bluesky.tools.misc import txt2tim,tim2txt
 from bluesky import stack
 from bluesky.traffic.metric import Metric
@@ -56,6 +56,7 @@ class Simulation:
         self.telnet_in   = StackTelnetServer()
 
     def update(self):
+        profiler.start_step()
 
         self.syst = time.clock()
 
@@ -106,24 +107,29 @@ class Simulation:
 
         # Always process stack
         stack.process()
+        profiler.mark('stack')
 
         if self.mode == Simulation.op:
             bs.traf.update(self.simt, self.simdt)
 
             # Update metrics
             self.metric.update()
+            profiler.mark('metric')
 
             # Update plugins
             plugin.update(self.simt)
+            profiler.mark('plugins')
 
             # Update loggers
             datalog.postupdate()
+            profiler.mark('datalog')
 
         # HOLD/Pause mode
         else:
             self.syst0 = self.syst-self.simt
             self.simdt = 0.0
 
+        profiler.end_step()
         return
 
     def scenarioInit(self, name):
@@ -140,6 +146,12 @@ class Simulation:
     def addnodes(self, count):
         return
 
+    def record(self, fname=''):
+        return False, "Record command not available in Pygame version."
+
+    def replay(self, fname):
+        return False, "Replay command not available in Pygame version."
+
     def pause(self):  # Hold mode
         self.mode  = self.hold
         self.syst0 = self.syst-self.simt
@@ -183,6 +195,7 @@ class Simulation:
     def reset(self):
         self.simt = 0.0
         self.mode = self.init
+        scheduler.reset()
         plugin.reset()
         bs.navdb.reset()
         bs.traf.reset()
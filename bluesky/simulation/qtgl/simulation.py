@@ -1,10 +1,11 @@
 import datetime
+import os
 import time
 
 # Local imports
 import bluesky as bs
 from bluesky import settings, stack
-from bluesky.tools import datalog, areafilter, plugin, plotter
+from bluesky.tools import datalog, areafilter, plugin, plotter, profiler, scheduler, Timer
 
 # Minimum sleep interval
 MINSLEEP = 1e-3
@@ -12,7 +13,8 @@ MINSLEEP = 1e-3
 onedayinsec = 24 * 3600  # [s] time of one day in seconds for clock time
 
 # Register settings defaults
-settings.set_variable_defaults(simdt=0.05, simevent_port=10000, simstream_port=10001)
+settings.set_variable_defaults(simdt=0.05, simevent_port=10000, simstream_port=10001,
+                               fast_checkpoint=0.1)
 
 
 def Simulation(detached):
@@ -42,6 +44,8 @@ def Simulation(detached):
 
             # Starting simulation time [seconds]
             self.simt = 0.0
+            # Simulation time before the last reset [seconds]
+            self.prevsimt = 0.0
 
             # Simulation timestep [seconds]
             self.simdt = settings.simdt
@@ -61,14 +65,11 @@ def Simulation(detached):
 
         def step(self):
             ''' Perform a simulation timestep. '''
-            # When running at a fixed rate, or when in hold/init,
-            # increment system time with sysdt and calculate remainder to sleep.
-            if not self.ffmode or not self.state == bs.OP:
-                remainder = self.syst - time.time()
-                if remainder > MINSLEEP:
-                    time.sleep(remainder)
-
-            elif self.ffstop is not None and self.simt >= self.ffstop:
+            # Waiting for the step to become due is done by the node's
+            # main loop, see step_remainder()
+            profiler.start_step()
+            if self.ffmode and self.state == bs.OP and \
+                    self.ffstop is not None and self.simt >= self.ffstop:
                 if self.benchdt > 0.0:
                     bs.scr.echo('Benchmark complete: %d samples in %.3f seconds.' % \
                                 (bs.scr.samplecount, time.time() - self.bencht))
@@ -77,12 +78,9 @@ def Simulation(detached):
                 else:
                     self.op()
 
-            if self.state == bs.OP:
-                # Plugins pre-update
-                plugin.preupdate(self.simt)
-
             # Update screen logic
             bs.scr.update()
+            profiler.mark('screen')
 
             # Simulation starts as soon as there is traffic, or pending commands
             if self.state == bs.INIT:
@@ -96,26 +94,14 @@ def Simulation(detached):
                         self.bencht = time.time()
 
             if self.state == bs.OP:
-                stack.checkfile(self.simt)
-
-            # Always update stack
-            stack.process()
-
-            if self.state == bs.OP:
-                bs.traf.update(self.simt, self.simdt)
-
-                # Update plugins
-                plugin.update(self.simt)
-
-                # Update Plotter
-                plotter.update(self.simt)
-
-                # Update loggers
-                datalog.postupdate()
-
-                # Update sim and UTC time for the next timestep
-                self.simt += self.simdt
-                self.utc += datetime.timedelta(seconds=self.simdt)
+                self.update()
+                # In fast-time, skip intervals in which nothing happens
+                if self.ffmode:
+                    self.skip_idle(float('inf') if self.ffstop is None else self.ffstop)
+            else:
+                # Always update stack
+                stack.process()
+                profiler.mark('stack')
 
             # Always update syst
             self.syst += self.sysdt
@@ -125,6 +111,122 @@ def Simulation(detached):
                 self.sendState()
                 self.prevstate = self.state
 
+            profiler.end_step()
+
+        def update(self):
+            ''' Perform the simulation work of one operational timestep:
+                scenario, stack, traffic, plugins, plotter and loggers. '''
+            # Plugins pre-update
+            plugin.preupdate(self.simt)
+            profiler.mark('preupdate')
+
+            stack.checkfile(self.simt)
+            stack.process()
+            profiler.mark('stack')
+
+            # The stack can have halted the simulation
+            if self.state != bs.OP:
+                return
+
+            bs.traf.update(self.simt, self.simdt)
+
+            # Update plugins
+            plugin.update(self.simt)
+            profiler.mark('plugins')
+
+            # Update Plotter
+            plotter.update(self.simt)
+            profiler.mark('plotter')
+
+            # Update loggers
+            datalog.postupdate()
+            profiler.mark('datalog')
+
+            # Update sim and UTC time for the next timestep
+            self.simt += self.simdt
+            self.utc += datetime.timedelta(seconds=self.simdt)
+
+        def run_steps(self, nsteps):
+            ''' Run nsteps simulation timesteps in fast-time, and return.
+                Returns the number of timesteps performed, which is less
+                than nsteps when the simulation is halted or stopped. '''
+            return self.run_fast(nsteps=nsteps)
+
+        def run_until(self, t):
+            ''' Run in fast-time until simulation time t, and return.
+                Returns the number of timesteps performed. '''
+            return self.run_fast(tend=t)
+
+        def run_fast(self, nsteps=None, tend=None, until=None):
+            ''' Tight fast-time loop of only the simulation work of each
+                timestep, for at most nsteps timesteps, until simulation
+                time tend, or until function until returns True. The screen,
+                timers and incoming events are only processed at
+                checkpoints, every settings.fast_checkpoint seconds of
+                wall-clock time. '''
+            if self.state == bs.INIT:
+                self.op()
+            # Avoid running one step too many due to round-off in simt
+            tend = float('inf') if tend is None else tend - 1e-6 * self.simdt
+            nsteps = float('inf') if nsteps is None else nsteps
+            nstep = 0
+            tcheck = time.perf_counter() + settings.fast_checkpoint
+            while nstep < nsteps and self.simt < tend and self.state == bs.OP:
+                profiler.start_step()
+                self.update()
+                profiler.end_step()
+                nstep += 1
+                if until is not None and until():
+                    break
+                nstep += self.skip_idle(min(tend, self.simt + (nsteps - nstep) * self.simdt))
+                if time.perf_counter() >= tcheck:
+                    self.checkpoint()
+                    tcheck = time.perf_counter() + settings.fast_checkpoint
+            self.checkpoint()
+            # Continue in real time from here
+            self.syst = time.time()
+            return nstep
+
+        def skip_idle(self, tmax):
+            ''' Without traffic, advance simulation time directly to the
+                timestep at which the stack, a plugin, or the plotter next
+                has work, but not beyond tmax. Returns the number of
+                skipped timesteps. '''
+            if bs.traf.ntraf > 0 or self.state != bs.OP:
+                return 0
+            tnext = min(stack.get_nexttime(), plugin.get_nexttime(),
+                        plotter.get_nexttime(), tmax)
+            if tnext == float('inf'):
+                return 0
+            # Stay on the grid of simulation timesteps: the first step at
+            # or after tnext is performed as it would have been without skipping
+            nskip = int((tnext - self.simt) // self.simdt)
+            if nskip > 0:
+                self.simt += nskip * self.simdt
+                self.utc += datetime.timedelta(seconds=nskip * self.simdt)
+                scheduler.skip(self.simt)
+            return max(0, nskip)
+
+        def checkpoint(self):
+            ''' Process the screen, timers, and incoming events, and report
+                state changes. Used by the fast-time loop. '''
+            bs.scr.update()
+            Timer.update_timers()
+            self.receive()
+            if not self.state == self.prevstate:
+                self.sendState()
+                self.prevstate = self.state
+
+        def step_remainder(self):
+            ''' Time [s] until the next simulation timestep is due. '''
+            # When running fast-time there is no need to wait. When running
+            # at a fixed rate, or when in hold/init, system time is
+            # incremented with sysdt, and the remainder is the time to wait.
+            if self.ffmode and self.state == bs.OP:
+                return 0.0
+            remainder = self.syst - time.time()
+            return remainder if remainder > MINSLEEP else 0.0
+
         def stop(self):
             print('SIM STOP')
             self.state = bs.END
@@ -148,11 +250,13 @@ def Simulation(detached):
         def reset(self):
             self.state = bs.INIT
             self.syst = -1.0
+            self.prevsimt = self.simt
             self.simt = 0.0
             self.simdt = settings.simdt
             self.utc = datetime.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
             self.ffmode = False
             self.setDtMultiplier(1.0)
+            scheduler.reset()
             plugin.reset()
             bs.navdb.reset()
             bs.traf.reset()
@@ -188,7 +292,8 @@ def Simulation(detached):
             self.benchdt = dt
 
         def sendState(self):
-            self.send_event(b'STATECHANGE', self.state)
+            self.send_event(b'STATECHANGE', dict(state=self.state, simt=self.simt,
+                                                 prevsimt=self.prevsimt))
 
         def batch(self, filename):
             # The contents of the scenario file are meant as a batch list: send to server and clear stack
@@ -199,6 +304,24 @@ def Simulation(detached):
                 self.reset()
             return result
 
+        def record(self, fname=''):
+            ''' Start recording the streams of this node to file, or stop
+                recording with OFF. '''
+            if fname.upper() == 'OFF':
+                fname = ''
+            elif fname and not os.path.dirname(fname):
+                fname = os.path.join(settings.log_path, fname)
+            # Recording is done by the server
+            self.send_event(b'RECORD', fname)
+            return True
+
+        def replay(self, fname):
+            ''' Start a node that replays a stream recording. '''
+            if not os.path.dirname(fname):
+                fname = os.path.join(settings.log_path, fname)
+            self.send_event(b'REPLAY', fname)
+            return True
+
         def event(self, eventname, eventdata, sender_rte):
 
             #print('Node {} received {} data from {}'.format(self.node_id, eventname, sender_id))
@@ -208,8 +331,14 @@ def Simulation(detached):
             event_processed = False
 
             if eventname == b'STACKCMD':
-                # We received a single stack command. Add it to the existing stack
-                stack.stack(eventdata, sender_rte)
+                # We received a single stack command. Add it to the existing stack.
+                # Commands can be tagged with a request id: dict(cmd=..., reqid=...)
+                if isinstance(eventdata, dict):
+                    stack.stack(eventdata['cmd'], sender_rte, eventdata.get('reqid'))
+                else:
+                    stack.stack(eventdata, sender_rte)
+                # Process it right away instead of waiting for the next step
+                stack.process()
                 event_processed = True
 
             elif eventname == b'BATCH':
@@ -227,6 +356,14 @@ def Simulation(detached):
                 shapes = [shape.raw for shape in areafilter.areas.values()]
                 simstate = dict(pan=bs.scr.def_pan, zoom=bs.scr.def_zoom, stackcmds=stackdict, shapes=shapes)
                 self.send_event(b'SIMSTATE', simstate, target=sender_rte)
+            elif eventname == b'GETSTATE':
+                # Send the requested traffic variables in a single reply
+                state = bs.traf.getstate(eventdata['vars'], eventdata.get('acids'),
+                                         eventdata.get('area'))
+                if 'reqid' in eventdata:
+                    state['reqid'] = eventdata['reqid']
+                self.send_event(b'STATE', state, target=sender_rte)
+                event_processed = True
             else:
                 # This is either an unknown event or a gui event.
                 event_processed = bs.scr.event(eventname, eventdata, sender_rte)
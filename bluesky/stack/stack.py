@@ -21,7 +21,7 @@ import os.path
 import subprocess
 import numpy as np
 import bluesky as bs
-from bluesky.tools import geo, areafilter, plugin, plotter
+from bluesky.tools import geo, areafilter, plugin, plotter, profiler, scheduler, tracer
 from bluesky.tools.aero import kts, ft, fpm, tas2cas, density
 from bluesky.tools.misc import txt2alt, tim2txt, cmdsplit
 from bluesky.tools.calculator import calculator
@@ -598,12 +598,30 @@ def init(startup_scnfile):
             bs.traf.asas.SetPrio,
             "Define priority rules (right of way) for conflict resolution"
         ],
+        "PROFILE": [
+            "PROFILE [ON/OFF/RESET/DUMP/STREAM] [filename/ON/OFF]",
+            "[txt,string]",
+            profiler.profile,
+            "Show, switch, clear or save the per-phase timing of the simulation step"
+        ],
         "QUIT": [
             "QUIT",
             "",
             bs.sim.stop,
             "Quit program/Stop simulation"
         ],
+        "RECORD": [
+            "RECORD [filename/OFF]",
+            "[string]",
+            bs.sim.record,
+            "Record the streams of this simulation node to file for later replay"
+        ],
+        "REPLAY": [
+            "REPLAY filename",
+            "string",
+            bs.sim.replay,
+            "Start a node that replays a stream recording made with RECORD"
+        ],
         "RESET": [
             "RESET",
             "",
@@ -676,6 +694,12 @@ def init(startup_scnfile):
             scenarioinit,
             "Give current situation a scenario name"
         ],
+        "SCHEDULE": [
+            "SCHEDULE [task,dt,offset]",
+            "[txt,float,float]",
+            scheduler.schedule,
+            "Show the scheduled tasks, or set the update interval [s] and offset [s] of a task"
+        ],
         "SEED": [
             "SEED value",
             "int",
@@ -725,6 +749,12 @@ def init(startup_scnfile):
             lambda : bs.scr.echo("TMX command "+orgcmd+" not (yet?) implemented."),
             "Stub for not implemented TMX commands"
         ],
+        "TRACE": [
+            "TRACE [ON/OFF/DUMP] [filename] [seconds]",
+            "[txt,string]",
+            tracer.trace,
+            "Record a timeline of the simulation, and save (the last seconds of) it"
+        ],
         "TRAIL": [
             "TRAIL ON/OFF, [dt] OR TRAIL acid color",
             "[acid/bool],[float/txt]",
@@ -814,6 +844,15 @@ def get_scendata():
     return scentime, scencmd
 
 
+def get_nexttime():
+    ''' Return the simulation time at which the stack next has commands to
+        process: the current time if commands are waiting on the stack,
+        otherwise the time of the next scenario command (inf if none). '''
+    if cmdstack:
+        return bs.sim.simt
+    return scentime[0] if scentime else float('inf')
+
+
 def set_scendata(newtime, newcmd):
     ''' Set the scenario data. This is used by the batch logic. '''
     global scentime, scencmd
@@ -988,12 +1027,17 @@ def reset():
     saveexcl = defexcl  # Commands to be excluded, set back to default
 
 
-def stack(cmdline, cmdsender=None):
-    ''' Stack one or more commands separated by ";" '''
+def stack(cmdline, cmdsender=None, reqid=None):
+    ''' Stack one or more commands separated by ";"
+
+        When a request id is passed, the result of the (last) command is
+        sent back to the sender as an ECHO event tagged with this id. '''
     cmdline = cmdline.strip()
     if cmdline:
-        for line in cmdline.split(';'):
-            cmdstack.append((line, cmdsender))
+        lines = cmdline.split(';')
+        for line in lines[:-1]:
+            cmdstack.append((line, cmdsender, None))
+        cmdstack.append((lines[-1], cmdsender, reqid))
 
 
 def sched_cmd(time, args, relative=False):
@@ -1351,11 +1395,13 @@ def process():
     global sender_rte
 
     # Process stack of commands
-    for (line, sender_rte) in cmdstack:
+    for (line, sender_rte, reqid) in cmdstack:
         # debug print ("stack is processing:",line)
         # Empty line: next command
         line = line.strip()
         if not line:
+            if reqid is not None:
+                bs.sim.send_event(b'ECHO', dict(text='', flags=0, reqid=reqid), target=sender_rte)
             continue
 
         # Stack reply: text and flags
@@ -1398,7 +1444,9 @@ def process():
             # flag: indicates sucess
             # text: optional error message
             if parser.parse():
+                tstart = tracer.begin()
                 results = function(*parser.arglist)  # * = unpack list to call arguments
+                tracer.end(cmd, 'stack', tstart)
                 if isinstance(results, bool):  # Only flag is returned
                     if not results:
                         if not args:
@@ -1441,8 +1489,11 @@ def process():
             else:
                 echotext = "Unknown command: " + cmd
 
-        # Always return on command
-        if echotext:
+        # Always return on command. Requests with an id always get a reply
+        if reqid is not None:
+            bs.sim.send_event(b'ECHO', dict(text=echotext, flags=echoflags, reqid=reqid),
+                              target=sender_rte)
+        elif echotext:
             bs.scr.echo(echotext, echoflags)
         #**********************************************************************
         #======================  End of command branches ======================
@@ -1625,7 +1676,7 @@ class Argparser:
                 name = curarg + "," + nextarg
 
             # apt,runway ? Combine into one string with a slash as separator
-            elif args[:2].upper() == "RW" and curarg in bs.navdb.aptid:
+            elif args[:2].upper() == "RW" and curarg in bs.navdb.aptindex:
                 nextarg, args = getnextarg(args)
                 name = curarg + "/" + nextarg.upper()
 
@@ -0,0 +1,111 @@
+''' Parameter sweeps and Monte-Carlo variants of scenarios.
+
+    A sweep file is an INI file that describes how to generate variants of
+    one or more base scenarios, for instance for sensitivity studies:
+
+        [sweep]
+        # Base scenario file(s), one per line
+        scenario = mytraffic.scn
+        # Random seeds: a list, and/or ranges as first-last
+        seeds = 1-10
+
+        [grid]
+        # Stack commands, each with the values to sweep, separated by commas
+        ZONER = 3, 5, 7
+        RESO = OFF, MVP
+        PCALL = lowdensity.scn, highdensity.scn
+
+        [random]
+        # Stack commands with a uniform random value between low and high,
+        # drawn per variant (reproducible, using the seed of the variant)
+        DTLOOK = 200, 400
+
+    Each combination of base scenario, seed and grid values gives one
+    variant. A variant is the base scenario, with the SEED command and
+    the commands of its parameter values prepended. Variants are kept in
+    memory, and can be run with the batch runner:
+
+        python -m bluesky.batch sweep.ini
+'''
+import itertools
+import os
+import random
+import re
+from configparser import ConfigParser
+
+
+def parse_values(txt):
+    ''' Split a comma-separated list of parameter values. '''
+    return [val.strip() for val in txt.split(',') if val.strip()]
+
+
+def parse_seeds(txt):
+    ''' Parse a list of seeds, which can contain ranges (first-last). '''
+    seeds = []
+    for val in parse_values(txt):
+        first, _, last = val.partition('-')
+        seeds.extend(range(int(first), int(last or first) + 1))
+    return seeds
+
+
+def format_value(value):
+    ''' Format a randomly drawn parameter value. '''
+    return '{:.6g}'.format(value)
+
+
+def expand(base, seeds, grid, ranges):
+    ''' Generate the variants of scenario dict base for each seed and
+        combination of grid values. grid is a list of (command, values)
+        pairs, ranges a list of (command, (low, high)) pairs. '''
+    names = [cmd for cmd, _ in grid]
+    for seed in seeds:
+        for combination in itertools.product(*(values for _, values in grid)):
+            params = dict(zip(names, combination))
+            # Draw random values reproducibly from the seed and grid values
+            rng = random.Random('{} {}'.format(seed, combination))
+            for cmd, (low, high) in ranges:
+                params[cmd] = format_value(rng.uniform(low, high))
+            params['SEED'] = str(seed)
+
+            # Parameter commands are executed before the scenario itself,
+            # after its SCEN command if it has one
+            cmds = ['SEED {}'.format(seed)] + \
+                ['{} {}'.format(cmd, params[cmd]) for cmd in params if cmd != 'SEED']
+            scentime, scencmd = list(base['scentime']), list(base['scencmd'])
+            ipos = 1 if scencmd and scencmd[0][:4].upper() == 'SCEN' else 0
+            scencmd[ipos:ipos] = cmds
+            scentime[ipos:ipos] = [0.0] * len(cmds)
+            name = '_'.join([base['name']] + [re.sub(r'[^\w.\-]', '', cmd + val)
+                                              for cmd, val in params.items()])
+            if ipos:
+                scencmd[0] = 'SCEN ' + name
+            yield dict(name=name, scentime=scentime, scencmd=scencmd, params=params)
+
+
+def load_sweep(fname):
+    ''' Load sweep file fname, and return the list of scenario variants
+        that it describes. '''
+    from bluesky.batch import load_scenarios
+
+    cfg = ConfigParser(interpolation=None)
+    # Keep the case of the stack commands
+    cfg.optionxform = str
+    if not cfg.read(fname):
+        raise IOError('Cannot open sweep file ' + fname)
+
+    path = os.path.dirname(fname)
+    bases = []
+    for scenfile in cfg.get('sweep', 'scenario', fallback='').split():
+        # Scenario files are relative to the sweep file, or the scenario path
+        if not os.path.isabs(scenfile) and os.path.exists(os.path.join(path, scenfile)):
+            scenfile = os.path.join(path, scenfile)
+        bases.extend(load_scenarios(scenfile))
+    seeds = parse_seeds(cfg.get('sweep', 'seeds', fallback='0'))
+    grid = [(cmd.upper(), parse_values(values)) for cmd, values in
+            (cfg.items('grid') if cfg.has_section('grid') else [])]
+    ranges = []
+    for cmd, values in (cfg.items('random') if cfg.has_section('random') else []):
+        low, high = (float(val) for val in parse_values(values))
+        ranges.append((cmd.upper(), (low, high)))
+
+    return [variant for base in bases for variant in expand(base, seeds, grid, ranges)]
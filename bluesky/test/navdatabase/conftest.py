@@ -0,0 +1,11 @@
+"""
+Common fixtures of the navigation database tests.
+"""
+import pytest
+from bluesky.navdatabase import Navdatabase
+
+
+@pytest.fixture(scope="module")
+def navdb():
+    """ A navigation database, loaded once per test module. """
+    yield Navdatabase()
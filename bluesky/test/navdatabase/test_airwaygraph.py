@@ -0,0 +1,50 @@
+"""
+Tests for the airway network graph.
+"""
+import pytest
+from bluesky.navdatabase.airwaygraph import AirwayGraph
+
+
+# Airway A1 from AAA via BBB to CCC, with a duplicate leg, airway B2 with
+# two separate segments, and a second waypoint named BBB far away
+LEGS = [('A1', 'AAA', 50.0, 4.0, 'BBB', 51.0, 4.0),
+        ('A1', 'CCC', 52.0, 4.0, 'BBB', 51.0, 4.0),
+        ('A1', 'AAA', 50.0, 4.0, 'BBB', 51.0, 4.0),
+        ('B2', 'BBB', 51.0, 4.0, 'DDD', 51.0, 5.0),
+        ('B2', 'EEE', 10.0, 4.0, 'FFF', 10.0, 5.0),
+        ('C3', 'BBB', -30.0, 4.0, 'GGG', -30.0, 5.0)]
+
+
+@pytest.fixture
+def graph():
+    keys = ['awid', 'awfromwpid', 'awfromlat', 'awfromlon', 'awtowpid', 'awtolat', 'awtolon']
+    return AirwayGraph.build({key: list(col) for key, col in zip(keys, zip(*LEGS))})
+
+
+def names(graph, nodes):
+    return [graph.nodeid[i] for i in nodes]
+
+
+def test_segments(graph):
+    segments = [names(graph, s) for s in graph.segments('A1')]
+    assert segments in ([['AAA', 'BBB', 'CCC']], [['CCC', 'BBB', 'AAA']])
+    segments = sorted(sorted(names(graph, s)) for s in graph.segments('B2'))
+    assert segments == [['BBB', 'DDD'], ['EEE', 'FFF']]
+    assert graph.segments('NOTANAIRWAY') == []
+
+
+def test_connections(graph):
+    conns = graph.connections('BBB', 51.0, 4.0)
+    assert sorted((graph.awids[graph.connaw[i]], graph.nodeid[graph.conn[i]])
+                  for i in conns) == [('A1', 'AAA'), ('A1', 'CCC'), ('B2', 'DDD')]
+    assert graph.conndist[conns].max() == pytest.approx(60.0, rel=0.01)
+    assert len(graph.connections('BBB', 0.0, 0.0)) == 0
+
+
+def test_navdb_airways(navdb, graph, monkeypatch):
+    monkeypatch.setattr(navdb, 'awgraph', graph)
+    assert navdb.expandairway('a1', 'ccc', 'aaa') == ['CCC', 'BBB', 'AAA']
+    assert navdb.expandairway('A1', 'AAA', 'BBB') == ['AAA', 'BBB']
+    assert navdb.expandairway('B2', 'BBB', 'FFF') == []
+    assert sorted(navdb.listconnections('BBB', 51.0, 4.0)) == \
+        [['A1', 'AAA'], ['A1', 'CCC'], ['B2', 'DDD']]
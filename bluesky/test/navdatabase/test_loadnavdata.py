@@ -0,0 +1,77 @@
+"""
+Tests for loading the navigation data and its columnar cache.
+"""
+import numpy as np
+import bluesky as bs
+from bluesky import settings
+from bluesky.navdatabase import Navdatabase, loadnavdata
+from bluesky.navdatabase.load_navdata_txt import load_fir_txt, run_parallel
+
+
+def assert_equal_columns(data, ref):
+    assert sorted(data) == sorted(ref)
+    for key in ref:
+        if isinstance(ref[key], np.ndarray):
+            assert np.array_equal(data[key], ref[key])
+        else:
+            assert data[key] == ref[key]
+
+
+def test_cache_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'cache_path', str(tmp_path))
+    # The first component builds the cache for all components
+    built = loadnavdata.load_navdata('wpt')
+    assert list((tmp_path / 'navdata').glob('*/manifest.json'))
+    txtdata = dict(zip(('wpt', 'apt', 'awy', 'fir', 'co'), loadnavdata.load_navdata_txt()))
+    for component, ref in txtdata.items():
+        cached = loadnavdata.load_navdata(component)
+        assert_equal_columns(cached[0] if isinstance(cached, tuple) else cached, ref)
+    # The spatial index is also cached
+    assert np.array_equal(loadnavdata.load_navdata('wpt')[1].order, built[1].order)
+
+
+def test_lazy_components():
+    navdb = Navdatabase()
+    assert not set(vars(navdb)) & set(navdb.members)
+    assert navdb.getaptidx('EHAM') >= 0
+    # Only the airport component is loaded
+    assert 'aptlat' in vars(navdb) and 'wpid' not in vars(navdb)
+    assert navdb.getwpidx('SPY') >= 0
+    # A reset keeps the loaded components
+    navdb.reset()
+    assert 'aptlat' in vars(navdb) and 'wpid' in vars(navdb)
+
+
+def test_reset_defwpt(navdb, monkeypatch):
+    monkeypatch.setattr(bs, 'scr', type('Screen', (), {'addnavwpt': lambda *args: None})(),
+                        raising=False)
+    nwp = len(navdb.wpid)
+    spy = list(navdb.wpindex['SPY'])
+    navdb.defwpt('SPY', 10.0, 10.0)
+    navdb.defwpt('MYWPT', 52.0, 4.0)
+    assert navdb.getwpidx('MYWPT') == nwp + 1
+    navdb.reset()
+    assert len(navdb.wpid) == len(navdb.wplat) == len(navdb.wpdesc) == nwp
+    assert navdb.getwpidx('MYWPT') == -1
+    assert navdb.wpindex['SPY'] == spy
+
+
+def test_pack_rwythresholds():
+    rwythresholds = {'EHAM': {'06': (52.29, 4.74, 57.9), '24': (52.30, 4.78, 237.9)},
+                     'EHXX': {}}
+    packed = loadnavdata.pack_rwythresholds(rwythresholds)
+    assert loadnavdata.unpack_rwythresholds(packed) == rwythresholds
+
+
+def test_run_parallel():
+    assert run_parallel((abs, str), -1) == [1, '-1']
+
+
+def test_fir_coordinates():
+    firdata = load_fir_txt(settings.navdata_path)
+    firs = {fir[0]: fir for fir in firdata['fir']}
+    # Amsterdam FIR, and Shanwick oceanic FIR west of Greenwich
+    assert all(50.0 < lat < 56.0 for lat in firs['EHAA'][1])
+    assert all(1.0 < lon < 8.0 for lon in firs['EHAA'][2])
+    assert min(firs['EGGX'][2]) < -10.0
+    assert len(firdata['firlat0']) == sum(len(fir[1]) - 1 for fir in firdata['fir'])
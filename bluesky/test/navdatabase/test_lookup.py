@@ -0,0 +1,43 @@
+"""
+Tests for the name-indexed lookups of the navigation database.
+"""
+import numpy as np
+from bluesky.tools import geo
+
+
+def brute_force_wpidx(navdb, name, reflat, reflon):
+    idx = [i for i, wpid in enumerate(navdb.wpid) if wpid == name]
+    dist = [geo.kwikdist(reflat, reflon, navdb.wplat[i], navdb.wplon[i]) for i in idx]
+    return idx[int(np.argmin(dist))]
+
+
+def test_wpidx(navdb):
+    assert navdb.getwpidx('NOTAWAYPOINT') == -1
+    assert navdb.getwpidx('spy') == navdb.wpid.index('SPY')
+    # Duplicate names resolve to the closest one
+    dups = [name for name, idx in navdb.wpindex.items() if len(idx) > 2][:50]
+    for name in dups:
+        for reflat, reflon in ((52.0, 4.0), (-30.0, 140.0)):
+            assert navdb.getwpidx(name, reflat, reflon) == \
+                brute_force_wpidx(navdb, name, reflat, reflon)
+
+
+def test_wpindices(navdb):
+    assert navdb.getwpindices('NOTAWAYPOINT') == [-1]
+    name = next(name for name, idx in navdb.wpindex.items() if len(idx) > 2)
+    indices = navdb.getwpindices(name, 52.0, 4.0, crit=1e9)
+    assert indices[0] == brute_force_wpidx(navdb, name, 52.0, 4.0)
+    assert sorted(indices) == navdb.wpindex[name]
+
+
+def test_aptidx(navdb):
+    assert navdb.getaptidx('eham') == navdb.aptid.index('EHAM')
+    assert navdb.getaptidx('NOTANAIRPORT') == -1
+
+
+def test_firidx(navdb):
+    names = [fir[0] for fir in navdb.fir]
+    assert names[navdb.getfiridx(52.3, 4.76)] == 'EHAA'
+    assert navdb.getfiridx(0.0, -30.0) == -1
+    idx = navdb.getfiridx(np.array([52.3, 51.5, 0.0]), np.array([4.76, -0.5, -30.0]))
+    assert [names[i] if i >= 0 else None for i in idx] == ['EHAA', 'EGTT', None]
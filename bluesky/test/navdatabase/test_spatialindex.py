@@ -0,0 +1,48 @@
+"""
+Tests for the spatial index of the navigation database.
+"""
+import numpy as np
+from bluesky.navdatabase.spatialindex import PointIndex
+from bluesky.tools import geo
+
+
+def brute_force_nearest(wlat, wlon, lat, lon):
+    return int(np.argmin(geo.latlondist(lat, lon, wlat, wlon)))
+
+
+def test_nearest(navdb):
+    rng = np.random.RandomState(1)
+    lat = rng.uniform(-80.0, 80.0, 200)
+    lon = rng.uniform(-180.0, 180.0, 200)
+    # Vectorized query for many positions at once
+    idx = navdb.getwpinear(lat, lon)
+    for i in range(len(lat)):
+        ref = brute_force_nearest(navdb.wplat, navdb.wplon, lat[i], lon[i])
+        assert geo.latlondist(lat[i], lon[i], navdb.wplat[idx[i]], navdb.wplon[idx[i]]) == \
+            geo.latlondist(lat[i], lon[i], navdb.wplat[ref], navdb.wplon[ref])
+    assert navdb.aptid[navdb.getapinear(52.31, 4.76)] == 'EHAM'
+
+
+def test_inside(navdb):
+    for box in ((50.0, 54.0, 2.0, 8.0), (-10.0, 10.0, 170.0, -170.0)):
+        lat0, lat1, lon0, lon1 = box
+        inlat = (navdb.wplat > lat0) & (navdb.wplat < lat1)
+        if lon0 < lon1:
+            inlon = (navdb.wplon > lon0) & (navdb.wplon < lon1)
+        else:
+            inlon = (navdb.wplon > lon0) | (navdb.wplon < lon1)
+        ref = list(np.where(inlat & inlon)[0])
+        assert ref
+        assert navdb.getwpinside(*box) == ref
+
+
+def test_added_points():
+    lat = np.array([0.0, 10.0, 20.0])
+    lon = np.array([0.0, 10.0, 20.0])
+    index = PointIndex.build(lat, lon)
+    # Points added after building the index are also found
+    lat = np.append(lat, 5.0)
+    lon = np.append(lon, 5.0)
+    assert index.nearest(lat, lon, 4.0, 4.0) == 3
+    assert list(index.nearest(lat, lon, np.array([4.0, 19.0]), np.array([4.0, 19.0]))) == [3, 2]
+    assert index.inside(lat, lon, 1.0, 12.0, 1.0, 12.0) == [1, 3]
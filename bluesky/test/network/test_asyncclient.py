@@ -0,0 +1,97 @@
+"""
+Tests for the asyncio client, against a minimal stand-in for the server
+that answers requests out of order.
+"""
+import asyncio
+import threading
+
+import msgpack
+import pytest
+import zmq
+
+from bluesky.network.asyncclient import AsyncClient
+
+HOST_ID = b'\x00host'
+NODE_ID = b'\x00node'
+
+
+def fake_server(sock, nrequests):
+    """Register the client, then reply to nrequests requests in reverse order."""
+    client_id = sock.recv_multipart()[0]
+    sock.send_multipart([client_id, HOST_ID, b'REGISTER', b''])
+    nodes = {HOST_ID: dict(route=[], nodes=[NODE_ID])}
+    sock.send_multipart([client_id, HOST_ID, b'NODESCHANGED',
+                         msgpack.packb(nodes, use_bin_type=True)])
+    requests = [msgpack.unpackb(sock.recv_multipart()[-1], raw=False)
+                for _ in range(nrequests)]
+    for req in reversed(requests):
+        reply = dict(text=req['cmd'], flags=0, reqid=req['reqid'])
+        sock.send_multipart([client_id, NODE_ID, b'ECHO',
+                             msgpack.packb(reply, use_bin_type=True)])
+
+
+@pytest.fixture(scope='module')
+def server_socks():
+    """Server sockets on random free ports, shared by the tests in this module."""
+    ctx = zmq.Context.instance()
+    event = ctx.socket(zmq.ROUTER)
+    event_port = event.bind_to_random_port('tcp://*')
+    stream = ctx.socket(zmq.XPUB)
+    stream_port = stream.bind_to_random_port('tcp://*')
+    yield event, event_port, stream_port
+    event.close(linger=0)
+    stream.close(linger=0)
+
+
+@pytest.fixture
+def loop():
+    """A fresh event loop per test (asyncio.run needs python 3.7)."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+@pytest.fixture
+def client(loop, server_socks):
+    client = AsyncClient()
+    yield client
+    client.event_io.close(linger=0)
+    client.stream_in.close(linger=0)
+
+
+def connect(client, server_socks, nrequests):
+    """Start the fake server for nrequests, and connect the client to it."""
+    event, event_port, stream_port = server_socks
+    thread = threading.Thread(target=fake_server, args=(event, nrequests))
+    thread.start()
+    client.connect(event_port=event_port, stream_port=stream_port)
+    return thread
+
+
+def test_concurrent_requests(loop, server_socks, client):
+    """Replies are matched to their requests by request id."""
+    cmds = ['CMD{}'.format(i) for i in range(4)]
+    thread = connect(client, server_socks, len(cmds))
+
+    async def run():
+        return await asyncio.gather(*(client.stack(cmd, timeout=5) for cmd in cmds))
+
+    replies = loop.run_until_complete(run())
+    thread.join()
+    assert [reply['text'] for reply in replies] == cmds
+    assert not client.pending
+
+
+def test_timeout(loop, server_socks, client):
+    """An unanswered request times out, and is no longer pending."""
+    thread = connect(client, server_socks, 0)
+    thread.join()
+
+    async def run():
+        await client.stack('NOREPLY', timeout=0.2)
+
+    with pytest.raises(asyncio.TimeoutError):
+        loop.run_until_complete(run())
+    assert not client.pending
@@ -0,0 +1,77 @@
+''' Tests for the batch job manager of the server. '''
+from bluesky import settings
+from bluesky.network.jobs import JobManager, estimate_cost, QUEUED, DONE, FAILED
+
+
+def scenario(name, nac, duration):
+    scencmd = ['SCEN ' + name] + ['CRE AC{} B744 52 4 0 FL100 250'.format(i) for i in range(nac)] + ['HOLD']
+    scentime = [0.0] * (nac + 1) + [duration]
+    return dict(name=name, scentime=scentime, scencmd=scencmd)
+
+
+def test_estimate_cost():
+    assert estimate_cost([0.0, 0.0, 100.0], ['CRE KL1 B744 52 4 0 FL100 250', 'MCRE 10', 'HOLD']) == 1100.0
+    assert estimate_cost([], []) == 1.0
+
+
+def test_longest_first(tmpdir):
+    jobs = JobManager()
+    jobs.add([scenario('small', 1, 10.0), scenario('large', 10, 100.0), scenario('medium', 5, 50.0)])
+    assert [jobs.start(w)['name'] for w in (b'a', b'b', b'c')] == ['large', 'medium', 'small']
+    assert jobs.start(b'd') is None
+    assert not jobs.finished()
+
+    for w in (b'a', b'b', b'c'):
+        assert jobs.stop(w, 42.0).status == DONE
+    assert jobs.finished()
+
+    fname = jobs.summary(str(tmpdir.join('summary.csv')))
+    lines = [line for line in open(fname) if not line.startswith('#')]
+    assert len(lines) == 3
+    assert lines[0].split(',')[:3] == ['large', ' done', ' 1']
+
+
+def test_retry(monkeypatch):
+    monkeypatch.setattr(settings, 'batch_maxretries', 1)
+    jobs = JobManager()
+    jobs.add([scenario('crash', 1, 10.0)])
+    jobs.start(b'a')
+    assert jobs.worker_died(b'a').status == QUEUED
+    assert jobs.nqueued() == 1
+    jobs.start(b'b')
+    assert jobs.worker_died(b'b').status == FAILED
+    assert jobs.finished()
+    assert jobs.worker_died(b'c') is None
+
+
+class FakeSocket(object):
+    def __init__(self):
+        self.sent = []
+
+    def send_multipart(self, msg):
+        self.sent.append(msg)
+
+
+def test_dead_node(monkeypatch):
+    from bluesky.network.server import Server
+    monkeypatch.setattr(settings, 'batch_maxretries', 1)
+    server = Server(headless=False)
+    server.fe_event, server.be_event = FakeSocket(), FakeSocket()
+    server.clients = [b'client']
+    server.workers.extend([b'dead', b'idle'])
+    server.worker_pids.update({b'dead': 1, b'idle': 2})
+    server.avail_workers[b'idle'] = [b'idle']
+    added = []
+    monkeypatch.setattr(server, 'node_alive', lambda node_id: node_id != b'dead')
+    monkeypatch.setattr(server, 'addnodes', added.append)
+
+    server.jobs.add([scenario('crash', 1, 10.0)])
+    server.jobs.start(b'dead')
+    server.check_jobs()
+    # The dead node is forgotten, and clients are told so
+    assert server.workers == [b'idle'] and b'dead' not in server.worker_pids
+    assert [msg[2] for msg in server.fe_event.sent] == [b'NODESCHANGED']
+    # Its job is retried on the idle node
+    assert server.jobs.running[b'idle'].name == 'crash'
+    assert [msg[2] for msg in server.be_event.sent] == [b'BATCH']
+    assert added == [0]
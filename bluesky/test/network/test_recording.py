@@ -0,0 +1,59 @@
+"""
+Tests for the recording of simulation streams.
+"""
+import os
+
+import msgpack
+import pytest
+
+from bluesky.network import sharedstream
+from bluesky.network.recording import Recorder, Recording
+
+
+def test_record_read(tmp_path):
+    """Recorded multipart messages are read back unchanged and in order."""
+    fname = str(tmp_path / 'test.bsr')
+    msgs = [[b'ACDATA\x00node', bytes([i]) * i] for i in range(4)]
+    recorder = Recorder(fname)
+    for msg in msgs:
+        recorder.write(msg)
+    recorder.close()
+
+    recording = Recording(fname)
+    assert len(recording) == len(msgs)
+    assert [recording.read(i) for i in range(len(recording))] == msgs
+    recording.close()
+
+
+def test_find(tmp_path):
+    """Seeking by time returns the first record at or after that time."""
+    fname = str(tmp_path / 'test.bsr')
+    recorder = Recorder(fname)
+    for _ in range(3):
+        recorder.write([b'SIMINFO\x00node', b''])
+    recorder.close()
+
+    recording = Recording(fname)
+    assert recording.find(0.0) == 0
+    assert recording.find(recording.duration + 1.0) == 3
+    recording.close()
+
+
+@pytest.mark.skipif(not sharedstream.available(), reason="Shared memory is not available")
+def test_record_shm(tmp_path):
+    """Stream data passed through shared memory is recorded as normal stream data."""
+    fname = str(tmp_path / 'test.bsr')
+    writer = sharedstream.SharedStreamWriter('bluesky_test_rec_{}'.format(os.getpid()),
+                                             nslots=2, slotsize=16)
+    recorder = Recorder(fname)
+    seq = writer.write(b'ACDATA')
+    recorder.write([b'ACDATA\x00node', msgpack.packb((writer.name, seq), use_bin_type=True), b'SHM'])
+    # Overwritten data is skipped
+    recorder.write([b'ACDATA\x00node', msgpack.packb((writer.name, seq - 2), use_bin_type=True), b'SHM'])
+    recorder.close()
+    writer.close()
+
+    recording = Recording(fname)
+    assert len(recording) == 1
+    assert recording.read(0) == [b'ACDATA\x00node', b'ACDATA']
+    recording.close()
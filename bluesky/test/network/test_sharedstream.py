@@ -0,0 +1,54 @@
+"""
+Tests for the shared-memory stream transport.
+"""
+import os
+
+import pytest
+
+from bluesky.network import sharedstream
+
+pytestmark = pytest.mark.skipif(not sharedstream.available(),
+                                reason="Shared memory is not available")
+
+
+@pytest.fixture
+def writer():
+    writer = sharedstream.SharedStreamWriter(
+        'bluesky_test_{}'.format(os.getpid()), nslots=2, slotsize=16)
+    yield writer
+    writer.close()
+
+
+def test_write_read(writer):
+    """Data written to the ring buffer can be read by sequence number."""
+    reader = sharedstream.SharedStreamReader(writer.name)
+    seq = writer.write(b'ACDATA')
+    assert reader.read(seq) == b'ACDATA'
+    reader.close()
+
+
+def test_overwritten(writer):
+    """Reading data that was overwritten by newer data returns None."""
+    reader = sharedstream.SharedStreamReader(writer.name)
+    seqs = [writer.write(bytes([i])) for i in range(3)]
+    assert reader.read(seqs[0]) is None
+    assert reader.read(seqs[2]) == b'\x02'
+    reader.close()
+
+
+def test_too_large(writer):
+    """Data that doesn't fit in a slot is not written."""
+    assert writer.write(bytes(17)) is None
+
+
+def test_client_fallback(monkeypatch):
+    """A client that can't open a segment asks the node, once, to send
+    the stream over the network."""
+    from bluesky.network.client import Client
+    client = Client()
+    sent = []
+    monkeypatch.setattr(client, '_getroute', lambda target: [])
+    monkeypatch.setattr(client, 'send_event', lambda *args: sent.append(args))
+    for seq in (1, 2):
+        assert client.read_shm(b'ACDATA', b'\x00node', 'bluesky_test_missing', seq) is None
+    assert sent == [(b'SHMFALLBACK', 'ACDATA', b'\x00node')]
@@ -0,0 +1,22 @@
+"""
+Common fixtures of the simulation tests: a detached simulation, that is
+reset before each test.
+"""
+import pytest
+import bluesky as bs
+
+
+@pytest.fixture(scope="session")
+def detached_sim():
+    """ Initialize a detached simulation once for all simulation tests. """
+    if bs.sim is None:
+        bs.init('sim-detached')
+    yield bs.sim
+
+
+@pytest.fixture
+def sim(detached_sim):
+    """ A reset detached simulation. """
+    detached_sim.reset()
+    yield detached_sim
+    detached_sim.reset()
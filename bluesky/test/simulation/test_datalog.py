@@ -0,0 +1,40 @@
+"""
+Tests for periodic loggers run by the scheduler.
+"""
+import pytest
+from bluesky import settings
+from bluesky.tools import datalog, scheduler
+
+
+@pytest.fixture
+def snaplog(sim, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'log_path', str(tmp_path))
+    logger = datalog.allloggers['SNAPLOG']
+    times = []
+    monkeypatch.setattr(logger, 'log', lambda: times.append(sim.simt))
+    yield logger, times
+    logger.reset()
+
+
+def test_first_log_at_start(sim, snaplog, monkeypatch):
+    logger, times = snaplog
+    # Step through all intervals, also without traffic
+    monkeypatch.setattr(sim, 'skip_idle', lambda tmax: 0)
+    sim.run_until(12.3)
+    logger.stackio('ON', 5.0)
+    sim.run_until(30.0)
+    assert times[0] == pytest.approx(12.3)
+    assert times[1] - times[0] == pytest.approx(5.0)
+
+
+def test_schedule_sets_dt(sim, snaplog):
+    logger, _ = snaplog
+    logger.stackio('ON', 5.0)
+    assert scheduler.schedule('SNAPLOG', 2.0)[0]
+    assert logger.dt == 2.0
+    assert '2.00 seconds' in logger.stackio()[1]
+    # Turning the logger on again keeps the interval
+    logger.stackio('ON')
+    assert logger.task.dt == 2.0
+    logger.stackio('OFF')
+    assert logger.dt == logger.default_dt
@@ -0,0 +1,51 @@
+"""
+Tests for the fast-time loop of the simulation: run_steps, run_until,
+and run_fast.
+"""
+import pytest
+import bluesky as bs
+from bluesky import stack
+
+
+def create(acid='KL1'):
+    stack.stack('CRE {} B744 52 4 0 FL100 250'.format(acid))
+
+
+def test_run_steps(sim):
+    create()
+    assert sim.run_steps(10) == 10
+    assert sim.simt == pytest.approx(10 * sim.simdt)
+    assert sim.state == bs.OP
+    assert bs.traf.ntraf == 1
+
+
+def test_run_until_roundoff(sim):
+    create()
+    # Accumulated round-off in simt doesn't give an extra step
+    assert sim.run_until(1.0) == int(round(1.0 / sim.simdt))
+    assert sim.simt == pytest.approx(1.0)
+    assert sim.run_until(1.0) == 0
+
+
+def test_stop_on_scenario_hold(sim):
+    create()
+    stack.set_scendata([2.0], ['HOLD'])
+    sim.run_until(10.0)
+    assert sim.state == bs.HOLD
+    assert sim.simt == pytest.approx(2.0)
+
+
+def test_stop_on_stack_halt(sim):
+    create()
+    sim.op()
+    stack.stack('HOLD')
+    sim.run_steps(10)
+    assert sim.state == bs.HOLD
+    assert sim.simt == 0.0
+
+
+def test_run_fast_until(sim):
+    create()
+    nsteps = sim.run_fast(until=lambda: sim.simt >= 0.5 - 1e-9)
+    assert nsteps == 10
+    assert sim.simt == pytest.approx(0.5)
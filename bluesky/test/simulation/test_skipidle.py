@@ -0,0 +1,61 @@
+"""
+Tests for skipping intervals without traffic in fast-time simulation.
+"""
+import pytest
+import bluesky as bs
+from bluesky import stack
+from bluesky.tools import scheduler
+
+# Traffic in the first 30 seconds, and again from 600 seconds
+SCENTIME = [0.0, 30.0, 600.0]
+SCENCMD = ['CRE KL1 B744 52 4 0 FL100 250', 'DEL KL1', 'CRE KL2 B744 52 4 90 FL100 250']
+
+
+def run_gap(sim, monkeypatch, skip=True):
+    """ Run the gap scenario until 700 s, and return the number of updates. """
+    nupdates = [0]
+    update = sim.update
+
+    def counted_update():
+        nupdates[0] += 1
+        update()
+
+    monkeypatch.setattr(sim, 'update', counted_update)
+    if not skip:
+        monkeypatch.setattr(sim, 'skip_idle', lambda tmax: 0)
+    stack.set_scendata(list(SCENTIME), list(SCENCMD))
+    nsteps = sim.run_until(700.0)
+    return nsteps, nupdates[0]
+
+
+def test_skip_updates(sim, monkeypatch):
+    nsteps, nupdates = run_gap(sim, monkeypatch)
+    # Only the steps with traffic or scenario commands are performed
+    ntraffic = int(round(30.0 / sim.simdt)) + int(round(100.0 / sim.simdt))
+    assert nsteps == int(round(700.0 / sim.simdt))
+    assert nupdates < ntraffic + 10
+
+
+def test_skip_matches_stepping(sim, monkeypatch):
+    nsteps, _ = run_gap(sim, monkeypatch)
+    skipped = dict(simt=sim.simt, lat=bs.traf.lat[0], lon=bs.traf.lon[0])
+    sim.reset()
+    nsteps_ref, nupdates_ref = run_gap(sim, monkeypatch, skip=False)
+    assert nsteps == nsteps_ref == nupdates_ref
+    assert sim.simt == pytest.approx(skipped['simt'])
+    assert bs.traf.lat[0] == pytest.approx(skipped['lat'])
+    assert bs.traf.lon[0] == pytest.approx(skipped['lon'])
+
+
+def test_logger_catch_up(sim, monkeypatch):
+    times = []
+    scheduler.register('TESTLOG', 1.0, lambda: times.append(sim.simt), 'log', offset=0.0)
+    try:
+        run_gap(sim, monkeypatch)
+    finally:
+        scheduler.remove('TESTLOG')
+    # Logging resumes on its grid after the gap, without catching up the
+    # skipped logging times
+    assert [t for t in times if 30.5 < t < 602.5] == pytest.approx([600.0, 601.0, 602.0])
+    gaps = [t1 - t0 for t0, t1 in zip(times, times[1:])]
+    assert min(gaps) == pytest.approx(1.0)
@@ -0,0 +1,33 @@
+''' Tests for the multiprocessing batch runner. '''
+from bluesky import batch
+
+
+def test_load_scenarios(tmpdir):
+    fname = tmpdir.join('batch.scn')
+    fname.write('# Comment\n'
+                '00:00:00.00>SCEN FIRST\n'
+                '00:01:00.00>HOLD\n'
+                '00:00:00.00>CRE KL1 B744 52 4 0 FL100 250\n'
+                '00:00:00.00>SCEN SECOND\n'
+                '00:00:00.00>MCRE 5\n'
+                '00:02:00.00>HOLD\n')
+    scens = batch.load_scenarios(str(fname))
+    assert [scen['name'] for scen in scens] == ['FIRST', 'SECOND']
+    assert scens[0]['scentime'] == [0.0, 0.0, 60.0]
+    assert scens[0]['scencmd'] == ['SCEN FIRST', 'CRE KL1 B744 52 4 0 FL100 250', 'HOLD']
+    assert scens[1]['scentime'] == [0.0, 0.0, 120.0]
+
+
+def test_load_single_scenario(tmpdir):
+    fname = tmpdir.join('single.scn')
+    fname.write('00:00:10.00>HOLD\n00:00:00.00>MCRE 5\n')
+    scens = batch.load_scenarios(str(fname))
+    assert len(scens) == 1
+    assert scens[0]['name'] == 'single'
+    assert scens[0]['scencmd'] == ['MCRE 5', 'HOLD']
+
+
+def test_terminates():
+    assert batch.terminates(dict(scencmd=['MCRE 5', 'PAUSE']))
+    assert batch.terminates(dict(scencmd=['MCRE 5', 'EXIT']))
+    assert not batch.terminates(dict(scencmd=['MCRE 5', 'DEL KL1']))
@@ -0,0 +1,31 @@
+''' Tests for the reporting of the benchmark suite. '''
+import csv
+import json
+from bluesky import benchmark
+
+
+def result(ntraf, steps_per_sec):
+    case = dict(ntraf=ntraf, asas='OFF', wind='OFF', perf='openap')
+    return dict(case, id=benchmark.case_id(case), startup=1.0, nsteps=100,
+                steps_per_sec=steps_per_sec, peak_rss=100.0,
+                phases=dict(asas=0.1, total=1.0))
+
+
+def test_compare():
+    baseline = [result(100, 1000.0), result(1000, 100.0)]
+    results = [result(100, 950.0), result(1000, 50.0), result(5000, 10.0)]
+    assert benchmark.compare(results, baseline) == [results[1]['id']]
+
+
+def test_write_results(tmpdir):
+    results = [result(100, 1000.0), result(1000, 100.0)]
+    fjson = str(tmpdir.join('results.json'))
+    benchmark.write_results(fjson, results)
+    assert json.load(open(fjson)) == results
+
+    fcsv = str(tmpdir.join('results.csv'))
+    benchmark.write_results(fcsv, results)
+    rows = list(csv.DictReader(open(fcsv)))
+    assert len(rows) == 2
+    assert float(rows[1]['steps_per_sec']) == 100.0
+    assert float(rows[0]['phase_asas_ms']) == 0.1
@@ -0,0 +1,33 @@
+''' Tests for the import-time report, and the start-up time budget. '''
+import os
+import pytest
+from bluesky import importtime
+
+# Wall-clock budgets are machine-dependent: the start-up time of a detached
+# simulation node is only checked against the budget [s] given in this
+# environment variable
+BUDGET = os.environ.get('BLUESKY_STARTUP_BUDGET')
+
+
+def test_parse_importtime():
+    text = ('import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   bluesky.tools.geo\n'
+            'import time:      1500 |      20000 | bluesky\n'
+            'other output\n')
+    assert importtime.parse_importtime(text) == [('bluesky.tools.geo', 120e-6, 120e-6),
+                                                 ('bluesky', 1500e-6, 20000e-6)]
+    report = importtime.report(0.5, ['bluesky', 'pandas.core'],
+                               importtime.parse_importtime(text), n=1)
+    assert 'bluesky.tools.geo' not in report
+    assert report.endswith('Heavy modules imported at start-up: pandas')
+
+
+def test_detached_imports():
+    _, modules, _ = importtime.measure('sim-detached')
+    assert importtime.heavy_imports(modules) == []
+
+
+@pytest.mark.skipif(BUDGET is None, reason='BLUESKY_STARTUP_BUDGET is not set')
+def test_detached_startup_budget():
+    elapsed, modules, importtimes = importtime.measure('sim-detached')
+    assert elapsed < float(BUDGET), importtime.report(elapsed, modules, importtimes)
@@ -0,0 +1,38 @@
+''' Tests for the expansion of parameter sweeps. '''
+from bluesky import sweep
+
+
+def test_parse_seeds():
+    assert sweep.parse_seeds('1-3, 7') == [1, 2, 3, 7]
+
+
+def test_load_sweep(tmpdir):
+    tmpdir.join('base.scn').write('00:00:00.00>SCEN BASE\n'
+                                  '00:00:00.00>MCRE 5\n'
+                                  '00:10:00.00>HOLD\n')
+    fname = tmpdir.join('sweep.ini')
+    fname.write('[sweep]\n'
+                'scenario = base.scn\n'
+                'seeds = 1-2\n'
+                '[grid]\n'
+                'ZONER = 3, 5\n'
+                'RESO = OFF, MVP\n'
+                '[random]\n'
+                'DTLOOK = 200, 400\n')
+    variants = sweep.load_sweep(str(fname))
+    assert len(variants) == 8
+    names = set(variant['name'] for variant in variants)
+    assert len(names) == 8
+
+    variant = variants[0]
+    assert variant['params']['ZONER'] == '3'
+    assert variant['params']['RESO'] == 'OFF'
+    assert variant['params']['SEED'] == '1'
+    assert 200.0 <= float(variant['params']['DTLOOK']) <= 400.0
+    assert variant['scencmd'][:5] == ['SCEN ' + variant['name'], 'SEED 1', 'ZONER 3', 'RESO OFF',
+                                      'DTLOOK ' + variant['params']['DTLOOK']]
+    assert variant['scencmd'][5:] == ['MCRE 5', 'HOLD']
+    assert variant['scentime'] == [0.0] * 6 + [600.0]
+
+    # Random values are reproducible
+    assert sweep.load_sweep(str(fname))[0]['params'] == variant['params']
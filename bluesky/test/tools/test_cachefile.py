@@ -0,0 +1,94 @@
+''' Tests for the cache layer. '''
+import multiprocessing
+import time
+import numpy as np
+import pytest
+from bluesky import settings
+from bluesky.tools import cachefile
+
+
+@pytest.fixture
+def cachedir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'cache_path', str(tmp_path))
+    yield tmp_path
+
+
+DATA = dict(lat=np.array([52.0, 53.5]), id=['EHAM', 'EHRD'], freq=[396, 113.5],
+            desc=['', 'Zestienhovené'], empty=[])
+
+
+def test_roundtrip(cachedir):
+    with cachefile.opendir('test', 'v1') as cache:
+        cache.dump('wpt', DATA)
+    with cachefile.opendir('test', 'v1') as cache:
+        data = cache.load('wpt')
+    assert data['id'] == DATA['id'] and data['desc'] == DATA['desc']
+    assert data['freq'] == DATA['freq'] and data['empty'] == []
+    assert np.array_equal(data['lat'], DATA['lat'])
+    # Arrays are memory-mapped, and read-only
+    assert not data['lat'].flags.writeable
+    with pytest.raises(cachefile.CacheError):
+        cachefile.opendir('test', 'v1').load('notagroup')
+
+
+def test_invalid(cachedir):
+    with pytest.raises(cachefile.CacheError):
+        with cachefile.opendir('test', 'v1') as cache:
+            cache.load('wpt')
+    with cachefile.opendir('test', 'v1') as cache:
+        cache.dump('wpt', DATA)
+    with pytest.raises(cachefile.CacheError):
+        with cachefile.opendir('test', 'v2') as cache:
+            cache.load('wpt')
+    # A cache that was not completely written is not used
+    with pytest.raises(RuntimeError):
+        with cachefile.opendir('test', 'v2') as cache:
+            cache.dump('wpt', DATA)
+            raise RuntimeError
+    with pytest.raises(cachefile.CacheError):
+        with cachefile.opendir('test', 'v2') as cache:
+            cache.load('wpt')
+    # Only the cache of the last written version is kept
+    with cachefile.opendir('test', 'v2') as cache:
+        cache.dump('wpt', DATA)
+    assert sorted(p.name for p in (cachedir / 'test').iterdir()) == ['lock', 'v2']
+
+
+def test_sources(cachedir):
+    source = cachedir / 'source.dat'
+    source.write_text('1')
+    with cachefile.openfile('test.p', 'v1', [str(source)]) as cache:
+        cache.dump(1)
+    with cachefile.openfile('test.p', 'v1', [str(source)]) as cache:
+        assert cache.load() == 1
+    # A changed source file invalidates the cache
+    source.write_text('22')
+    with pytest.raises(cachefile.CacheError):
+        with cachefile.openfile('test.p', 'v1', [str(source)]) as cache:
+            cache.load()
+
+
+def build(cache_path, nbuilds):
+    ''' Load a cache, or build it slowly when it does not exist. '''
+    settings.cache_path = cache_path
+    with cachefile.opendir('test', 'v1') as cache:
+        try:
+            cache.load('wpt')
+        except cachefile.CacheError:
+            time.sleep(0.5)
+            with nbuilds.get_lock():
+                nbuilds.value += 1
+            cache.dump('wpt', DATA)
+
+
+def test_concurrent_build(cachedir):
+    nbuilds = multiprocessing.Value('i', 0)
+    procs = [multiprocessing.Process(target=build, args=(str(cachedir), nbuilds))
+             for _ in range(4)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    assert all(proc.exitcode == 0 for proc in procs)
+    # Only one of the processes builds the cache
+    assert nbuilds.value == 1
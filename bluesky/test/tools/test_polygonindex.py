@@ -0,0 +1,104 @@
+''' Tests for the polygon index. '''
+import numpy as np
+import pytest
+from matplotlib.path import Path
+from bluesky.tools import areafilter
+from bluesky.tools.polygonindex import PolygonIndex, inside_polygon
+
+
+def random_polygon(rng, clat, clon, radius, n=12):
+    angle = np.sort(rng.uniform(0.0, 2 * np.pi, n))
+    r = radius * rng.uniform(0.3, 1.0, n)
+    return clat + r * np.sin(angle), clon + r * np.cos(angle)
+
+
+@pytest.fixture
+def polygons():
+    rng = np.random.default_rng(42)
+    return [random_polygon(rng, clat, clon, radius) for clat, clon, radius in
+            ((52.0, 4.0, 3.0), (50.0, 8.0, 4.5), (10.0, -60.0, 0.3), (-30.0, 150.0, 12.0))]
+
+
+def test_inside_polygon(polygons):
+    rng = np.random.default_rng(1)
+    lat, lon = rng.uniform(-50, 60, 20000), rng.uniform(-70, 170, 20000)
+    for plat, plon in polygons:
+        expected = Path(np.column_stack((plat, plon))).contains_points(np.column_stack((lat, lon)))
+        assert np.array_equal(inside_polygon(lat, lon, plat, plon), expected)
+
+
+def test_query(polygons):
+    index = PolygonIndex(polygons)
+    rng = np.random.default_rng(2)
+    lat = np.concatenate((rng.uniform(44, 56, 20000), rng.uniform(-45, -15, 5000)))
+    lon = np.concatenate((rng.uniform(-1, 14, 20000), rng.uniform(135, 165, 5000)))
+    # The first polygon that contains a point
+    expected = np.full(len(lat), -1)
+    for i, (plat, plon) in reversed(list(enumerate(polygons))):
+        inside = Path(np.column_stack((plat, plon))).contains_points(np.column_stack((lat, lon)))
+        expected[inside] = i
+    assert np.count_nonzero(expected == 1) and np.count_nonzero(expected == 3)
+    assert np.array_equal(index.query(lat, lon), expected)
+    assert index.query(52.0, 4.0) == 0
+    assert index.query(0.0, 0.0) == -1
+
+
+def test_dateline():
+    index = PolygonIndex([([-10.0, -10.0, 10.0, 10.0], [170.0, -170.0, -170.0, 170.0])])
+    assert list(index.query([0.0, 0.0, 0.0, 0.0], [175.0, -175.0, 160.0, -160.0])) == [0, 0, -1, -1]
+
+
+def test_altitude():
+    box = ([0.0, 0.0, 1.0, 1.0], [0.0, 1.0, 1.0, 0.0])
+    index = PolygonIndex([box, box], bottom=[0.0, 1000.0], top=[1000.0, 2000.0])
+    assert list(index.query([0.5] * 3, [0.5] * 3, [500.0, 1500.0, 2500.0])) == [0, 1, -1]
+
+
+def test_findarea(monkeypatch):
+    monkeypatch.setattr(areafilter.bs, 'scr', type('Screen', (), {'objappend': lambda *args: None})(),
+                        raising=False)
+    areafilter.reset()
+    areafilter.defineArea('LOW', 'POLYALT', [50, 4, 52, 4, 52, 6, 50, 6], 1000, 0)
+    areafilter.defineArea('HIGH', 'BOX', [50, 4, 52, 6], 2000, 1000)
+    areafilter.defineArea('CIRC', 'CIRCLE', [40, 0, 60])
+    lat = np.array([51.0, 51.0, 51.0, 40.0, 0.0])
+    lon = np.array([5.0, 5.0, 5.0, 0.5, 0.0])
+    alt = np.array([500.0, 1500.0, 2500.0, 0.0, 0.0])
+    found = areafilter.findArea(['LOW', 'HIGH', 'CIRC', 'NONE'], lat, lon, alt)
+    assert list(found) == [0, 1, -1, 2, -1]
+    for i, name in enumerate(['LOW', 'HIGH', 'CIRC']):
+        assert np.array_equal(found == i, areafilter.checkInside(name, lat, lon, alt))
+    areafilter.reset()
+
+
+def test_checkinsidemany(monkeypatch):
+    monkeypatch.setattr(areafilter.bs, 'scr', type('Screen', (), {'objappend': lambda *args: None})(),
+                        raising=False)
+    areafilter.reset()
+    rng = np.random.default_rng(3)
+    names = []
+    for i in range(20):
+        plat, plon = random_polygon(rng, rng.uniform(40, 60), rng.uniform(-10, 20), 3.0)
+        areafilter.defineArea('P%d' % i, 'POLYALT', np.column_stack((plat, plon)).ravel().tolist(),
+                              rng.uniform(5000, 10000), rng.uniform(0, 5000))
+        clat, clon = rng.uniform(40, 60), rng.uniform(-10, 20)
+        areafilter.defineArea('C%d' % i, 'CIRCLE', [clat, clon, rng.uniform(10, 200)])
+        areafilter.defineArea('B%d' % i, 'BOX', [clat, clon, clat + 2, clon + 3], 8000)
+        names += ['P%d' % i, 'C%d' % i, 'B%d' % i]
+    areafilter.defineArea('L', 'LINE', [50, 0, 51, 1])
+    names += ['L', 'NONE']
+
+    n = 5000
+    lat, lon, alt = rng.uniform(38, 62, n), rng.uniform(-12, 22, n), rng.uniform(0, 12000, n)
+    inside = areafilter.checkInsideMany(names, lat, lon, alt)
+    assert inside.shape == (len(names), n)
+    assert inside.any(axis=1)[:-2].all() and not inside[-2:].any()
+    for i, name in enumerate(names[:-2]):
+        assert np.array_equal(inside[i], areafilter.checkInside(name, lat, lon, alt))
+    # The polygon test agrees with matplotlib
+    for name in names[:-2:3]:
+        area = areafilter.areas[name]
+        expected = Path(np.column_stack((area.lat, area.lon))).contains_points(
+            np.column_stack((lat, lon))) & (area.bottom <= alt) & (alt <= area.top)
+        assert np.array_equal(inside[names.index(name)], expected)
+    areafilter.reset()
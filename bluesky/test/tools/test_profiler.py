@@ -0,0 +1,54 @@
+''' Tests for the simulation step profiler. '''
+import pytest
+from bluesky import settings
+from bluesky.tools import profiler
+
+
+@pytest.fixture
+def prof():
+    profiler.reset()
+    yield profiler
+    profiler.profile('OFF')
+    profiler.reset()
+
+
+def run_steps(n):
+    for _ in range(n):
+        profiler.start_step()
+        profiler.mark('first')
+        profiler.mark('second')
+        profiler.end_step()
+
+
+def test_off_records_nothing(prof):
+    run_steps(5)
+    assert not prof.phases
+
+
+def test_on(prof):
+    assert prof.profile('ON')[0]
+    run_steps(5)
+    assert list(prof.phases) == ['first', 'second', 'total']
+    stats = prof.stats()
+    assert stats['first'][4] == 5
+    mean, p50, p95, dtmax, _ = stats['total']
+    assert 0.0 <= p50 <= p95 <= dtmax
+    assert 'second' in prof.profile()[1]
+
+
+def test_rolling_window(prof, monkeypatch):
+    monkeypatch.setattr(settings, 'profile_window', 3)
+    prof.profile('ON')
+    run_steps(5)
+    assert prof.stats()['total'][4] == 3
+    prof.profile('RESET')
+    assert not prof.phases
+
+
+def test_dump(prof, tmpdir):
+    prof.profile('ON')
+    run_steps(2)
+    fname = str(tmpdir.join('profile.csv'))
+    assert prof.profile('DUMP', fname) == (True, 'Profile written to ' + fname)
+    lines = [line for line in open(fname) if not line.startswith('#')]
+    assert [line.split(',')[0] for line in lines] == ['first', 'second', 'total']
@@ -0,0 +1,58 @@
+''' Tests for the multi-rate scheduler. '''
+import pytest
+from bluesky import settings
+from bluesky.tools import scheduler
+
+
+@pytest.fixture
+def sched(monkeypatch):
+    monkeypatch.setattr(settings, 'simdt', 0.05, raising=False)
+    saved = list(scheduler.tasks)
+    scheduler.tasks[:] = []
+    yield scheduler
+    scheduler.tasks[:] = saved
+
+
+def run(group, nsteps, simdt=0.05):
+    for i in range(nsteps):
+        scheduler.update(group, i * simdt)
+
+
+def test_rate(sched):
+    calls = []
+    sched.register('A', 1.0, lambda: calls.append(1), 'test', offset=0.0)
+    run('test', 100)
+    assert len(calls) == 5
+    # Tasks with zero interval run every step
+    sched.register('B', 0.0, lambda: calls.append(2), 'test')
+    calls.clear()
+    sched.reset()
+    run('test', 20)
+    assert calls.count(2) == 20 and calls.count(1) == 1
+
+
+def test_stagger(sched):
+    tasks = [sched.register(name, 1.0) for name in 'ABC']
+    assert len({task.offset for task in tasks}) == 3
+    # Staggered tasks are due on different steps
+    for i in range(20):
+        assert sum(task.due(i * 0.05) for task in tasks) <= 1
+
+
+def test_catch_up(sched):
+    task = sched.register('A', 1.0, offset=0.0)
+    assert task.due(0.0)
+    # After skipping ahead, the task runs once and keeps its phase
+    assert task.due(10.5)
+    assert not task.due(10.9)
+    assert task.tnext == pytest.approx(11.0)
+
+
+def test_schedule_command(sched):
+    task = sched.register('A', 1.0)
+    assert not sched.schedule('NOTATASK', 1.0)[0]
+    assert sched.schedule('a', 2.0, 0.5)[0]
+    assert (task.dt, task.offset) == (2.0, 0.5)
+    assert 'A' in sched.schedule()[1]
+    sched.remove('A')
+    assert not sched.tasks
@@ -0,0 +1,53 @@
+''' Tests for the Chrome trace-event timeline tracer. '''
+import gc
+import json
+import time
+import pytest
+from bluesky.tools import profiler, tracer
+
+
+@pytest.fixture
+def trc():
+    tracer.start()
+    yield tracer
+    tracer.stop()
+
+
+def test_off():
+    assert not tracer.active
+    assert tracer.begin() == 0.0
+    tracer.end('x', 'test', 0.0)
+    profiler.start_step()
+    profiler.mark('phase')
+    profiler.end_step()
+    assert not any(event[0] in ('x', 'phase') for event in tracer.events)
+
+
+def test_dump(trc, tmpdir):
+    profiler.start_step()
+    profiler.mark('phase')
+    tstart = trc.begin()
+    trc.end(b'EVENT', 'send', tstart)
+    gc.collect()
+    profiler.end_step()
+
+    fname = str(tmpdir.join('trace.json'))
+    assert trc.dump(fname) == (fname, len(trc.events))
+    trace = json.load(open(fname))['traceEvents']
+    names = [event['name'] for event in trace]
+    assert 'gc generation 2' in names
+    # Automatic collections can happen at any point in the step
+    names = [name for name in names if not name.startswith('gc')]
+    assert names[0] == 'phase'
+    assert 'EVENT' in names
+    assert names[-1] == 'step'
+    assert all(event['ph'] == 'X' and event['dur'] >= 0.0 for event in trace)
+
+
+def test_dump_last_seconds(trc, tmpdir):
+    trc.complete('old', 'test', time.perf_counter() - 10.0, time.perf_counter() - 9.0)
+    trc.complete('new', 'test', time.perf_counter(), time.perf_counter())
+    fname = str(tmpdir.join('trace.json'))
+    assert trc.trace('DUMP', fname + ' 5')[0]
+    trace = json.load(open(fname))['traceEvents']
+    assert [event['name'] for event in trace] == ['new']
@@ -142,3 +142,18 @@ def test_trafficarrays_reset(t_a):
 
     assert not root.fl_list
     assert not root.children[0].np_array_bool
+
+
+def test_trafficarrays_getvar(t_a):
+    """
+    Tests lookup of registered variables by (dotted) name.
+    Expects None for unknown or unregistered names.
+    """
+    root, _tcclass = t_a
+
+    assert root.getvar('int_list') is root.int_list
+    assert root.getvar('test_child.np_array_int') is \
+        root.children[0].np_array_int
+    assert root.getvar('children') is None
+    assert root.getvar('test_child.unknown') is None
+    assert root.getvar('unknown.np_array_int') is None
@@ -1,11 +1,15 @@
 """Area filter module"""
-from matplotlib.path import Path
 import numpy as np
 import bluesky as bs
+from bluesky.tools.aero import nm
 from bluesky.tools.geo import kwikdist
+from bluesky.tools.polygonindex import PolygonIndex, BLOCKSIZE, crosses, inside_polygon
 
 areas = dict()
 
+# Data of lists of areas, see findArea and checkInsideMany
+areacache = dict()
+
 
 def hasArea(areaname):
     """Check if area with name 'areaname' exists."""
@@ -22,6 +26,7 @@ def defineArea(areaname, areatype, coordinates, top=1e9, bottom=-1e9):
         areas[areaname] = Poly(areaname, coordinates, top, bottom)
     elif areatype == 'LINE':
         areas[areaname] = Line(areaname, coordinates)
+    areacache.clear()
 
     # Pass the shape on to the screen object
     bs.scr.objappend(areatype, areaname, coordinates)
@@ -30,23 +35,74 @@ def checkInside(areaname, lat, lon, alt):
     """ Check if points with coordinates lat, lon, alt are inside area with name 'areaname'.
         Returns an array of booleans. True ==  Inside"""
     if areaname not in areas:
-        return np.zeros(len(lat), dtype=np.bool)
+        return np.zeros(len(lat), dtype=bool)
     area = areas[areaname]
     return area.checkInside(lat, lon, alt)
 
+def checkInsideMany(areanames, lat, lon, alt):
+    """ Check if points with coordinates lat, lon, alt are inside each of the
+        areas with names 'areanames'. Returns an array of booleans with a row
+        per area. True == Inside"""
+    key = ('many', tuple(areanames))
+    if key not in areacache:
+        areacache[key] = AreaArrays([areas.get(name) for name in areanames])
+    return areacache[key].checkInside(lat, lon, alt)
+
+def findArea(areanames, lat, lon, alt):
+    """ For points with coordinates lat, lon, alt, find the area in the list
+        of names 'areanames' that contains them, such as the sector of each
+        aircraft. Returns an array of indices in areanames (the first area
+        if several contain a point, -1 for none). """
+    key = ('find', tuple(areanames))
+    if key not in areacache:
+        # Boxes and polygons are found with a polygon index
+        shapes = [areas.get(name) for name in areanames]
+        inpoly = [i for i, shape in enumerate(shapes) if shape is not None and
+                  shape.polygon() is not None]
+        areacache[key] = (np.array(inpoly + [-1], dtype=int),
+                          PolygonIndex([shapes[i].polygon() for i in inpoly],
+                                       [shapes[i].bottom for i in inpoly],
+                                       [shapes[i].top for i in inpoly]))
+    inpoly, index = areacache[key]
+    found = inpoly[index.query(lat, lon, alt)]
+
+    # Other shapes are checked one by one
+    for i, name in enumerate(areanames):
+        if name in areas and i not in inpoly:
+            inside = areas[name].checkInside(lat, lon, alt) & ((found < 0) | (found > i))
+            found[inside] = i
+    return found
+
 def deleteArea(areaname):
     """ Delete area with name 'areaname'. """
     if areaname in areas:
         areas.pop(areaname)
+        areacache.clear()
         bs.scr.objappend('', areaname, None)
 
 def reset():
     """ Clear all data. """
     areas.clear()
+    areacache.clear()
 
 class Shape:
-    def __init__(self, shape, name, coordinates):
+    def __init__(self, shape, name, coordinates, top=1e9, bottom=-1e9):
         self.raw = dict(name=name, shape=shape, coordinates=coordinates)
+        self.top    = np.maximum(bottom,top)
+        self.bottom = np.minimum(bottom,top)
+        # Bounding box (lat0, lat1, lon0, lon1): points outside it are
+        # outside the shape, and need no further check
+        self.bbox   = (np.inf, -np.inf, np.inf, -np.inf)
+
+    def polygon(self):
+        ''' The vertices (lat, lon) of this shape, if it is a polygon. '''
+        return None
+
+    def inBox(self, lat, lon, alt):
+        ''' Check if points are inside the bounding box and altitude range of this shape. '''
+        lat0, lat1, lon0, lon1 = self.bbox
+        return (lat0 <= lat) & (lat <= lat1) & (lon0 <= lon) & (lon <= lon1) & \
+               (self.bottom <= alt) & (alt <= self.top)
 
 
 class Line(Shape):
@@ -60,45 +116,117 @@ class Line(Shape):
 
 class Box(Shape):
     def __init__(self, name, coordinates, top=1e9, bottom=-1e9):
-        super(Box, self).__init__('BOX', name, coordinates)
-        self.top    = np.maximum(bottom,top)
-        self.bottom = np.minimum(bottom,top)
+        super(Box, self).__init__('BOX', name, coordinates, top, bottom)
         # Sort the order of the corner points
         self.lat0 = min(coordinates[0], coordinates[2])
         self.lon0 = min(coordinates[1], coordinates[3])
         self.lat1 = max(coordinates[0], coordinates[2])
         self.lon1 = max(coordinates[1], coordinates[3])
+        self.bbox = (self.lat0, self.lat1, self.lon0, self.lon1)
+
+    def polygon(self):
+        return ([self.lat0, self.lat0, self.lat1, self.lat1],
+                [self.lon0, self.lon1, self.lon1, self.lon0])
 
     def checkInside(self, lat, lon, alt):
-        inside = ((self.lat0 <=  lat) & ( lat <= self.lat1)) & \
-                 ((self.lon0 <= lon) & (lon <= self.lon1)) & \
-                 ((self.bottom <= alt) & (alt <= self.top))
-        return inside
+        return self.inBox(lat, lon, alt)
 
 
 class Circle(Shape):
     def __init__(self, name, coordinates, top=1e9, bottom=-1e9):
-        super(Circle, self).__init__('CIRCLE', name, coordinates)
+        super(Circle, self).__init__('CIRCLE', name, coordinates, top, bottom)
         self.clat   = coordinates[0]
         self.clon   = coordinates[1]
         self.r      = coordinates[2]
-        self.top    = np.maximum(bottom,top)
-        self.bottom = np.minimum(bottom,top)
+        # Largest latitude and longitude difference within distance r
+        # (as computed by kwikdist), with a margin for round-off
+        dlat = np.degrees(self.r * nm / 6371000.) + 1e-6
+        coslat = np.cos(np.radians(min(90.0, abs(self.clat) + dlat)))
+        dlon = np.degrees(self.r * nm / 6371000.) / coslat + 1e-6 \
+            if coslat > 1e-6 else np.inf
+        self.bbox = (self.clat - dlat, self.clat + dlat, self.clon - dlon, self.clon + dlon)
 
     def checkInside(self, lat, lon, alt):
-        distance = kwikdist(self.clat, self.clon, lat, lon)  # [NM]
-        inside   = (distance <= self.r) & (self.bottom <= alt) & (alt <= self.top)
+        inside   = self.inBox(lat, lon, alt)
+        idx      = np.flatnonzero(inside)
+        distance = kwikdist(self.clat, self.clon, np.asarray(lat)[idx], np.asarray(lon)[idx])  # [NM]
+        inside[idx] = distance <= self.r
         return inside
 
 
 class Poly(Shape):
     def __init__(self, name, coordinates, top=1e9, bottom=-1e9):
-        super(Poly, self).__init__('POLY', name, coordinates)
-        self.border = Path(np.reshape(coordinates, (len(coordinates) // 2, 2)))
-        self.top    = np.maximum(bottom,top)
-        self.bottom = np.minimum(bottom,top)
+        super(Poly, self).__init__('POLY', name, coordinates, top, bottom)
+        self.lat    = np.array(coordinates[::2], dtype=float)
+        self.lon    = np.array(coordinates[1::2], dtype=float)
+        self.bbox   = (self.lat.min(), self.lat.max(), self.lon.min(), self.lon.max())
+
+    def polygon(self):
+        return self.lat, self.lon
+
+    def checkInside(self, lat, lon, alt):
+        inside = self.inBox(lat, lon, alt)
+        idx    = np.flatnonzero(inside)
+        inside[idx] = inside_polygon(np.asarray(lat)[idx], np.asarray(lon)[idx], self.lat, self.lon)
+        return inside
+
+
+class AreaArrays:
+    ''' The data of a list of areas as arrays, to check for all areas at once
+        which points are inside them. '''
+    def __init__(self, shapes):
+        shapes = [shape or Shape('', '', []) for shape in shapes]
+        self.bbox   = np.array([shape.bbox for shape in shapes], dtype=float).reshape(-1, 4)
+        self.bottom = np.array([shape.bottom for shape in shapes], dtype=float)
+        self.top    = np.array([shape.top for shape in shapes], dtype=float)
+
+        # Circles
+        self.iscircle = np.array([isinstance(shape, Circle) for shape in shapes], dtype=bool)
+        self.circle   = np.array([(shape.clat, shape.clon, shape.r) if isinstance(shape, Circle)
+                                  else (0.0, 0.0, 0.0) for shape in shapes]).reshape(-1, 3)
+
+        # Polygons: the edges of area i are edges[estart[i]:estart[i+1]]
+        self.ispoly = np.array([isinstance(shape, Poly) for shape in shapes], dtype=bool)
+        plat = [shape.lat if isinstance(shape, Poly) else np.zeros(0) for shape in shapes]
+        plon = [shape.lon if isinstance(shape, Poly) else np.zeros(0) for shape in shapes]
+        self.estart = np.cumsum([0] + [len(lat) for lat in plat])
+        self.elat0  = np.concatenate(plat) if plat else np.zeros(0)
+        self.elon0  = np.concatenate(plon) if plon else np.zeros(0)
+        self.elat1  = np.concatenate([np.roll(lat, -1) for lat in plat]) if plat else np.zeros(0)
+        self.elon1  = np.concatenate([np.roll(lon, -1) for lon in plon]) if plon else np.zeros(0)
 
     def checkInside(self, lat, lon, alt):
-        points = np.vstack((lat,lon)).T
-        inside = np.all((self.border.contains_points(points), self.bottom <= alt, alt <= self.top), axis=0)
+        lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        alt = np.broadcast_to(np.asarray(alt, dtype=float), lat.shape)
+
+        # Bounding boxes and altitude ranges of all areas, exact for boxes
+        lat0, lat1, lon0, lon1 = (col[:, np.newaxis] for col in self.bbox.T)
+        inside = (lat0 <= lat) & (lat <= lat1) & (lon0 <= lon) & (lon <= lon1) & \
+                 (self.bottom[:, np.newaxis] <= alt) & (alt <= self.top[:, np.newaxis])
+
+        # Circles: distance of the points inside the bounding box
+        iarea, ipoint = np.nonzero(inside & self.iscircle[:, np.newaxis])
+        clat, clon, r = self.circle[iarea].T
+        inside[iarea, ipoint] = kwikdist(clat, clon, lat[ipoint], lon[ipoint]) <= r
+
+        # Polygons: crossing-number test of the points inside the bounding
+        # box, for each (area, point) pair with all edges of the area
+        iarea, ipoint = np.nonzero(inside & self.ispoly[:, np.newaxis])
+        nedges = self.estart[iarea + 1] - self.estart[iarea]
+        last   = np.cumsum(nedges)
+        first  = 0
+        while first < len(iarea):
+            # Blocks of pairs with at most BLOCKSIZE pair/edge combinations
+            end = max(first + 1, np.searchsorted(last, last[first] - nedges[first] + BLOCKSIZE,
+                                                 side='right'))
+            n     = nedges[first:end]
+            pair  = np.repeat(np.arange(end - first), n)
+            edge  = np.arange(len(pair)) - np.repeat(np.cumsum(n) - n - self.estart[iarea[first:end]], n)
+            plat  = lat[ipoint[first:end]][pair]
+            plon  = lon[ipoint[first:end]][pair]
+            count = np.bincount(pair, crosses(plat, plon, self.elat0[edge], self.elon0[edge],
+                                              self.elat1[edge], self.elon1[edge]),
+                                minlength=end - first)
+            inside[iarea[first:end], ipoint[first:end]] = count % 2 == 1
+            first = end
         return inside
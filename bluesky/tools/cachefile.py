@@ -1,8 +1,29 @@
+''' Cache files of data that is derived from source files.
+
+    A cache has a key that combines a code version with the size and
+    modification time of its source files, so that a cache is rebuilt
+    when the code or the source data changes. Caches are written to a
+    temporary file or directory, which is renamed when it is complete, so
+    a crashed write never leaves a corrupt cache behind. Processes that
+    find a cache missing take a file lock before building it, so that of
+    several processes that start at the same time only one builds the
+    cache, and the others wait for it and load the result.
+'''
+import os
 from os import path
+import hashlib
+import json
+import shutil
 try:
     import cPickle as pickle
 except ImportError:
     import pickle
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+import numpy as np
 
 from bluesky import settings
 
@@ -14,32 +35,112 @@ def openfile(*args):
     return CacheFile(*args)
 
 
+def opendir(*args):
+    return CacheDir(*args)
+
+
 class CacheError(Exception):
     ''' Exception class for CacheFile errors. '''
     pass
 
 
+def cache_key(version, sources=()):
+    ''' Return the cache key for a code version and the given source files
+        (or directories of source files). The key changes when the version,
+        or the size or modification time of one of the sources changes. '''
+    if not sources:
+        return version
+    sha = hashlib.sha1()
+    for source in sources:
+        files = [path.join(source, f) for f in sorted(os.listdir(source))] \
+            if path.isdir(source) else [source]
+        for fname in files:
+            try:
+                stat = os.stat(fname)
+                sha.update('{}:{}:{}\n'.format(fname, stat.st_size, stat.st_mtime_ns).encode())
+            except OSError:
+                sha.update('{}:missing\n'.format(fname).encode())
+    return '{}-{}'.format(version, sha.hexdigest()[:16])
+
+
+class FileLock():
+    ''' Exclusive lock on a lock file, shared between processes. '''
+    def __init__(self, fname):
+        self.fname = fname
+        self.file = None
+
+    def acquire(self):
+        ''' Wait until the lock is free, and take it. '''
+        if self.file is not None:
+            return
+        os.makedirs(path.dirname(self.fname), exist_ok=True)
+        self.file = open(self.fname, 'a+')
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    # LK_LOCK gives up after ten seconds
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+
+    def release(self):
+        ''' Release the lock, if this process holds it. '''
+        if self.file is None:
+            return
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+        self.file = None
+
+
 class CacheFile():
     ''' Convenience class for loading and saving pickle cache files. '''
-    def __init__(self, fname, version_ref='1'):
+    def __init__(self, fname, version_ref='1', sources=()):
         self.fname = path.join(settings.cache_path, fname)
-        self.version_ref = version_ref
+        self.version_ref = cache_key(version_ref, sources)
+        self.lock = FileLock(self.fname + '.lock')
         self.file = None
+        self.tmpname = None
+        self.tmpfile = None
 
     def check_cache(self):
         ''' Check whether the cachefile exists, and is of the correct version. '''
+        msg = self.open_cache()
+        if msg:
+            # Wait until no other process is building this cache, and check
+            # again. If it is still invalid the lock is kept while this
+            # process builds the cache.
+            self.lock.acquire()
+            msg = self.open_cache()
+            if msg:
+                raise CacheError(msg + self.fname)
+            self.lock.release()
+        print('Reading cache: ' + self.fname)
+
+    def open_cache(self):
+        ''' Open the cache file. Returns an error message when it is
+            missing or out of date. '''
         if not path.isfile(self.fname):
-            raise CacheError('Cachefile not found: ' + self.fname)
+            return 'Cachefile not found: '
 
         self.file = open(self.fname, 'rb')
-        version = pickle.load(self.file)
+        try:
+            version = pickle.load(self.file)
+        except (pickle.PickleError, EOFError):
+            version = None
 
         # Version check
         if not version == self.version_ref:
             self.file.close()
             self.file = None
-            raise CacheError('Cache file out of date: ' + self.fname)
-        print('Reading cache: ' + self.fname)
+            return 'Cache file out of date: '
+        return ''
 
     def load(self):
         ''' Load a variable from the cache file. '''
@@ -50,11 +151,13 @@ class CacheFile():
 
     def dump(self, var):
         ''' Dump a variable to the cache file. '''
-        if self.file is None:
-            self.file = open(self.fname, 'wb')
-            pickle.dump(self.version_ref, self.file, pickle.HIGHEST_PROTOCOL)
+        if self.tmpfile is None:
+            os.makedirs(path.dirname(self.fname), exist_ok=True)
+            self.tmpname = '{}.tmp{}'.format(self.fname, os.getpid())
+            self.tmpfile = open(self.tmpname, 'wb')
+            pickle.dump(self.version_ref, self.tmpfile, pickle.HIGHEST_PROTOCOL)
             print("Writing cache: " + self.fname)
-        pickle.dump(var, self.file, pickle.HIGHEST_PROTOCOL)
+        pickle.dump(var, self.tmpfile, pickle.HIGHEST_PROTOCOL)
 
     def __enter__(self):
         return self
@@ -62,3 +165,129 @@ class CacheFile():
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.file:
             self.file.close()
+        if self.tmpfile:
+            self.tmpfile.close()
+            # Only a completely written cache replaces the old one
+            if exc_type is None:
+                os.replace(self.tmpname, self.fname)
+            else:
+                os.remove(self.tmpname)
+        self.lock.release()
+
+
+class CacheDir():
+    ''' Columnar cache: a directory of raw .npy arrays, that are loaded
+        memory-mapped, so that all processes on a host share one physical
+        copy of the data.
+
+        Data is stored in groups of named columns (a dict). A column can be
+        a numeric array, a list of numbers, or a list of strings, which is
+        stored as a packed, null-separated character array and an array of
+        string offsets. Lists are converted back to lists when they are
+        loaded. Each cache key has its own subdirectory, which also holds a
+        manifest of the stored columns. '''
+    def __init__(self, dirname, version_ref='1', sources=()):
+        self.basedir = path.join(settings.cache_path, dirname)
+        self.version_ref = cache_key(version_ref, sources)
+        self.dirname = path.join(self.basedir, self.version_ref)
+        self.lock = FileLock(path.join(self.basedir, 'lock'))
+        self.manifest = None
+        self.tmpdir = None
+        self.dumped = dict()
+
+    def fname(self, group, column, suffix='', dirname=None):
+        return path.join(dirname or self.dirname, '{}.{}{}.npy'.format(group, column, suffix))
+
+    def check_cache(self):
+        ''' Check whether the cache exists, and is of the correct version. '''
+        fname = path.join(self.dirname, 'manifest.json')
+        if not path.isfile(fname):
+            # Wait until no other process is building this cache, and check
+            # again. If it is still missing the lock is kept while this
+            # process builds the cache.
+            self.lock.acquire()
+            if not path.isfile(fname):
+                raise CacheError('Cache not found or out of date: ' + self.basedir)
+            self.lock.release()
+
+        with open(fname, 'r') as f:
+            self.manifest = json.load(f)
+        print('Reading cache: ' + self.basedir)
+
+    def load(self, group):
+        ''' Load a group of columns from the cache, as a dict. '''
+        if self.manifest is None:
+            self.check_cache()
+        if group not in self.manifest['groups']:
+            raise CacheError('{} not in cache {}'.format(group, self.basedir))
+
+        data = dict()
+        try:
+            for column, kind in self.manifest['groups'][group].items():
+                if kind == 'strings':
+                    chars = np.load(self.fname(group, column, '.chars'), mmap_mode='r')
+                    offsets = np.load(self.fname(group, column, '.offsets'))
+                    data[column] = bytes(chars).decode('utf-8').split('\0') \
+                        if len(offsets) > 1 else []
+                elif kind == 'list':
+                    data[column] = np.load(self.fname(group, column)).tolist()
+                else:
+                    # A plain array view on the memory map, so that results
+                    # of array operations are not memmap objects
+                    data[column] = np.load(self.fname(group, column),
+                                           mmap_mode='r').view(np.ndarray)
+        except (IOError, ValueError) as e:
+            raise CacheError('Error reading cache {}: {}'.format(self.dirname, e))
+        return data
+
+    def dump(self, group, data):
+        ''' Store a group of columns (a dict) in the cache. '''
+        if self.tmpdir is None:
+            self.tmpdir = '{}.tmp{}'.format(self.dirname, os.getpid())
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+            os.makedirs(self.tmpdir)
+            print('Writing cache: ' + self.basedir)
+
+        kinds = dict()
+        for column, value in data.items():
+            if isinstance(value, np.ndarray):
+                kinds[column] = 'array'
+                np.save(self.fname(group, column, dirname=self.tmpdir), value)
+            elif all(isinstance(v, str) and '\0' not in v for v in value):
+                kinds[column] = 'strings'
+                # Offsets are character positions in the decoded text
+                offsets = np.cumsum([0] + [len(v) + 1 for v in value])
+                np.save(self.fname(group, column, '.chars', self.tmpdir),
+                        np.frombuffer('\0'.join(value).encode('utf-8'), dtype=np.uint8))
+                np.save(self.fname(group, column, '.offsets', self.tmpdir), offsets)
+            else:
+                kinds[column] = 'list'
+                np.save(self.fname(group, column, dirname=self.tmpdir), np.array(value))
+        self.dumped[group] = kinds
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.tmpdir:
+            if exc_type is None:
+                with open(path.join(self.tmpdir, 'manifest.json'), 'w') as f:
+                    json.dump(dict(version=self.version_ref, groups=self.dumped), f)
+                # Only a completely written cache is moved into place.
+                # Caches of other versions are removed; on systems that do
+                # not allow removing files that are in use, they stay.
+                shutil.rmtree(self.dirname, ignore_errors=True)
+                os.rename(self.tmpdir, self.dirname)
+                for name in os.listdir(self.basedir):
+                    if name not in (self.version_ref, 'lock') and '.tmp' not in name:
+                        stale = path.join(self.basedir, name)
+                        try:
+                            if path.isdir(stale):
+                                shutil.rmtree(stale)
+                            else:
+                                os.remove(stale)
+                        except OSError:
+                            pass
+            else:
+                shutil.rmtree(self.tmpdir, ignore_errors=True)
+        self.lock.release()
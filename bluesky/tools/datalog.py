@@ -7,6 +7,7 @@ import numbers
 from datetime import datetime
 import numpy as np
 from bluesky import settings, stack
+from bluesky.tools import scheduler
 import bluesky as bs
 
 # Register settings defaults
@@ -50,8 +51,7 @@ def preupdate(simt):
 def postupdate():
     """ This function writes to files of all periodic logs by calling the appropriate
     functions for each type of periodic log, at the approriate update time. """
-    for key, log in periodicloggers.items():
-        log.log()
+    scheduler.update('log', bs.sim.simt)
 
 
 def reset():
@@ -94,13 +94,14 @@ class CSVLogger:
         self.file        = None
         self.dataparents = []
         self.header      = ''
-        self.tlog        = 0.0
         self.allvars     = []
         self.selvars     = []
 
-        # In case this is a periodic logger: log timestep
-        self.dt          = 0.0
+        # In case this is a periodic logger: log timestep, and the
+        # scheduler task that runs the logger
+        self._dt         = 0.0
         self.default_dt  = 0.0
+        self.task        = None
 
         # Register a command for this logger in the stack
         stackcmd = {name : [
@@ -138,6 +139,18 @@ class CSVLogger:
         del obj.log_attrs
         self.dataparents.pop()
 
+    @property
+    def dt(self):
+        ''' Log timestep. While the logger runs this is the interval of its
+            scheduler task, which can be changed with SCHEDULE. '''
+        return self.task.dt if self.task else self._dt
+
+    @dt.setter
+    def dt(self, dt):
+        self._dt = dt
+        if self.task:
+            self.task.dt = dt
+
     def setheader(self, header):
         self.header     = header.split('\n')
 
@@ -171,10 +184,7 @@ class CSVLogger:
         return self.file is not None
 
     def log(self, *additional_vars):
-        if self.file and bs.sim.simt >= self.tlog:
-            # Set the next log timestep
-            self.tlog += self.dt
-
+        if self.file:
             # Make the variable reference list
             varlist  = [bs.sim.simt]
             varlist += [v[0].__dict__.get(vname) for v in self.selvars for vname in v[1]]
@@ -196,12 +206,17 @@ class CSVLogger:
 
     def start(self):
         ''' Start this logger. '''
-        self.tlog = bs.sim.simt
         self.open(makeLogfileName(self.name))
+        # Periodic loggers are executed by the scheduler, with the first
+        # log at the start time
+        if self.name in periodicloggers:
+            self.task = scheduler.register(self.name, self.dt, self.log, 'log',
+                                           offset=bs.sim.simt)
 
     def reset(self):
+        scheduler.remove(self.name, 'log')
+        self.task       = None
         self.dt         = self.default_dt
-        self.tlog       = 0.0
         self.selvars    = list(self.allvars)
         if self.file:
             self.file.close()
@@ -45,6 +45,12 @@ def update(simt):
         bs.net.send_stream(streamname, data)
 
 
+def get_nexttime():
+    ''' Return the simulation time at which the next plot update is due
+        (inf if there are no plots). '''
+    return min((plot.tnext for plot in plots), default=float('inf'))
+
+
 def getvarsfromobj(obj):
     ''' Return a list with the numeric variables of the passed object.'''
     def is_num(o):
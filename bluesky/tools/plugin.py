@@ -6,7 +6,7 @@ from glob import glob
 import imp
 import bluesky as bs
 from bluesky import settings
-from bluesky.tools import plotter
+from bluesky.tools import plotter, scheduler
 
 # Register settings defaults
 settings.set_variable_defaults(plugin_path='plugins', enabled_plugins=['datafeed'])
@@ -105,10 +105,12 @@ def init(mode):
         print(success[1])
 
 
-# Sim implementation of plugin management
-preupdate_funs = dict()
-update_funs    = dict()
+# Sim implementation of plugin management. The update functions of plugins
+# are executed by the scheduler, at the update interval of each plugin.
 reset_funs     = dict()
+# Plugins that have no work while there is no traffic (True, or a function
+# that returns True when idle). These don't stop fast-time from skipping ahead.
+idle_funs      = dict()
 
 def load(name):
     ''' Load a plugin. '''
@@ -128,12 +130,15 @@ def load(name):
         prefun = config.get('preupdate')
         updfun = config.get('update')
         rstfun = config.get('reset')
+        # Plugins are first updated one interval after the start of the simulation
         if prefun:
-            preupdate_funs[name] = [bs.sim.simt + dt, dt, prefun]
+            scheduler.register(name, dt, prefun, 'preupdate', offset=dt)
         if updfun:
-            update_funs[name]    = [bs.sim.simt + dt, dt, updfun]
+            scheduler.register(name, dt, updfun, 'update', offset=dt)
         if rstfun:
             reset_funs[name]     = rstfun
+        if config.get('idle_without_traffic'):
+            idle_funs[name]      = config['idle_without_traffic']
         # Add the plugin's stack functions to the stack
         bs.stack.append_commands(stackfuns)
         # Add the plugin as data parent to the plotter
@@ -155,36 +160,32 @@ def remove(name):
     cmds, _ = list(zip(*descr.plugin_stack))
     bs.stack.remove_commands(cmds)
     active_plugins.pop(name)
-    preupdate_funs.pop(name)
-    update_funs.pop(name)
+    idle_funs.pop(name, None)
+    scheduler.remove(name, 'preupdate')
+    scheduler.remove(name, 'update')
 
 def preupdate(simt):
     ''' Update function executed before traffic update.'''
-    for fun in preupdate_funs.values():
-        # Call function if its update interval has passed
-        if simt >= fun[0]:
-            # Set the next triggering time for this function
-            fun[0] += fun[1]
-            # Call the function
-            fun[2]()
+    scheduler.update('preupdate', simt)
 
 def update(simt):
     ''' Update function executed after traffic update.'''
-    for fun in update_funs.values():
-        # Call function if its update interval has passed
-        if simt >= fun[0]:
-            # Set the next triggering time for this function
-            fun[0] += fun[1]
-            # Call the function
-            fun[2]()
+    scheduler.update('update', simt)
+
+def is_idle(name):
+    ''' Returns True if plugin name has no work while there is no traffic. '''
+    idle = idle_funs.get(name, False)
+    return idle() if callable(idle) else idle
+
+def get_nexttime():
+    ''' Return the simulation time at which the next update is due of the
+        plugins that have work without traffic (inf if there are none). '''
+    return min((task.tnext for task in scheduler.tasks if task.group in
+                ('preupdate', 'update') and not is_idle(task.name)),
+               default=float('inf'))
 
 def reset():
     ''' Reset all plugins.'''
-    # Reset trigger times
-    for fun in preupdate_funs.values():
-        fun[0] = fun[1]
-    for fun in update_funs.values():
-        fun[0] = fun[1]
     # Call plugin reset for plugins that have one
     for fun in reset_funs.values():
         fun()
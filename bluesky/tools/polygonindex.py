@@ -0,0 +1,163 @@
+''' Grid index of a static set of polygons, for point-in-polygon queries. '''
+import numpy as np
+
+# Maximum number of point/edge pairs that is evaluated at once
+BLOCKSIZE = 1 << 20
+
+
+def crosses(lat, lon, lat0, lon0, lat1, lon1):
+    ''' Returns (elementwise) whether the ray eastward from lat, lon crosses
+        the edge from lat0, lon0 to lat1, lon1. '''
+    straddle = (lat0 > lat) != (lat1 > lat)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        xcross = lon0 + (lat - lat0) * (lon1 - lon0) / (lat1 - lat0)
+    return straddle & (lon < xcross)
+
+
+def inside_polygon(lat, lon, plat, plon):
+    ''' Crossing-number test: returns for each point lat, lon whether it is
+        inside the polygon with vertices plat, plon. '''
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    lat0, lon0 = np.asarray(plat, dtype=float), np.asarray(plon, dtype=float)
+    lat1, lon1 = np.roll(lat0, -1), np.roll(lon0, -1)
+    inside = np.zeros(len(lat), dtype=bool)
+    npoints = max(1, BLOCKSIZE // max(1, len(lat0)))
+    for i in range(0, len(lat), npoints):
+        y = lat[i:i + npoints, np.newaxis]
+        x = lon[i:i + npoints, np.newaxis]
+        # Count the edges that cross the ray eastward from each point
+        inside[i:i + npoints] = np.count_nonzero(crosses(y, x, lat0, lon0, lat1, lon1),
+                                                 axis=1) % 2 == 1
+    return inside
+
+
+def unwrap(lon):
+    ''' Make the longitudes of a polygon continuous across the date line. '''
+    lon = np.asarray(lon, dtype=float)
+    if len(lon) < 2:
+        return lon
+    return lon[0] + np.concatenate(([0.0], np.cumsum((np.diff(lon) + 180.0) % 360.0 - 180.0)))
+
+
+class PolygonIndex:
+    ''' Index of a static set of (possibly overlapping) polygons, such as
+        FIRs or sectors, to find the polygon that contains each of a set of
+        points.
+
+        The index is a lat/lon grid that lists for each cell the polygons
+        that overlap it, sorted by polygon, in compressed form: the
+        polygons of cell i are cellpoly[cellstart[i]:cellstart[i+1]].
+        Cells that are completely inside a polygon are flagged in
+        cellfull: points in these cells need no further check. Only points
+        in cells on the border of a polygon are checked exactly, with a
+        crossing-number test, so the cost of a query hardly depends on the
+        number of polygons.
+
+        Polygons can have an altitude range (bottom, top); points outside
+        this range are not inside the polygon. '''
+    def __init__(self, polygons, bottom=None, top=None, cellsize=1.0):
+        ''' Build the index of polygons, a list of (lat, lon) vertex lists,
+            with a grid of cells of cellsize [deg] (a divisor of 180). '''
+        npoly          = len(polygons)
+        self.cellsize  = cellsize
+        self.nrows     = int(round(180.0 / cellsize))
+        self.ncols     = int(round(360.0 / cellsize))
+        self.plat      = [np.asarray(lat, dtype=float) for lat, _ in polygons]
+        self.plon      = [unwrap(lon) for _, lon in polygons]
+        self.lonmin    = np.array([lon.min() for lon in self.plon]) if npoly else np.zeros(0)
+        self.bottom    = np.full(npoly, -1e9) if bottom is None else np.asarray(bottom, dtype=float)
+        self.top       = np.full(npoly, 1e9) if top is None else np.asarray(top, dtype=float)
+
+        cells, polys, full = [], [], []
+        for ipoly, (lat, lon) in enumerate(zip(self.plat, self.plon)):
+            # Border cells: split the edges in pieces no longer than a cell,
+            # each piece lies in the cells of the corners of its bounding box
+            lat0, lon0 = lat, lon
+            lat1, lon1 = np.roll(lat, -1), np.roll(lon, -1)
+            npieces = np.maximum(1, np.ceil(np.maximum(np.abs(lat1 - lat0),
+                                                       np.abs(lon1 - lon0)) / cellsize)).astype(int)
+            iedge = np.repeat(np.arange(len(lat)), npieces)
+            frac0 = (np.arange(len(iedge)) - np.repeat(np.cumsum(npieces) - npieces, npieces)) \
+                / npieces[iedge]
+            frac1 = frac0 + 1.0 / npieces[iedge]
+            pieces = []
+            for frac in (frac0, frac1):
+                pieces.append((lat0[iedge] + frac * (lat1 - lat0)[iedge],
+                               lon0[iedge] + frac * (lon1 - lon0)[iedge]))
+            border = np.unique(np.concatenate([
+                self.cell(pieces[i][0], pieces[j][1]) for i in (0, 1) for j in (0, 1)]))
+
+            # Cells inside the bounding box are inside when their centre is
+            rows = np.arange(self.row(lat.min()), self.row(lat.max()) + 1)
+            cols = np.arange(np.floor((lon.min() + 180.0) / cellsize),
+                             np.floor((lon.max() + 180.0) / cellsize) + 1).astype(int)
+            crow, ccol = np.meshgrid(rows, cols, indexing='ij')
+            ccell = (crow * self.ncols + ccol % self.ncols).ravel()
+            clat = ((crow + 0.5) * cellsize - 90.0).ravel()
+            clon = ((ccol + 0.5) * cellsize - 180.0).ravel()
+            interior = ~np.isin(ccell, border)
+            interior[interior] = inside_polygon(clat[interior], clon[interior], lat, lon)
+
+            cells.extend((border, ccell[interior]))
+            polys.append(np.full(len(border) + np.count_nonzero(interior), ipoly))
+            full.extend((np.zeros(len(border), dtype=bool), np.ones(np.count_nonzero(interior), dtype=bool)))
+
+        cells = np.concatenate(cells).astype(int) if cells else np.zeros(0, dtype=int)
+        polys = np.concatenate(polys).astype(int) if polys else np.zeros(0, dtype=int)
+        full  = np.concatenate(full) if full else np.zeros(0, dtype=bool)
+        order = np.lexsort((polys, cells))
+        self.cellpoly  = polys[order]
+        self.cellfull  = full[order]
+        self.cellstart = np.searchsorted(cells[order], np.arange(self.nrows * self.ncols + 1))
+
+    def row(self, lat):
+        ''' Row of latitude lat [deg] in the grid. '''
+        return np.clip(np.floor((np.asarray(lat) + 90.0) / self.cellsize).astype(int),
+                       0, self.nrows - 1)
+
+    def cell(self, lat, lon):
+        ''' Grid cell of lat, lon [deg]. '''
+        col = np.floor((np.asarray(lon) + 180.0) / self.cellsize).astype(int) % self.ncols
+        return self.row(lat) * self.ncols + col
+
+    def query(self, lat, lon, alt=None):
+        ''' Return for each point lat, lon (and alt) the index of the
+            polygon that contains it, or -1 if there is none. When several
+            polygons contain a point, the first is returned. '''
+        scalar = np.ndim(lat) == 0
+        lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        lon = np.atleast_1d(np.asarray(lon, dtype=float))
+
+        # All (point, candidate polygon) pairs
+        cell   = self.cell(lat, lon)
+        first  = self.cellstart[cell]
+        counts = self.cellstart[cell + 1] - first
+        ipoint = np.repeat(np.arange(len(lat)), counts)
+        entry  = np.arange(len(ipoint)) - np.repeat(np.cumsum(counts) - counts - first, counts)
+        poly   = self.cellpoly[entry]
+        inside = self.cellfull[entry]
+        if alt is None:
+            valid = np.ones(len(ipoint), dtype=bool)
+        else:
+            alt = np.broadcast_to(np.asarray(alt, dtype=float), lat.shape)[ipoint]
+            valid = (self.bottom[poly] <= alt) & (alt <= self.top[poly])
+
+        # Exact check of the points in border cells, per polygon
+        border = np.flatnonzero(~inside & valid)
+        border = border[np.argsort(poly[border], kind='stable')]
+        bpoly  = poly[border]
+        splits = np.flatnonzero(np.diff(bpoly)) + 1
+        for sel in np.split(border, splits) if len(border) else []:
+            ipoly = poly[sel[0]]
+            pts = ipoint[sel]
+            # Longitudes in the (unwrapped) range of the polygon
+            plon = (lon[pts] - self.lonmin[ipoly]) % 360.0 + self.lonmin[ipoly]
+            inside[sel] = inside_polygon(lat[pts], plon, self.plat[ipoly], self.plon[ipoly])
+
+        inside &= valid
+        npoly = len(self.plat)
+        result = np.full(len(lat), npoly)
+        np.minimum.at(result, ipoint[inside], poly[inside])
+        result[result == npoly] = -1
+        return int(result[0]) if scalar else result
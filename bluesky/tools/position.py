@@ -60,15 +60,15 @@ class Position():
             self.type = "rwy"
 
         # airport?
-        elif bs.navdb.aptid.count(name)>0:
-            idx = bs.navdb.aptid.index(name.upper())
+        elif bs.navdb.getaptidx(name) >= 0:
+            idx = bs.navdb.getaptidx(name)
 
             self.lat = bs.navdb.aptlat[idx]
             self.lon = bs.navdb.aptlon[idx]
             self.type ="apt"
 
         # fix or navaid?
-        elif bs.navdb.wpid.count(name)>0:
+        elif bs.navdb.getwpidx(name) >= 0:
             idx = bs.navdb.getwpidx(name,reflat,reflon)
             self.lat = bs.navdb.wplat[idx]
             self.lon = bs.navdb.wplon[idx]
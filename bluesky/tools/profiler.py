@@ -0,0 +1,159 @@
+''' Per-subsystem wall-clock profiler of the simulation step.
+
+    The simulation step is divided into phases by calls to mark(name), each
+    of which ends the current phase. The duration of each phase is kept
+    over a rolling window of steps. When the tracer is on, each phase is
+    also recorded as a trace event. When both are off, mark() and the
+    other step functions return immediately.
+'''
+import os
+from collections import OrderedDict, deque
+from time import perf_counter, time
+import numpy as np
+import bluesky as bs
+from bluesky import settings
+from bluesky.tools import tracer
+
+# Register settings defaults
+settings.set_variable_defaults(log_path='output', profile_window=1000, profile_streamdt=1.0)
+
+# Profiling is off by default
+active = False
+streaming = False
+
+# Rolling window of durations [s] per phase, in order of first occurrence
+phases = OrderedDict()
+
+# Start time of the current phase
+tphase = 0.0
+# Start time of the current step
+tstep = 0.0
+# Next time the profile stream is sent
+tstream = 0.0
+
+
+def start_step():
+    ''' Start profiling a new simulation step. '''
+    global tstep, tphase
+    if active or tracer.active:
+        tstep = tphase = perf_counter()
+
+
+def restart_step():
+    ''' Restart timing the current step, when switching on halfway a step. '''
+    global tstep, tphase
+    tstep = tphase = perf_counter()
+
+
+def mark(name):
+    ''' End the current phase of the step, and register its duration
+        under name. '''
+    global tphase
+    if active or tracer.active:
+        tnow = perf_counter()
+        if active:
+            record(name, tnow - tphase)
+        tracer.complete(name, 'step', tphase, tnow)
+        tphase = tnow
+
+
+def end_step():
+    ''' End profiling the current simulation step. '''
+    global tstream
+    if active or tracer.active:
+        tnow = perf_counter()
+        tracer.complete('step', 'sim', tstep, tnow)
+    if active:
+        record('total', tnow - tstep)
+        if streaming and time() >= tstream:
+            tstream = time() + settings.profile_streamdt
+            bs.net.send_stream(b'PROFILE', stats())
+
+
+def record(name, dt):
+    ''' Add a duration sample dt [s] to phase name. '''
+    samples = phases.get(name)
+    if samples is None:
+        samples = phases[name] = deque(maxlen=settings.profile_window)
+    samples.append(dt)
+
+
+def reset():
+    ''' Clear all profiling data. '''
+    phases.clear()
+
+
+def stats():
+    ''' Return a dict with the statistics of each phase, in milliseconds:
+        dict(name=[mean, p50, p95, max, nsamples]). '''
+    result = OrderedDict()
+    for name, samples in phases.items():
+        dt = 1e3 * np.array(samples)
+        p50, p95 = np.percentile(dt, [50.0, 95.0])
+        result[name] = [dt.mean(), p50, p95, dt.max(), len(dt)]
+    return result
+
+
+def show():
+    ''' Return a text table with the profiling statistics. '''
+    data = stats()
+    if not data:
+        return 'No profiling data' + ('' if active else ', profiler is off')
+    total = data['total'][0] if 'total' in data else sum(v[0] for v in data.values())
+    lines = ['{:<12s}{:>9s}{:>9s}{:>9s}{:>9s}{:>7s}'.format(
+        'phase', 'mean', 'p50', 'p95', 'max', '%')]
+    for name, (mean, p50, p95, dtmax, _) in data.items():
+        share = 100.0 * mean / total if total > 0.0 else 0.0
+        lines.append('{:<12s}{:9.3f}{:9.3f}{:9.3f}{:9.3f}{:7.1f}'.format(
+            name, mean, p50, p95, dtmax, share))
+    lines.append('(times in ms, over the last {} steps)'.format(
+        max(v[4] for v in data.values())))
+    return '\n'.join(lines)
+
+
+def dump(fname=''):
+    ''' Write the profiling statistics to a csv file. '''
+    if not fname:
+        fname = os.path.join(settings.log_path, 'PROFILE_{}.csv'.format(
+            bs.stack.get_scenname() or 'sim'))
+    elif not os.path.dirname(fname):
+        fname = os.path.join(settings.log_path, fname)
+    with open(fname, 'w') as f:
+        f.write('# phase, mean [ms], p50 [ms], p95 [ms], max [ms], samples\n')
+        for name, (mean, p50, p95, dtmax, n) in stats().items():
+            f.write('{}, {:.6f}, {:.6f}, {:.6f}, {:.6f}, {}\n'.format(
+                name, mean, p50, p95, dtmax, n))
+    return fname
+
+
+def profile(cmd='', arg=''):
+    ''' Stack function for the profiler:
+        PROFILE ON/OFF/RESET/DUMP [fname]/STREAM ON/OFF. Without arguments
+        the current statistics are shown. '''
+    global active, streaming
+    cmd = cmd.upper()
+    if not cmd:
+        return True, show()
+    if cmd == 'ON':
+        # The profiler can be switched on halfway a step
+        if not active:
+            restart_step()
+        active = True
+        return True, 'Profiler is on'
+    if cmd == 'OFF':
+        active = streaming = False
+        return True, 'Profiler is off'
+    if cmd == 'RESET':
+        reset()
+        return True, 'Profiling data cleared'
+    if cmd == 'DUMP':
+        if not phases:
+            return False, 'No profiling data to dump'
+        return True, 'Profile written to ' + dump(arg)
+    if cmd == 'STREAM':
+        streaming = (arg.upper() != 'OFF')
+        if streaming and not active:
+            restart_step()
+            active = True
+        return True, 'Profile stream is ' + ('on' if streaming else 'off')
+    return False, 'Unknown PROFILE command ' + cmd
@@ -0,0 +1,156 @@
+''' Central multi-rate scheduler of the simulation subsystems.
+
+    Subsystems that do not need to run every simulation step register a
+    task with an update interval (dt) and a phase offset. Tasks with a
+    callback function are executed per group (plugin pre-updates, plugin
+    updates, periodic loggers) by update(group, simt). Tasks of the traffic
+    update, which have to run in the fixed order of Traffic.update(), only
+    register their rate, and check whether they are due with task.due(simt).
+
+    Tasks that are registered without an explicit offset are staggered: they
+    get the phase (a multiple of the simulation timestep) that the fewest
+    other tasks have, so that heavy tasks such as the FMS and performance
+    updates are spread over the simulation steps. Conflict detection keeps
+    its first run at the start of the simulation, and plugins their first
+    update one interval after the start.
+    Update intervals and offsets can be changed at runtime with the
+    SCHEDULE command.
+'''
+from math import ceil
+import bluesky as bs
+from bluesky import settings
+from bluesky.tools import tracer
+
+# Register settings defaults
+settings.set_variable_defaults(simdt=0.05)
+
+# Margin [s] for round-off in simulation time when checking if a task is due
+TOL = 1e-6
+
+# All registered tasks, in order of registration
+tasks = list()
+
+
+class Task:
+    ''' A periodic task of a simulation subsystem. '''
+    def __init__(self, name, dt, offset, fun=None, group='traffic'):
+        self.name   = name
+        self.dt     = dt
+        self.offset = offset
+        self.fun    = fun
+        self.group  = group
+        self.tnext  = offset
+
+    def reset(self, simt=0.0):
+        ''' Set the first trigger time at or after simt. '''
+        self.tnext = self.offset
+        if self.dt > 0.0 and simt > self.tnext + TOL:
+            self.tnext += self.dt * ceil((simt - self.tnext - TOL) / self.dt)
+
+    def due(self, simt):
+        ''' Returns True if the task is due at simt, and sets its next
+            trigger time. '''
+        if simt < self.tnext - TOL:
+            return False
+        self.tnext += self.dt
+        # The simulation can have skipped ahead several intervals,
+        # see Simulation.skip_idle()
+        if self.dt > 0.0 and simt >= self.tnext - TOL:
+            self.tnext += self.dt * (1 + (simt - self.tnext + TOL) // self.dt)
+        return True
+
+    def update(self, simt):
+        ''' Call the task function if it is due at simt. '''
+        if self.due(simt):
+            tstart = tracer.begin()
+            self.fun()
+            tracer.end(self.name, self.group, tstart)
+
+
+def stagger(dt, exclude=None):
+    ''' Return the phase offset for a task with interval dt, that the
+        fewest of the other tasks have. '''
+    simdt = bs.sim.simdt if bs.sim else settings.simdt
+    nslots = int(round(dt / simdt))
+    if nslots <= 1:
+        return 0.0
+    load = [0] * nslots
+    for task in tasks:
+        if task.dt > 0.0 and task is not exclude:
+            load[int(round(task.offset / simdt)) % nslots] += 1
+    return load.index(min(load)) * simdt
+
+
+def register(name, dt, fun=None, group='traffic', offset=None):
+    ''' Register a task with update interval dt [s] (zero for every
+        simulation step). When no offset is given, the task is staggered
+        with respect to the other tasks. Returns the task. '''
+    # A task that is registered again replaces the existing one
+    remove(name, group)
+    if offset is None:
+        offset = stagger(dt) if dt > 0.0 else 0.0
+    task = Task(name, dt, offset, fun, group)
+    task.reset(bs.sim.simt if bs.sim else 0.0)
+    tasks.append(task)
+    return task
+
+
+def remove(name, group=None):
+    ''' Remove the task(s) with this name (and group). '''
+    tasks[:] = [task for task in tasks if task.name != name or
+                (group is not None and task.group != group)]
+
+
+def update(group, simt):
+    ''' Execute the due tasks of group, in order of registration. '''
+    for task in tasks:
+        if task.group == group:
+            task.update(simt)
+
+
+def get_nexttime(*groups):
+    ''' Return the simulation time at which the next task of one of the
+        given groups is due (inf if there are none). '''
+    return min((task.tnext for task in tasks if task.group in groups),
+               default=float('inf'))
+
+
+def skip(simt):
+    ''' The simulation skipped ahead to simt: tasks that were due in the
+        skipped interval are next triggered at their first time at or after
+        simt, as without traffic these runs have no work to do. '''
+    for task in tasks:
+        if task.tnext < simt - TOL:
+            task.reset(simt)
+
+
+def reset():
+    ''' Reset the trigger times of all tasks. '''
+    for task in tasks:
+        task.reset()
+
+
+def schedule(name='', dt=None, offset=None):
+    ''' Stack function for the scheduler: SCHEDULE [name dt [offset]].
+        Without arguments the list of tasks is shown. '''
+    if not name:
+        lines = ['{:<12s}{:<10s}{:>8s}{:>8s}{:>10s}'.format(
+            'task', 'group', 'dt', 'offset', 'next')]
+        for task in tasks:
+            lines.append('{:<12s}{:<10s}{:8.2f}{:8.2f}{:10.2f}'.format(
+                task.name, task.group, task.dt, task.offset, task.tnext))
+        return True, '\n'.join(lines)
+    selected = [task for task in tasks if task.name == name.upper()]
+    if not selected:
+        return False, 'Task {} not found'.format(name)
+    if dt is None:
+        return True, '\n'.join('{} ({}): dt = {:.2f} s, offset = {:.2f} s'.format(
+            task.name, task.group, task.dt, task.offset) for task in selected)
+    if dt < 0.0:
+        return False, 'Update interval of {} cannot be negative'.format(name)
+    for task in selected:
+        task.dt = dt
+        task.offset = offset if offset is not None else \
+            (stagger(dt, task) if dt > 0.0 else 0.0)
+        task.reset(bs.sim.simt if bs.sim else 0.0)
+    return True, '{} update interval set to {:.2f} s'.format(name.upper(), dt)
@@ -19,6 +19,13 @@ class Timer(object):
         self.interval = float(interval) * 1e-3
         self.t_next   = time.time() + self.interval
 
+    @classmethod
+    def remainder(cls):
+        ''' Time [s] until the first of the running timers is due. '''
+        if not cls.timers:
+            return float('inf')
+        return min(timer.t_next for timer in cls.timers) - time.time()
+
     @classmethod
     def update_timers(cls):
         tcur = time.time()
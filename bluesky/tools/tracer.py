@@ -0,0 +1,120 @@
+''' Timeline tracer of the simulation, in the Chrome trace-event format.
+
+    When tracing is on, the durations of the simulation step phases,
+    plugin callbacks, stack commands, network events, and garbage
+    collection pauses are recorded as
+    trace events in a bounded ring buffer. The last part of this timeline
+    can be written on demand (TRACE DUMP) to a JSON file, which can be
+    opened in a trace viewer such as chrome://tracing or Perfetto. When
+    tracing is off, begin() and end() return immediately.
+'''
+import gc
+import json
+import os
+import threading
+from collections import deque
+from time import perf_counter
+import bluesky as bs
+from bluesky import settings
+
+# Register settings defaults
+settings.set_variable_defaults(log_path='output', trace_maxevents=1000000)
+
+# Tracing is off by default
+active = False
+
+# The ring buffer of trace events: (name, category, start [s], duration [s], thread id)
+events = deque(maxlen=1)
+
+# Start time of the running garbage collection
+tgc = 0.0
+
+
+def begin():
+    ''' Start timing an event. Returns the start time to pass to end(). '''
+    return perf_counter() if active else 0.0
+
+
+def end(name, cat, tstart):
+    ''' Record an event of category cat, that started at tstart. '''
+    if active:
+        complete(name, cat, tstart, perf_counter())
+
+
+def complete(name, cat, tstart, tend):
+    ''' Record an event of category cat from tstart to tend. '''
+    if active:
+        events.append((name, cat, tstart, tend - tstart, threading.get_ident()))
+
+
+def gc_event(phase, info):
+    ''' Garbage collector callback. '''
+    global tgc
+    if phase == 'start':
+        tgc = perf_counter()
+    else:
+        complete('gc generation {}'.format(info['generation']), 'gc', tgc, perf_counter())
+
+
+def start():
+    ''' Start tracing, with a new ring buffer. '''
+    global active, events
+    if not active:
+        events = deque(maxlen=settings.trace_maxevents)
+        gc.callbacks.append(gc_event)
+        active = True
+
+
+def stop():
+    global active
+    if active:
+        gc.callbacks.remove(gc_event)
+        active = False
+
+
+def dump(fname='', seconds=0.0):
+    ''' Write the trace events of the last [seconds] (all events if zero)
+        to a Chrome trace-event JSON file. '''
+    if not fname:
+        fname = os.path.join(settings.log_path, 'TRACE_{}.json'.format(
+            bs.stack.get_scenname() or 'sim'))
+    elif not os.path.dirname(fname):
+        fname = os.path.join(settings.log_path, fname)
+    tmin = perf_counter() - seconds if seconds > 0.0 else float('-inf')
+    pid = os.getpid()
+    # Network events are named by their (bytes) event or stream name
+    trace = [dict(name=name.decode() if isinstance(name, bytes) else name,
+                  cat=cat, ph='X', ts=1e6 * t, dur=1e6 * dt, pid=pid, tid=tid)
+             for name, cat, t, dt, tid in list(events) if t >= tmin]
+    with open(fname, 'w') as f:
+        json.dump(dict(traceEvents=trace, displayTimeUnit='ms'), f)
+    return fname, len(trace)
+
+
+def trace(cmd='', args=''):
+    ''' Stack function for the tracer: TRACE ON/OFF, or
+        TRACE DUMP [fname] [seconds] to write the last seconds of the
+        trace to file. '''
+    cmd = cmd.upper()
+    if not cmd:
+        return True, 'Tracing is {}, {} events in buffer'.format(
+            'on' if active else 'off', len(events) if active else 0)
+    if cmd == 'ON':
+        from bluesky.tools import profiler
+        start()
+        # Tracing can be switched on halfway a step
+        profiler.restart_step()
+        return True, 'Tracing is on'
+    if cmd == 'OFF':
+        stop()
+        return True, 'Tracing is off'
+    if cmd == 'DUMP':
+        # Both the filename and the number of seconds are optional
+        fname, _, seconds = args.strip().rpartition(' ')
+        try:
+            seconds = float(seconds)
+        except ValueError:
+            fname, seconds = args.strip(), 0.0
+        fname, nevents = dump(fname.strip(), seconds)
+        return True, '{} trace events written to {}'.format(nevents, fname)
+    return False, 'Unknown TRACE command ' + cmd
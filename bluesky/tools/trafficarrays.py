@@ -70,6 +70,20 @@ class TrafficArrays(object):
             elif isinstance(self.Vars[key], TrafficArrays):
                 self.Vars[key].reparent(self)
 
+    def getvar(self, varname):
+        ''' Return the registered array or list with name varname. Variables
+            of child objects are found using their dotted name, e.g., ap.alt.
+            Returns None if no such variable is registered. '''
+        obj = self
+        path = varname.split('.')
+        for name in path[:-1]:
+            obj = obj.Vars.get(name)
+            if not isinstance(obj, TrafficArrays):
+                return None
+        if path[-1] in obj.ArrVars or path[-1] in obj.LstVars:
+            return obj.Vars[path[-1]]
+        return None
+
     def create(self, n=1):
         # Append one element (aircraft) to all lists and arrays
 
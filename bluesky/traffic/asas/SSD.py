@@ -5,19 +5,17 @@ Created on Wed Mar 29 12:02:02 2017
 @author: Suthes Balasooriyan
 """
 
+from importlib.util import find_spec
 from bluesky.tools import geo
 from bluesky.tools.aero import nm
 import numpy as np
-# Try to import pyclipper
-try:
-    import pyclipper
-except ImportError:
+# pyclipper is imported when SSD is used, check here whether it is available
+if find_spec('pyclipper') is None:
     print("Could not import pyclipper, RESO SSD will not function")
 
 def loaded_pyclipper():
-    """ Return true if pyclipper is successfully loaded """
-    import sys
-    return "pyclipper" in sys.modules
+    """ Return true if pyclipper is available """
+    return find_spec('pyclipper') is not None
 
 # No idea what this does (placeholder??)
 def start(asas):
@@ -98,6 +96,7 @@ def initializeSSD(asas, ntraf):
 # asas is an object of the ASAS class defined in asas.py
 def constructSSD(asas, traf, priocode = "RS1"):
     """ Calculates the FRV and ARV of the SSD """
+    import pyclipper
     N = 0
     # Parameters
     N_angle = 180                   # [-] Number of points on circle (discretization)
@@ -559,6 +558,7 @@ def calculate_resolution(asas, traf):
 
 def area(vset):
     """ This function calculates the area of the set of FRV or ARV """
+    import pyclipper
     # Initialize A as it could be calculated iteratively
     A = 0
     # Check multiple exteriors
@@ -3,6 +3,7 @@
 import numpy as np
 import bluesky as bs
 from bluesky import settings
+from bluesky.tools import scheduler
 from bluesky.tools.aero import ft, nm
 from bluesky.tools.trafficarrays import TrafficArrays, RegisterElementParameters
 
@@ -66,6 +67,10 @@ class ASAS(TrafficArrays):
             self.alt = np.array([])  # alt provided by the ASAS [m]
             self.vs = np.array([])  # vspeed provided by the ASAS [m/s]
 
+        # Scheduling of conflict detection and resolution, starting at the
+        # first simulation step
+        self.task = scheduler.register('ASAS', settings.asas_dt, offset=0.0)
+
         # All ASAS variables are initialized in the reset function
         self.reset()
 
@@ -78,7 +83,8 @@ class ASAS(TrafficArrays):
         self.cd           = ASAS.CDmethods[self.cd_name]
         self.cr           = ASAS.CRmethods[self.cr_name]
 
-        self.dtasas       = settings.asas_dt                # interval for ASAS
+        self.task.dt      = settings.asas_dt                # interval for ASAS
+
         self.dtlookahead  = settings.asas_dtlookahead       # [s] lookahead time
         self.mar          = settings.asas_mar               # [-] Safety margin for evasion
         self.R            = settings.asas_pzr * nm          # [m] Horizontal separation minimum for detection
@@ -86,7 +92,6 @@ class ASAS(TrafficArrays):
         self.Rm           = self.R * self.mar               # [m] Horizontal separation minimum for resolution
         self.dhm          = self.dh * self.mar              # [m] Vertical separation minimum for resolution
         self.swasas       = True                            # [-] whether to perform CD&R
-        self.tasas        = 0.0                             # Next time ASAS should be called
 
         self.vmin         = settings.asas_vmin * nm / 3600. # [m/s] Minimum ASAS velocity (200 kts)
         self.vmax         = settings.asas_vmax * nm / 3600. # [m/s] Maximum ASAS velocity (600 kts)
@@ -228,9 +233,9 @@ class ASAS(TrafficArrays):
 
     def SetDtNoLook(self, value=None):
         if value is None:
-            return True, ("DTNOLOOK [time]\nCurrent value: %.1f sec" % self.dtasas)
+            return True, ("DTNOLOOK [time]\nCurrent value: %.1f sec" % self.task.dt)
 
-        self.dtasas = value
+        return scheduler.schedule('ASAS', value)
 
     def SetResoHoriz(self, value=None):
         """ Processes the RMETHH command. Sets swresovert = False"""
@@ -471,11 +476,9 @@ class ASAS(TrafficArrays):
         self.resopairs -= delpairs
 
     def update(self, simt):
-        if not self.swasas or simt < self.tasas:
+        if not self.swasas or not self.task.due(simt):
             return
 
-        # increment trigger time for next ASAS step
-        self.tasas += self.dtasas
         if bs.traf.ntraf:
             # Conflict detection
             self.confpairs, self.lospairs, self.inconf, self.tcpamax, \
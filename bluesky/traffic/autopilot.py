@@ -2,7 +2,7 @@
 from math import sin, cos, radians
 import numpy as np
 import bluesky as bs
-from bluesky.tools import geo
+from bluesky.tools import geo, scheduler
 from bluesky.tools.position import txt2pos
 from bluesky.tools.aero import ft, nm, vtas2cas, cas2mach, \
      mach2cas, vcasormach2tas, vcasormach
@@ -13,9 +13,8 @@ from bluesky.tools.trafficarrays import TrafficArrays, RegisterElementParameters
 class Autopilot(TrafficArrays):
     def __init__(self):
         super(Autopilot, self).__init__()
-        # Scheduling of FMS and ASAS
-        self.t0 = -999.  # last time fms was called
-        self.dt = 1.01   # interval for fms
+        # Scheduling of FMS
+        self.fms = scheduler.register('FMS', 1.01)
 
         # Standard self.steepness for descent
         self.steepness = 3000. * ft / (10. * nm)
@@ -57,9 +56,10 @@ class Autopilot(TrafficArrays):
         self.route[-n:] = [Route() for _ in range(n)]
 
     def update(self, simt):
-        # Scheduling: when dt has passed or restart
-        if self.t0 + self.dt < simt or simt < self.t0 or simt<self.dt:
-            self.t0 = simt
+        # Scheduling: when the FMS update interval has passed, and every
+        # step during the first interval, so that aircraft created at the
+        # start of a scenario get their route and VNAV setpoints at once
+        if self.fms.due(simt) or simt < self.fms.dt:
 
             # FMS LNAV mode:
             # qdr[deg],distinnm[nm]
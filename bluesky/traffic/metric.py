@@ -1,6 +1,5 @@
 from time import time, gmtime, strftime
 import numpy as np
-import matplotlib.pyplot as plt
 from math import degrees
 import collections
 from collections import defaultdict
@@ -196,7 +195,6 @@ class metric_CoCa():
         numberofrows = 3
         self.precocametric = np.zeros((numberofrows,5), dtype = ndtype)
         self.cocametric = np.zeros((numberofrows,6), dtype = ndtype)
-        plt.ion()
         self.ntraf = 0
 
         # plt.colorbar()
@@ -317,6 +315,9 @@ class metric_CoCa():
 
 
     def cellPlot(self):
+        # matplotlib is only imported when a plot is made
+        import matplotlib.pyplot as plt
+        plt.ion()
         cell = [floor(x/12) for x in bs.traf.cell]
         count = collections.Counter(cell)
         count = np.array(list(count.items()))
@@ -1022,6 +1023,7 @@ class metric_HB():
         return
 
     def complexity_plot(self):
+        import matplotlib.pyplot as plt
         if self.step == 0:
             self.plot_complexity,= plt.plot([], [])
             self.plot_complexity2, = plt.plot([],[])
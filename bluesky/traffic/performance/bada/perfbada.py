@@ -1,6 +1,7 @@
 """ BlueSky aircraft performance calculations using BADA 3.xx."""
 import numpy as np
 import bluesky as bs
+from bluesky.tools import scheduler
 from bluesky.tools.aero import kts, ft, g0, a0, T0, gamma1, gamma2,  beta, R, vtas2cas
 from bluesky.tools.trafficarrays import TrafficArrays, RegisterElementParameters
 from bluesky.traffic.performance.legacy.performance import esf, phases, calclimits, PHASE
@@ -38,8 +39,7 @@ class PerfBADA(TrafficArrays):
         self.warned2 = False    # Flag: Use of piston engine aircraft?
 
         # Flight performance scheduling
-        self.dt  = 0.1           # [s] update interval of performance limits
-        self.t0  = -self.dt  # [s] last time checked (in terms of simt)
+        self.task = scheduler.register('PERF', 0.1)  # [s] update interval of performance limits
         self.warned2 = False        # Flag: Did we warn for default engine parameters yet?
 
         # Register the per-aircraft parameter arrays
@@ -333,9 +333,7 @@ class PerfBADA(TrafficArrays):
         self.gr_acc[-n:]    = coeff.gr_acc
 
     def perf(self, simt):
-        if abs(simt - self.t0) >= self.dt:
-            self.t0 = simt
-        else:
+        if not self.task.due(simt):
             return
         """AIRCRAFT PERFORMANCE"""
         # BADA version
@@ -550,7 +548,7 @@ class PerfBADA(TrafficArrays):
         self.ff = np.maximum.reduce([ffto, ffic, ffcc, ffcrl, ffcd, ffap, ffld, ffgd])/60. # convert from kg/min to kg/sec
 
         # update mass
-        self.mass = self.mass - self.ff*self.dt # Use fuelflow in kg/min
+        self.mass = self.mass - self.ff*self.task.dt # Use fuelflow in kg/min
 
 
 
@@ -4,6 +4,7 @@ import os
 from math import *
 import numpy as np
 import bluesky as bs
+from bluesky.tools import scheduler
 from bluesky.tools.aero import ft, g0, a0, T0, rho0, gamma1, gamma2,  beta, R, \
     kts, lbs, inch, sqft, fpm, vtas2cas
 from bluesky.tools.trafficarrays import TrafficArrays, RegisterElementParameters
@@ -27,8 +28,7 @@ class PerfBS(TrafficArrays):
         coeffBS.coeff()
 
         # Flight performance scheduling
-        self.dt  = 0.1           # [s] update interval of performance limits
-        self.t0  = -self.dt  # [s] last time checked (in terms of simt)
+        self.task = scheduler.register('PERF', 0.1)  # [s] update interval of performance limits
 
         with RegisterElementParameters(self):
             # index of aircraft types in library
@@ -198,9 +198,7 @@ class PerfBS(TrafficArrays):
         self.ffap[-n:]      = np.where(turboprops, 1. , coeffBS.ffap[jetidx]*coeffBS.n_eng[coeffidx])
 
     def perf(self,simt):
-        if abs(simt - self.t0) >= self.dt:
-            self.t0 = simt
-        else:
+        if not self.task.due(simt):
             return
         """Aircraft performance"""
         swbada = False # no-bada version
@@ -2,7 +2,6 @@
 import os
 import json
 import numpy as np
-import pandas as pd
 from bluesky import settings
 settings.set_variable_defaults(perf_path_openap="data/performance/OpenAP")
 
@@ -20,8 +19,22 @@ fixwing_dragpolar_db = settings.perf_path_openap + "/fixwing/dragpolar.csv"
 
 rotor_aircraft_db = settings.perf_path_openap + "/rotor/aircraft.json"
 
+# The coefficient database is read-only, and therefore only loaded once
+_coefficient = None
+
+
+def get_coefficient():
+    ''' Return the OpenAP coefficient database, loading it at first use. '''
+    global _coefficient
+    if _coefficient is None:
+        _coefficient = Coefficient()
+    return _coefficient
+
+
 class Coefficient():
     def __init__(self):
+        # pandas is only needed to read the database, at the first use of OpenAP
+        import pandas as pd
         self.acs_fixwing = self.__load_all_fixwing_flavor()
         self.engines_fixwing = pd.read_csv(fixwing_engine_db, encoding='utf-8')
         self.limits_fixwing = self.__load_all_fixwing_envelop()
@@ -39,6 +52,7 @@ class Coefficient():
 
     def __load_all_fixwing_flavor(self):
         import warnings
+        import pandas as pd
         warnings.simplefilter("ignore")
 
         # read fixwing aircraft and engine files
@@ -74,6 +88,7 @@ class Coefficient():
     def __load_all_fixwing_envelop(self):
         """ load aircraft envelop from the model database,
             All unit in SI"""
+        import pandas as pd
         limits_fixwing = {}
         for mdl, ac in self.acs_fixwing.items():
             fenv = fixwing_envelops_dir + mdl.lower() + '.csv'
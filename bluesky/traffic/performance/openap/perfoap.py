@@ -1,6 +1,6 @@
 import numpy as np
 import bluesky as bs
-from bluesky.tools import aero
+from bluesky.tools import aero, scheduler
 from bluesky.tools.trafficarrays import TrafficArrays, RegisterElementParameters
 from bluesky.traffic.performance.perfbase import PerfBase
 from bluesky.traffic.performance.openap import coeff, thrust
@@ -15,6 +15,11 @@ class OpenAP(PerfBase):
         update(): update performance parameters
     """
 
+    @property
+    def coeff(self):
+        ''' The coefficient database, which is loaded when the first aircraft is created. '''
+        return coeff.get_coefficient()
+
     def __init__(self, min_update_dt=1):
         super(OpenAP, self).__init__()
 
@@ -22,8 +27,7 @@ class OpenAP(PerfBase):
         self.current_sim_time = 0       # last update simulation time
         self.ac_warning = False         # aircraft mdl to default warning
         self.eng_warning = False        # aircraft engine to default warning
-
-        self.coeff = coeff.Coefficient()
+        self.task = scheduler.register('PERF', 0.0)  # update every simulation step
 
         with RegisterElementParameters(self):
             self.actypes = np.array([], dtype=str)
@@ -109,6 +113,8 @@ class OpenAP(PerfBase):
 
     def update(self, simt=1):
         super(OpenAP, self).update(simt)
+        if not self.task.due(simt):
+            return
 
         # update phase, infer from spd, roc, alt
         lenph1 = len(self.phase)
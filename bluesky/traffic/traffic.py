@@ -14,7 +14,7 @@ import numpy as np
 from math import *
 from random import randint
 import bluesky as bs
-from bluesky.tools import datalog, geo
+from bluesky.tools import datalog, geo, areafilter, profiler
 from bluesky.tools.misc import latlon2txt
 from bluesky.tools.aero import fpm, kts, ft, g0, Rearth, nm, \
                          vatmos,  vtas2cas, vtas2mach, vcasormach
@@ -387,39 +387,51 @@ class Traffic(TrafficArrays):
 
         #---------- Atmosphere --------------------------------
         self.p, self.rho, self.Temp = vatmos(self.alt)
+        profiler.mark('atmosphere')
 
         #---------- ADSB Update -------------------------------
         self.adsb.update(simt)
+        profiler.mark('adsb')
 
         #---------- Fly the Aircraft --------------------------
         self.ap.update(simt)     # Autopilot logic
+        profiler.mark('autopilot')
         self.asas.update(simt)   # Airboren Separation Assurance
+        profiler.mark('asas')
         self.pilot.APorASAS()    # Decide autopilot or ASAS
+        profiler.mark('pilot')
 
         #---------- OpenAP Performance Update ------------------------
         if settings.performance_model == 'openap':
             self.perf.update(simt)
+            profiler.mark('perf')
 
         #---------- Limit Speeds ------------------------------
         self.pilot.applylimits()
+        profiler.mark('limits')
 
         #---------- Kinematics --------------------------------
         self.UpdateAirSpeed(simdt, simt)
         self.UpdateGroundSpeed(simdt)
         self.UpdatePosition(simdt)
+        profiler.mark('kinematics')
 
         #---------- Legacy and BADA Performance Update ------------------------
         if settings.performance_model != 'openap':
             self.perf.perf(simt)
+            profiler.mark('perf')
 
         #---------- Simulate Turbulence -----------------------
         self.turbulence.Woosh(simdt)
+        profiler.mark('turbulence')
 
         # Check whther new traffci state triggers conditional commands
         self.cond.update()
+        profiler.mark('conditions')
 
         #---------- Aftermath ---------------------------------
         self.trails.update(simt)
+        profiler.mark('trails')
         return
 
     def UpdateAirSpeed(self, simdt, simt):
@@ -500,6 +512,35 @@ class Traffic(TrafficArrays):
             except:
                 return -1
 
+    def getstate(self, varnames, acids=None, area=None):
+        """ Gather the traffic variables in varnames for all aircraft, or only
+            for the aircraft in acids and/or inside area. Variables of child
+            objects are addressed by their dotted name, e.g., ap.alt.
+            Returns a dict with the selected ids and variables. Unknown
+            variable names are returned as None, an unknown area is
+            reported in the error field of the result. """
+        idx = np.arange(self.ntraf)
+        if acids is not None:
+            acids = [acid.upper() for acid in acids]
+            idx = np.array([i for i in self.id2idx(acids) if i >= 0], dtype=int)
+        if area:
+            area = area.upper()
+            if not areafilter.hasArea(area):
+                return dict(simt=bs.sim.simt, id=[], error='Unknown area ' + area)
+            inside = areafilter.checkInside(area, self.lat[idx], self.lon[idx], self.alt[idx])
+            idx = idx[inside]
+
+        state = dict(simt=bs.sim.simt, id=[self.id[i] for i in idx])
+        for name in varnames:
+            var = self.getvar(name)
+            if isinstance(var, np.ndarray):
+                state[name] = var[idx]
+            elif isinstance(var, list):
+                state[name] = [var[i] for i in idx]
+            else:
+                state[name] = None
+        return state
+
     def setNoise(self, noise=None):
         """Noise (turbulence, ADBS-transmission noise, ADSB-truncated effect)"""
         if noise is None:
@@ -652,7 +693,7 @@ class Traffic(TrafficArrays):
                         if bs.navdb.wptype[i] in ["VOR","DME","TACAN"] and not samedesc:
                             desctxt = desctxt + " "+ str(bs.navdb.wpfreq[i])+" MHz"
                         elif bs.navdb.wptype[i]=="NDB" and not samedesc:
-                            desctxt = desctxt+ " " + str(bs.navdb.wpfreq[i])+" kHz"
+                            desctxt = desctxt+ " " + str(int(bs.navdb.wpfreq[i]))+" kHz"
 
                     iwp = iwps[0]
 
@@ -672,7 +713,7 @@ class Traffic(TrafficArrays):
 
 
                     # How many others?
-                    nother = bs.navdb.wpid.count(wp)-len(iwps)
+                    nother = len(bs.navdb.wpindex.get(wp, []))-len(iwps)
                     if nother>0:
                         verb = ["is ","are "][min(1,max(0,nother-1))]
                         lines = lines +"\nThere "+verb + str(nother) +\
@@ -713,7 +754,7 @@ class Traffic(TrafficArrays):
         if key=="":
             return False,'AIRWAY needs waypoint or airway'
 
-        if bs.navdb.awid.count(key)>0:
+        if key in bs.navdb.awindex:
             return self.poscommand(key.upper())
         else:
             # Find connecting airway legs
@@ -24,7 +24,9 @@ def init_plugin():
         'plugin_name':     'DATAFEED',
         'plugin_type':     'sim',
         'update_interval': 0.0,
-        'preupdate':       reader.update
+        'preupdate':       reader.update,
+        # Without a connection the feed doesn't create traffic
+        'idle_without_traffic': lambda: not reader.isConnected()
         }
 
     stackfunctions = {
@@ -63,6 +63,9 @@ def init_plugin():
 
         # The update function is called after traffic is updated.
         'update':          area.update,
+
+        # The area plugin only acts on traffic.
+        'idle_without_traffic': True
         }
 
     stackfunctions = {
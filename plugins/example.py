@@ -35,7 +35,12 @@ def init_plugin():
 
         # If your plugin has a state, you will probably need a reset function to
         # clear the state in between simulations.
-        'reset':         reset
+        'reset':         reset,
+
+        # When your plugin has nothing to do while there is no traffic, set this
+        # to True (or to a function that returns True when this is the case), so
+        # that fast-time simulation can skip ahead over periods without traffic.
+        'idle_without_traffic': False
         }
 
     stackfunctions = {
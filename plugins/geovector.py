@@ -74,11 +74,13 @@ def preupdate(): # To be safe preupdate is used iso update
     return
 
 def applygeovec():
+    # Check which aircraft are inside the areas of all geovectors at once
+    inside = areafilter.checkInsideMany([vec[0] for vec in geovecs], traf.lat, traf.lon, traf.alt)
+
     # Apply each geovector
-    for vec in geovecs:
+    for vec, swinside in zip(geovecs, inside):
         areaname = vec[0]
         if areafilter.hasArea(areaname):
-            swinside  = areafilter.checkInside(areaname, traf.lat, traf.lon, traf.alt)
 
             gsmin,gsmax,trkmin,trkmax,vsmin,vsmax = vec[1:]
 
@@ -52,9 +52,11 @@ def init_plugin():
 
 def update():
     mylog = list()
+    # The sector of each aircraft, in one call for all sectors
+    sectoridx = areafilter.findArea(sectors, traf.lat, traf.lon, traf.alt)
     for idx, name in enumerate(sectors):
         # Perform inside count, and check entering and leaving aircraft
-        inside    = areafilter.checkInside(name, traf.lat, traf.lon, traf.alt)
+        inside    = sectoridx == idx
         ids       = set(np.array(traf.id)[inside])
         previds   = previnside[idx]
         arrived   = str.join(', ', ids - previds)
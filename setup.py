@@ -60,6 +60,8 @@ setup(
     entry_points={
         'console_scripts': [
             'bluesky=BlueSky:main',
+            'bluesky-batch=bluesky.batch:main',
+            'bluesky-benchmark=bluesky.benchmark:main',
         ],
     },
 
@@ -0,0 +1,47 @@
+"""
+Sends many stack commands concurrently with the asyncio client, and awaits
+each reply individually.
+
+Resets the sim, creates a number of aircraft without waiting for each
+reply in turn, then polls their positions with GETSTATE.
+"""
+
+import asyncio
+import os
+import sys
+
+NAIRCRAFT = 100
+
+
+async def run(client):
+    print(await client.stack('RESET', timeout=5))
+
+    # All CRE commands are in flight at the same time
+    replies = await asyncio.gather(*(
+        client.stack('CRE AC{0} B744 52 {1:.2f} 90 FL100 250'.format(i, 4 + 0.01 * i), timeout=5)
+        for i in range(NAIRCRAFT)))
+    failed = [reply['text'] for reply in replies if reply['flags']]
+    print('Created {} aircraft, {} errors'.format(NAIRCRAFT - len(failed), len(failed)))
+
+    await client.stack('OP', timeout=5)
+    while True:
+        state = await client.getstate(['lat', 'lon', 'alt'], timeout=5)
+        print('t={:.1f}: {} aircraft, mean lon {:.4f}'.format(
+            state['simt'], len(state['id']), state['lon'].mean() if state['id'] else 0.0))
+        await asyncio.sleep(1)
+
+
+if __name__ == "__main__":
+
+    rel = os.path.abspath(os.path.join(os.getcwd(), "../../"))
+    sys.path.append(rel)
+
+    from bluesky.network.asyncclient import AsyncClient
+
+    client = AsyncClient()
+    client.connect(event_port=9000, stream_port=9001)
+
+    try:
+        asyncio.run(run(client))
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -1,7 +1,8 @@
 """
 Demonstrates issue #2 - Receive responses from the server over TCP.
 
-Resets the sim, creates an aircraft, then continually polls for its position.
+Resets the sim, creates an aircraft, then continually polls for its position
+with a single GETSTATE request per poll.
 """
 
 import os
@@ -75,6 +76,8 @@ if __name__ == "__main__":
                             self.actnode(nodes_myserver[0])
                     elif eventname == b'QUIT':
                         self.signal_quit.emit()
+                    elif eventname == b'STATE':
+                        print(pydata)
                     else:
                         self.event(eventname, pydata, self.sender_id)
 
@@ -110,11 +113,11 @@ if __name__ == "__main__":
     client.send_event(b'STACKCMD', data, target=b'*')
 
     print('Polling for location...')
-    data = 'POS 1000'
+    data = dict(vars=['lat', 'lon', 'alt'], acids=['1000'])
 
     while True:
         try:
-            client.send_event(b'STACKCMD', data, target=b'*')
+            client.send_event(b'GETSTATE', data, target=b'*')
             client.receive()
             time.sleep(1)
         except KeyboardInterrupt: